@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD解析性能基准
+对自带的SVD文件和一个生成的大型设备逐阶段测量耗时、峰值内存（tracemalloc）
+和存活对象数，结果可保存为JSON基线；与基线比较时若有回退超过阈值则以非0状态退出。
+
+使用方法:
+    python svd_bench.py                 # 运行并与基线比较（基线不存在时只输出结果）
+    python svd_bench.py --save          # 运行并保存为新的基线
+    python svd_bench.py --threshold 0.3 --repeat 7
+"""
+
+import xml.etree.ElementTree as ET
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import svd_cache
+import svd_core
+from svd_index import AddressIndex
+from svd_search import NameIndex
+
+
+# 默认测试文件（相对于本脚本所在目录）
+CORPUS = (
+    'TLE987x.svd',
+    'svd/STM32F107xx.svd',
+    'svd/LKS32MC08x.svd',
+    'arm_svd/Cortex-M85F.svd',    # ARM CoreSight格式
+)
+
+# 本脚本所在目录（默认测试文件和基线文件标签的根目录）
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 生成的大型设备的标签
+LARGE_DEVICE = 'generated:large'
+
+DEFAULT_BASELINE = 'svd_bench_baseline.json'
+
+# 低于这些绝对差值的变化视为噪声，不算回退
+MIN_TIME_MS = 2.0
+MIN_PEAK_KB = 64.0
+MIN_BLOCKS = 1000
+
+
+# ====== 生成大型设备 ======
+
+def generate_large_svd(path, peripherals=200, registers=64, fields=8):
+    """
+    生成一个大型的标准格式SVD文件
+
+    每4个外设中有1个通过 derivedFrom 派生自前一个外设。
+    """
+    width = 32 // fields
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        f.write('<device schemaVersion="1.1">\n  <name>LARGE</name>\n'
+                '  <description>Generated benchmark device</description>\n'
+                '  <size>32</size>\n  <resetValue>0x00000000</resetValue>\n'
+                '  <peripherals>\n')
+        for p in range(peripherals):
+            base = 0x40000000 + p * 0x1000
+            if p % 4 == 3:
+                f.write(f'    <peripheral derivedFrom="P{p - 1}">\n'
+                        f'      <name>P{p}</name>\n'
+                        f'      <baseAddress>0x{base:08X}</baseAddress>\n'
+                        f'    </peripheral>\n')
+                continue
+            f.write(f'    <peripheral>\n      <name>P{p}</name>\n'
+                    f'      <description>Peripheral {p}</description>\n'
+                    f'      <baseAddress>0x{base:08X}</baseAddress>\n'
+                    f'      <registers>\n')
+            for r in range(registers):
+                f.write(f'        <register>\n'
+                        f'          <name>R{r}</name>\n'
+                        f'          <description>Register {r} of peripheral {p}</description>\n'
+                        f'          <addressOffset>0x{r * 4:X}</addressOffset>\n'
+                        f'          <fields>\n')
+                for b in range(fields):
+                    f.write(f'            <field><name>F{b}</name>'
+                            f'<description>Field {b}</description>'
+                            f'<bitOffset>{b * width}</bitOffset><bitWidth>{width}</bitWidth>'
+                            f'<access>read-write</access></field>\n')
+                f.write('          </fields>\n        </register>\n')
+            f.write('      </registers>\n    </peripheral>\n')
+        f.write('  </peripherals>\n</device>\n')
+
+
+# ====== 测试阶段 ======
+
+def _xml_read(path):
+    """只读取XML（逐元素清除，不建模型），返回元素数"""
+    _, bare_amp = svd_core.prescan(path)
+    source = path
+    if bare_amp:
+        with open(path, 'rb') as f:
+            source = io.BytesIO(svd_core.escape_bare_amp(f.read()))
+    count = 0
+    for _, elem in ET.iterparse(source):
+        count += 1
+        if elem.tag in ('register', 'peripheral'):
+            elem.clear()
+    return count
+
+
+def _cache_setup(path):
+    """准备一个已写入该文件解析结果的临时缓存"""
+    cache_dir = tempfile.mkdtemp(prefix='svd_bench_cache_')
+    cache = svd_cache.SVDCache(cache_dir=cache_dir, version=svd_core.PARSER_VERSION)
+    svd_core.load_device_cached(path, cache)
+    return path, cache
+
+
+def _cache_teardown(arg):
+    shutil.rmtree(arg[1].cache_dir, ignore_errors=True)
+
+
+def _same(path):
+    return path
+
+
+# 阶段表: (名称, 准备函数, 被测函数, 清理函数)
+# 准备函数的返回值作为被测函数的参数，准备和清理都不计入测量
+# prescan 只是按字节扫描 derivedFrom 名称和未转义的 &；derivedFrom 的解析
+# （_DerivationGraph）在解析过程中逐个外设进行，计入 parse 阶段
+PHASES = (
+    ('prescan', _same, svd_core.prescan, None),
+    ('xml_read', _same, _xml_read, None),
+    ('parse', _same, svd_core.load_device, None),
+    ('cache_hit', _cache_setup, lambda arg: svd_core.load_device_cached(*arg), _cache_teardown),
+    ('address_index', svd_core.load_device, AddressIndex, None),
+    ('name_index', svd_core.load_device, NameIndex, None),
+)
+
+
+def measure(setup, func, teardown, path, repeat):
+    """
+    测量一个阶段
+
+    耗时取 repeat 次中的最小值和中位数；峰值内存和存活对象数单独测一次，
+    避免 tracemalloc 的开销影响计时。
+
+    Returns:
+        dict: time_ms, median_ms, peak_kb, blocks
+    """
+    arg = setup(path)
+    try:
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            result = func(arg)
+            times.append((time.perf_counter() - start) * 1000)
+            del result
+
+        gc.collect()
+        blocks_before = sys.getallocatedblocks()
+        tracemalloc.start()
+        result = func(arg)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.collect()
+        blocks = sys.getallocatedblocks() - blocks_before
+        del result
+    finally:
+        if teardown is not None:
+            teardown(arg)
+
+    return {
+        'time_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'peak_kb': round(peak / 1024, 1),
+        'blocks': blocks,
+    }
+
+
+def file_label(path, root=HERE):
+    """
+    基线中的文件标签：相对于本脚本所在目录的路径（以 / 分隔），与当前目录无关；
+    不在该目录下的文件使用绝对路径
+    """
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path, root)
+    if relative.startswith(os.pardir):
+        return path
+    return relative.replace(os.sep, '/')
+
+
+def run_benchmarks(files, repeat=5, large=True, large_peripherals=200):
+    """
+    对所有文件运行所有阶段
+
+    Returns:
+        dict: 文件标签 -> 阶段名称 -> 测量结果
+    """
+    results = {}
+    temp_dir = tempfile.mkdtemp(prefix='svd_bench_')
+    try:
+        targets = [(file_label(path), path) for path in files]
+        if large:
+            large_path = os.path.join(temp_dir, 'large.svd')
+            generate_large_svd(large_path, peripherals=large_peripherals)
+            targets.append((LARGE_DEVICE, large_path))
+
+        for label, path in targets:
+            if not os.path.exists(path):
+                print(f"跳过不存在的文件: {path}", file=sys.stderr)
+                continue
+            results[label] = {}
+            for name, setup, func, teardown in PHASES:
+                results[label][name] = measure(setup, func, teardown, path, repeat)
+                print_result(label, name, results[label][name])
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return results
+
+
+def print_result(label, phase, result):
+    """输出一行测量结果"""
+    print(f"{label:<28} {phase:<14} {result['time_ms']:>10.2f} ms "
+          f"(中位 {result['median_ms']:>9.2f}) {result['peak_kb']:>10.1f} KB "
+          f"{result['blocks']:>10} 对象")
+
+
+# ====== 基线比较 ======
+
+def compare(results, baseline, threshold):
+    """
+    与基线比较，超过阈值（相对值）且超过噪声下限（绝对值）的变化视为回退；
+    基线中没有的文件或阶段无法比较，同样作为错误报告
+
+    Returns:
+        list[str]: 回退描述
+    """
+    regressions = []
+    limits = (('time_ms', MIN_TIME_MS, 'ms'), ('peak_kb', MIN_PEAK_KB, 'KB'),
+              ('blocks', MIN_BLOCKS, '对象'))
+    for label, phases in results.items():
+        for phase, result in phases.items():
+            base = baseline.get(label, {}).get(phase)
+            if base is None:
+                regressions.append(f"{label} {phase}: 基线中没有该项（使用 --save 更新基线）")
+                continue
+            for key, min_delta, unit in limits:
+                old, new = base[key], result[key]
+                if new - old > min_delta and new > old * (1 + threshold):
+                    regressions.append(f"{label} {phase} {key}: {old} -> {new} {unit} "
+                                       f"(+{(new - old) / max(old, 1e-9) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='SVD解析性能基准')
+    parser.add_argument('files', nargs='*', help='测试的SVD文件（默认使用自带的测试文件）')
+    parser.add_argument('--baseline', default=os.path.join(HERE, DEFAULT_BASELINE),
+                        help=f'基线文件（默认 {DEFAULT_BASELINE}）')
+    parser.add_argument('--save', action='store_true', help='把本次结果保存为基线')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='判定为回退的相对增幅（默认 0.25，即 25%%）')
+    parser.add_argument('--repeat', type=int, default=5, help='每个阶段的计时次数')
+    parser.add_argument('--no-large', action='store_true', help='不测试生成的大型设备')
+    parser.add_argument('--large-peripherals', type=int, default=200,
+                        help='生成的大型设备的外设数量')
+    args = parser.parse_args()
+
+    files = args.files or [os.path.join(HERE, path) for path in CORPUS]
+
+    results = run_benchmarks(files, repeat=args.repeat, large=not args.no_large,
+                             large_peripherals=args.large_peripherals)
+
+    if args.save:
+        data = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n没有基线文件 {args.baseline}，使用 --save 创建")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n发现 {len(regressions)} 项回退或无法比较的项（阈值 {args.threshold:.0%}）:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\n与基线相比没有超过 {args.threshold:.0%} 的回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD解析结果缓存
+将解析后的设备模型以二进制（pickle）形式保存在磁盘上，命令行和GUI共用。
+
+缓存键由文件路径、大小、修改时间和内容哈希组成：
+- 路径、大小、修改时间都未变化时直接读取缓存，不需要重新计算哈希
+- 否则重新计算内容哈希，内容未变（例如仅被touch）时仍可命中
+- 解析器版本号变化时整个缓存自动失效
+- 缓存总大小超过上限时按最近最少使用（LRU）淘汰
+
+多个进程（batch 工作进程、CLI 和 GUI）可以同时使用同一个缓存目录：
+索引的读取-修改-写回在文件锁内完成，解析和读写条目文件在锁外进行。
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+
+# 默认缓存目录和大小上限，可通过环境变量覆盖
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.svd_parse_cache')
+DEFAULT_MAX_MB = 128
+
+INDEX_FILE = 'index.json'
+LOCK_FILE = 'index.lock'
+
+
+def file_digest(path):
+    """计算文件内容哈希（blake2b）"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _atomic_write(path, data):
+    """先写临时文件再替换，避免CLI和GUI同时写入时读到半个文件"""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class _IndexLock:
+    """索引的进程间互斥锁（锁文件上的 flock，Windows 上为 msvcrt.locking）"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:     # LK_LOCK 重试约10秒后放弃，继续等待
+                        pass
+        except BaseException:
+            self._file.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+
+
+class SVDCache:
+    """磁盘上的解析结果缓存"""
+
+    def __init__(self, cache_dir=None, max_bytes=None, version=None):
+        """
+        Args:
+            cache_dir: 缓存目录，默认读取环境变量 SVD_CACHE_DIR，否则为 ~/.svd_parse_cache
+            max_bytes: 缓存大小上限（字节），默认读取环境变量 SVD_CACHE_MAX_MB（单位MB）
+            version: 解析器版本号，与缓存中记录的版本不同时清空缓存
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get('SVD_CACHE_DIR') or DEFAULT_CACHE_DIR
+        if max_bytes is None:
+            try:
+                max_mb = float(os.environ.get('SVD_CACHE_MAX_MB', DEFAULT_MAX_MB))
+            except ValueError:
+                max_mb = DEFAULT_MAX_MB
+            max_bytes = int(max_mb * 1024 * 1024)
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.version = version
+        self.enabled = max_bytes > 0
+
+    # ---------- 索引读写 ----------
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def _lock(self):
+        return _IndexLock(os.path.join(self.cache_dir, LOCK_FILE))
+
+    def _entry_files(self):
+        """缓存目录中的条目文件: 键 -> os.stat_result"""
+        files = {}
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return files
+        for name in names:
+            if name.endswith('.pkl'):
+                try:
+                    files[name[:-4]] = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+        return files
+
+    def _empty_index(self):
+        return {'version': self.version, 'files': {}, 'entries': {}}
+
+    def _load_index(self):
+        """
+        读取索引（须持有索引锁）
+
+        索引不存在或无法读取时按空索引处理，不删除条目文件（可能是其他进程刚写入的，
+        _evict 会按文件重新计入）；只有索引记录的解析器版本与当前版本不同时才清空所有条目。
+        """
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+        if not isinstance(index, dict):
+            return self._empty_index()
+
+        if index.get('version') != self.version:
+            # 目录中的所有条目文件都删除（包括索引中没有记录的），
+            # 以免之后被当作当前版本的条目重新计入
+            for key in self._entry_files():
+                self._remove_entry_file(key)
+            return self._empty_index()
+
+        index.setdefault('files', {})
+        index.setdefault('entries', {})
+        return index
+
+    def _save_index(self, index):
+        data = json.dumps(index, ensure_ascii=False).encode('utf-8')
+        _atomic_write(self._index_path(), data)
+
+    def _remove_entry_file(self, key):
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    # ---------- 对外接口 ----------
+
+    def load(self, path, parse_func, kind='device'):
+        """
+        读取缓存的解析结果，未命中时调用 parse_func(path) 解析并写入缓存
+
+        Args:
+            path: SVD文件路径
+            parse_func: 解析函数，返回None表示解析失败（失败结果不缓存）
+            kind: 结果类型，不同解析函数的结果分开缓存
+
+        Returns:
+            parse_func 的返回值（可能来自缓存）
+        """
+        if not self.enabled:
+            return parse_func(path)
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            abs_path = os.path.abspath(path)
+            st = os.stat(abs_path)
+            with self._lock():
+                index = self._load_index()
+        except OSError:
+            return parse_func(path)
+
+        file_key = f'{kind}:{abs_path}'
+        record = index['files'].get(file_key)
+
+        # 路径、大小、修改时间都一致：直接使用记录的内容哈希
+        if record and record['size'] == st.st_size and record['mtime_ns'] == st.st_mtime_ns:
+            digest = record['hash']
+        else:
+            digest = file_digest(abs_path)
+
+        # 解析和读写条目文件不持有锁，其他进程可以同时解析别的文件
+        key = f'{kind}-{digest}'
+        written = None
+        result = self._read_entry(key)
+        if result is None:
+            result = parse_func(path)
+            if result is None:
+                return None
+            written = self._write_entry(key, result)
+
+        # 重新读取索引并只合并本次的修改，其他进程在此期间写入的记录不会丢失
+        try:
+            with self._lock():
+                index = self._load_index()
+                entries = index['entries']
+                if written is not None:
+                    entries[key] = {'bytes': written, 'last_used': time.time()}
+                else:
+                    # 命中：索引中没有记录（如索引曾无法读取）时按文件重新计入
+                    entry = entries.get(key)
+                    if entry is None:
+                        try:
+                            entry = entries[key] = {
+                                'bytes': os.path.getsize(self._entry_path(key))}
+                        except OSError:
+                            entry = None
+                    if entry is not None:
+                        entry['last_used'] = time.time()
+                if key in entries:
+                    index['files'][file_key] = {
+                        'size': st.st_size,
+                        'mtime_ns': st.st_mtime_ns,
+                        'hash': digest
+                    }
+                self._evict(index)
+                self._save_index(index)
+        except OSError:
+            pass
+        return result
+
+    def _read_entry(self, key):
+        """读取一个缓存条目文件（索引中没有记录也读取），失败时返回None"""
+        try:
+            with open(self._entry_path(key), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _write_entry(self, key, result):
+        """
+        写入一个缓存条目文件（索引由调用者在锁内更新）
+
+        Returns:
+            int: 写入的字节数，未写入时为None
+        """
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None
+        if len(data) > self.max_bytes:
+            return None
+        try:
+            _atomic_write(self._entry_path(key), data)
+        except OSError:
+            return None
+        return len(data)
+
+    def _evict(self, index):
+        """
+        按LRU淘汰条目直到总大小不超过上限（须持有索引锁）
+
+        总大小按目录中实际存在的条目文件计算：索引中有记录但文件已不存在的条目删除，
+        没有记录的条目文件按修改时间计入，也参与淘汰。
+        """
+        entries = index['entries']
+        on_disk = self._entry_files()
+        for key in list(entries):
+            if key not in on_disk:
+                del entries[key]
+        for key, st in on_disk.items():
+            if key not in entries:
+                entries[key] = {'bytes': st.st_size, 'last_used': st.st_mtime}
+        total = sum(entry['bytes'] for entry in entries.values())
+        if total > self.max_bytes:
+            for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+                if total <= self.max_bytes:
+                    break
+                total -= entries.pop(key)['bytes']
+                self._remove_entry_file(key)
+
+        # 删除指向已不存在条目的文件记录
+        live = set(entries)
+        index['files'] = {
+            file_key: record for file_key, record in index['files'].items()
+            if f"{file_key.split(':', 1)[0]}-{record['hash']}" in live
+        }
+
+    def clear(self):
+        """清空所有缓存"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._lock():
+                for key in self._entry_files():
+                    self._remove_entry_file(key)
+                self._save_index(self._empty_index())
+        except OSError:
+            pass
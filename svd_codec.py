@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD寄存器值编解码
+每个寄存器预先算好各位域的移位和掩码，寄存器值与位域值之间的转换只做整数运算。
+命令行的 decode/encode 子命令和GUI的寄存器值计算器共用。
+"""
+
+from svd_core import RegisterElement, parse_number
+
+
+class RegisterCodec:
+    """
+    寄存器值编解码器
+
+    寄存器数组的所有元素共用一个编解码器（位域、位宽、复位值都相同）。
+    位宽无效的位域不参与编解码。
+    """
+
+    __slots__ = ('size', 'reset_value', 'fields', '_specs', '_lower')
+
+    def __init__(self, register):
+        self.size = register.size
+        self.reset_value = register.reset_value or 0
+        fields = []
+        specs = {}
+        for field in register.iter_fields():
+            if field.width <= 0 or field.lsb < 0 or field.name in specs:
+                continue
+            fields.append(field)
+            specs[field.name] = (field.lsb, (1 << field.width) - 1)
+        self.fields = tuple(fields)
+        self._specs = specs                                 # 名称 -> (移位, 掩码)
+        self._lower = {name.lower(): name for name in specs}
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    @property
+    def value_mask(self):
+        """寄存器位宽对应的掩码"""
+        return (1 << self.size) - 1
+
+    def field_name(self, name):
+        """
+        规范化位域名称（名称不区分大小写）
+
+        Raises:
+            ValueError: 没有这个位域
+        """
+        if name in self._specs:
+            return name
+        try:
+            return self._lower[name.lower()]
+        except KeyError:
+            raise ValueError(f"未知位域: {name}") from None
+
+    def spec(self, name):
+        """位域的 (移位, 掩码)"""
+        return self._specs[self.field_name(name)]
+
+    def get(self, value, name):
+        """寄存器值中一个位域的值"""
+        shift, mask = self.spec(name)
+        return (value >> shift) & mask
+
+    def decode(self, value):
+        """
+        把寄存器值拆分为各位域的值
+
+        Returns:
+            dict: 位域名称 -> 值（保持位域在SVD中的顺序）
+        """
+        return {name: (value >> shift) & mask for name, (shift, mask) in self._specs.items()}
+
+    def with_field(self, value, name, x):
+        """
+        把寄存器值中一个位域替换为 x，其他位保持不变
+
+        Raises:
+            ValueError: 没有这个位域，或 x 超出位域的取值范围
+        """
+        name = self.field_name(name)
+        shift, mask = self._specs[name]
+        if not 0 <= x <= mask:
+            raise ValueError(f"{name} 的取值范围为 0..{mask}: {x}")
+        return (value & ~(mask << shift)) | (x << shift)
+
+    def with_fields(self, value, fields):
+        """依次替换多个位域（fields 为 名称 -> 值 的映射）"""
+        for name, x in fields.items():
+            value = self.with_field(value, name, x)
+        return value
+
+    def encode(self, values=None, /, **fields):
+        """
+        由位域值组合寄存器值，未给出的位域（和保留位）取复位值
+
+        Args:
+            values: 可选的 名称 -> 值 映射（位域名称不是合法标识符时使用）
+            fields: 位域名称=值
+
+        Raises:
+            ValueError: 没有这个位域，或值超出位域的取值范围
+        """
+        value = self.reset_value
+        if values:
+            value = self.with_fields(value, values)
+        return self.with_fields(value, fields)
+
+
+def register_codec(device, register):
+    """获取寄存器的编解码器（每个寄存器或寄存器数组构建一次，之后复用）"""
+    codecs = device.memo('codecs', lambda device: {})
+    source = register.array if isinstance(register, RegisterElement) else register
+    entry = codecs.get(id(source))
+    if entry is None or entry[0] is not source:
+        entry = codecs[id(source)] = (source, RegisterCodec(source))
+    return entry[1]
+
+
+def find_register(device, path):
+    """
+    按 "外设.寄存器" 查找寄存器（名称不区分大小写，寄存器数组元素写作 DR[3] 或 DR3）
+
+    Returns:
+        (Peripheral, Register): 外设和寄存器
+
+    Raises:
+        ValueError: 格式错误或找不到外设/寄存器
+    """
+    peripheral_name, sep, register_name = path.partition('.')
+    if not sep or not register_name:
+        raise ValueError(f"寄存器应写作 外设.寄存器: {path}")
+    peripheral = _find_by_name(device.peripherals, peripheral_name)
+    if peripheral is None:
+        raise ValueError(f"找不到外设: {peripheral_name}")
+    register = _find_by_name(peripheral.iter_registers(), register_name)
+    if register is None:
+        raise ValueError(f"{peripheral.name} 中找不到寄存器: {register_name}")
+    return peripheral, register
+
+
+def _find_by_name(items, name):
+    """按名称查找（先精确匹配，再不区分大小写，最后忽略数组下标的方括号）"""
+    lower = name.lower()
+    relaxed = lower.replace('[', '').replace(']', '')
+    candidates = [None, None]
+    for item in items:
+        if item.name == name:
+            return item
+        item_lower = item.name.lower()
+        if candidates[0] is None and item_lower == lower:
+            candidates[0] = item
+        elif candidates[1] is None and item_lower.replace('[', '').replace(']', '') == relaxed:
+            candidates[1] = item
+    return candidates[0] or candidates[1]
+
+
+def parse_assignments(texts):
+    """
+    解析命令行上的 名称=值 列表（值支持 0x、#二进制、十进制）
+
+    Returns:
+        dict: 名称 -> 值
+
+    Raises:
+        ValueError: 格式错误
+    """
+    fields = {}
+    for text in texts:
+        name, sep, value = text.partition('=')
+        number = parse_number(value.strip()) if sep else None
+        if not name.strip() or number is None:
+            raise ValueError(f"位域赋值应写作 名称=值: {text}")
+        fields[name.strip()] = number
+    return fields
+
+
+def format_fields(codec, value):
+    """
+    寄存器值按位域展开的文本行
+
+    Returns:
+        list[str]: 输出行
+    """
+    lines = []
+    for field in codec.fields:
+        x = codec.get(value, field.name)
+        lines.append(f"    [{field.bit_range():>5}] {field.name:<20} 0x{x:X} ({x})")
+    return lines
@@ -0,0 +1,1567 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD核心模型与解析器
+命令行（svd_parse.py）和GUI（svd_gui_viewer.py）共用的设备模型和唯一的解析入口。
+
+模型使用 __slots__ 类，地址、偏移、大小、复位值、位位置都以整数保存，
+字符串形式只在显示时计算。解析基于 iterparse 流式进行，支持：
+- 标准SVD格式: <device><peripherals><peripheral>...
+- ARM CoreSight格式: <device><cpu><groups><group>...（如 arm_svd/Cortex-M3.svd）
+"""
+
+import xml.etree.ElementTree as ET
+import hashlib
+from bisect import bisect_right
+import io
+import os
+import re
+import warnings
+
+import svd_cache
+
+
+# 解析器版本号：模型结构或解析结果发生变化时递增，使磁盘缓存失效
+PARSER_VERSION = 8
+
+# 设备级别需要记录的子节点
+DEVICE_FIELDS = ('name', 'vendor', 'version', 'description')
+
+# 匹配 derivedFrom 属性（预扫描用）
+_DERIVED_FROM_RE = re.compile(rb'derivedFrom\s*=\s*"([^"]+)"')
+
+# 匹配未转义的 &（不是实体引用的开头）
+_BARE_AMP_RE = re.compile(rb'&(?!#?\w+;)')
+
+# 文件中的一个 <peripheral> 块（外设不会嵌套，增量重新解析用）
+_PERIPHERAL_BLOCK_RE = re.compile(rb'<peripheral[\s>].*?</peripheral\s*>', re.S)
+_BLOCK_NAME_RE = re.compile(rb'<name>\s*(.*?)\s*</name>', re.S)
+
+# scaledNonNegativeInteger 的倍率后缀
+_SCALES = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+# 数值文本和字符串的记忆表超过该条目数时清空，避免解析大量文件时无限增长
+_MEMO_LIMIT = 1 << 16
+
+
+class ParseCancelled(Exception):
+    """解析被进度回调取消"""
+
+
+class DerivationCycleWarning(UserWarning):
+    """derivedFrom 存在循环引用（环上的节点不继承，其余部分照常解析）"""
+
+
+# ====== 显示格式 ======
+
+def format_address(value):
+    """地址的显示形式，如 0x40004008"""
+    return f'0x{value:08X}'
+
+
+def format_offset(value):
+    """偏移的显示形式，如 0x8"""
+    return f'0x{value:X}'
+
+
+def format_value(value, size=32):
+    """按寄存器宽度格式化数值，如 32 位时为 0x0000FFFF"""
+    return f'0x{value:0{(size + 3) // 4}X}'
+
+
+# ====== 模型 ======
+
+class Dim:
+    """
+    dim/dimIncrement/dimIndex 数组描述
+
+    数组在模型中只保存一个描述对象，元素的名称和地址在访问时才计算。
+    """
+
+    __slots__ = ('count', 'increment', 'indices')
+
+    def __init__(self, count, increment, indices=None):
+        self.count = count
+        self.increment = increment  # 相邻元素的间距（寄存器/外设为字节，位域为位）
+        self.indices = indices      # dimIndex 给出的下标名称，None 表示 0..count-1
+
+    def index_name(self, i):
+        """第 i 个元素的下标名称"""
+        return self.indices[i] if self.indices else str(i)
+
+    def element_name(self, name, i):
+        """第 i 个元素的名称（替换名称中的 %s）"""
+        if '%s' in name:
+            return name.replace('%s', self.index_name(i))
+        return f'{name}{self.index_name(i)}'
+
+    def range_name(self, name):
+        """数组整体的显示名称，如 ITM_STIM_[0..255]、IPR[0..7]"""
+        span = f'{self.index_name(0)}..{self.index_name(self.count - 1)}'
+        if '[%s]' in name:
+            return name.replace('%s', span)
+        if '%s' in name:
+            return name.replace('%s', f'[{span}]')
+        return f'{name}[{span}]'
+
+    def __repr__(self):
+        return f'Dim({self.count}, increment={self.increment})'
+
+
+class _ArrayElement:
+    """数组元素的公共部分：按需生成，以 (数组, 下标) 判等，可作为字典键"""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other.array is self.array and other.index == self.index
+
+    def __hash__(self):
+        return hash((id(self.array), self.index))
+
+
+class Field:
+    """寄存器位域（dim 不为None时表示位域数组）"""
+
+    __slots__ = ('name', 'description', 'lsb', 'msb', 'access', 'dim', 'enums')
+
+    def __init__(self, name, description='', lsb=0, msb=0, access='read-write', dim=None,
+                 enums=()):
+        self.name = name
+        self.description = description
+        self.lsb = lsb
+        self.msb = msb
+        self.access = access
+        self.dim = dim
+        self.enums = enums      # 枚举值: ((名称, 值, 描述), ...)，值无法解析时为None
+
+    @property
+    def count(self):
+        """展开后的位域个数（非数组为1）"""
+        return self.dim.count if self.dim else 1
+
+    def element(self, i):
+        """位域数组的第 i 个元素"""
+        return FieldElement(self, i)
+
+    def elements(self):
+        """遍历位域本身，数组则逐个生成元素"""
+        if self.dim is None:
+            return iter((self,))
+        return (FieldElement(self, i) for i in range(self.dim.count))
+
+    @property
+    def width(self):
+        """位宽"""
+        return self.msb - self.lsb + 1
+
+    @property
+    def mask(self):
+        """位域在寄存器中的掩码"""
+        return ((1 << self.width) - 1) << self.lsb
+
+    def bit_range(self):
+        """位范围的显示形式，如 7:0 或 5"""
+        if self.msb == self.lsb:
+            return str(self.lsb)
+        return f'{self.msb}:{self.lsb}'
+
+    def __repr__(self):
+        return f'Field({self.name!r}, [{self.bit_range()}])'
+
+
+class FieldElement(_ArrayElement, Field):
+    """位域数组中的一个元素"""
+
+    __slots__ = ('array', 'index')
+
+    def __init__(self, array, index):
+        dim = array.dim
+        shift = index * dim.increment
+        Field.__init__(self, dim.element_name(array.name, index), array.description,
+                       array.lsb + shift, array.msb + shift, array.access, enums=array.enums)
+        self.array = array
+        self.index = index
+
+
+class FieldSpan:
+    """位域布局中的一段：一个位域，或相邻位域之间的保留位（field 为None）"""
+
+    __slots__ = ('lsb', 'msb', 'field', 'overlap')
+
+    def __init__(self, lsb, msb, field=None, overlap=False):
+        self.lsb = lsb
+        self.msb = msb
+        self.field = field
+        self.overlap = overlap  # 与其他位域有重叠的位
+
+    def __reduce__(self):
+        # 磁盘缓存中只保存构造参数，比默认的 slots 状态字典小得多
+        return FieldSpan, (self.lsb, self.msb, self.field, self.overlap)
+
+    @property
+    def width(self):
+        """位宽"""
+        return self.msb - self.lsb + 1
+
+    @property
+    def reserved(self):
+        """是否为保留位"""
+        return self.field is None
+
+    def __repr__(self):
+        name = 'RES' if self.field is None else self.field.name
+        return f'FieldSpan({name}, [{self.msb}:{self.lsb}])'
+
+
+class FieldLayout:
+    """
+    寄存器的位域布局：按 lsb 排序的位域段和保留段
+
+    位宽无效（msb < lsb 或 lsb 为负）的位域不出现在布局中；保留段只覆盖寄存器位宽以内
+    没有任何位域的位。相同位域元组和位宽的寄存器（派生寄存器、寄存器数组的元素）
+    共用同一个布局对象。
+    """
+
+    __slots__ = ('spans', 'starts', 'overlaps', 'used_mask')
+
+    def __init__(self, fields, size):
+        spans = [FieldSpan(field.lsb, field.msb, field)
+                 for field in _iter_field_elements(fields)
+                 if field.lsb >= 0 and field.msb >= field.lsb]
+        spans.sort(key=lambda span: (span.lsb, span.msb))
+
+        # 重叠：lsb 落在前面位域覆盖范围内的位域与覆盖它的位域互相重叠
+        covered_to = -1
+        owner = None
+        used_mask = 0
+        for span in spans:
+            if span.lsb <= covered_to:
+                span.overlap = owner.overlap = True
+            if span.msb > covered_to:
+                covered_to = span.msb
+                owner = span
+            used_mask |= ((1 << span.width) - 1) << span.lsb
+
+        # 保留段：寄存器位宽以内未被覆盖的连续位
+        gaps = []
+        position = 0
+        for span in spans:
+            if span.lsb > position and position < size:
+                gaps.append(FieldSpan(position, min(span.lsb, size) - 1))
+            position = max(position, span.msb + 1)
+        if position < size:
+            gaps.append(FieldSpan(position, size - 1))
+
+        spans = tuple(sorted(spans + gaps, key=lambda span: (span.lsb, span.msb)))
+        self.spans = spans
+        self.starts = tuple(span.lsb for span in spans)
+        self.overlaps = any(span.overlap for span in spans)
+        self.used_mask = used_mask & ((1 << size) - 1)   # 属于某个位域的位
+
+    def __getstate__(self):
+        return self.spans, self.used_mask
+
+    def __setstate__(self, state):
+        self.spans, self.used_mask = state
+        self.starts = tuple(span.lsb for span in self.spans)
+        self.overlaps = any(span.overlap for span in self.spans)
+
+    def __iter__(self):
+        return iter(self.spans)
+
+    def __len__(self):
+        return len(self.spans)
+
+    def field_spans(self):
+        """只遍历位域段"""
+        return (span for span in self.spans if span.field is not None)
+
+    def span_at(self, bit):
+        """
+        覆盖给定位号的段（bisect 查找；位域重叠时返回 lsb 最大的那个位域）
+
+        Returns:
+            FieldSpan: 超出所有段时返回None
+        """
+        spans = self.spans
+        i = bisect_right(self.starts, bit) - 1
+        while i >= 0:
+            span = spans[i]
+            if bit <= span.msb:
+                return span
+            # 前面的位域要覆盖该位，必然与这一段重叠
+            if span.field is None or not span.overlap:
+                break
+            i -= 1
+        return None
+
+    def field_at(self, bit):
+        """覆盖给定位号的位域，保留位返回None"""
+        span = self.span_at(bit)
+        return None if span is None else span.field
+
+
+def _iter_field_elements(fields):
+    for field in fields:
+        yield from field.elements()
+
+
+class Register:
+    """寄存器（偏移相对于所属外设的基地址；dim 不为None时表示寄存器数组）"""
+
+    __slots__ = ('name', 'description', 'offset', 'size', 'reset_value', 'fields', 'dim',
+                 'layout')
+
+    def __init__(self, name, description='', offset=0, size=32, reset_value=None, fields=(),
+                 dim=None, layout=None):
+        self.name = name
+        self.description = description
+        self.offset = offset
+        self.size = size
+        self.reset_value = reset_value  # None 表示SVD中未给出复位值
+        self.fields = fields            # 位域数组只保存描述对象，用 iter_fields() 展开
+        self.dim = dim
+        self.layout = layout            # FieldLayout，解析器在外设产出前计算
+
+    @property
+    def count(self):
+        """展开后的寄存器个数（非数组为1）"""
+        return self.dim.count if self.dim else 1
+
+    @property
+    def size_bytes(self):
+        """单个寄存器占用的字节数"""
+        return max(1, (self.size + 7) // 8)
+
+    @property
+    def span_bytes(self):
+        """寄存器（数组则为所有元素）覆盖的字节数"""
+        if self.dim is None:
+            return self.size_bytes
+        return (self.dim.count - 1) * self.dim.increment + self.size_bytes
+
+    def element(self, i):
+        """寄存器数组的第 i 个元素"""
+        return RegisterElement(self, i)
+
+    def elements(self):
+        """遍历寄存器本身，数组则逐个生成元素"""
+        if self.dim is None:
+            return iter((self,))
+        return (RegisterElement(self, i) for i in range(self.dim.count))
+
+    def iter_fields(self):
+        """遍历所有位域（位域数组逐个展开）"""
+        for field in self.fields:
+            yield from field.elements()
+
+    def field_count(self):
+        """展开后的位域个数"""
+        return sum(field.count for field in self.fields)
+
+    def field_layout(self):
+        """位域布局（解析器已经计算；手工构建的寄存器在首次调用时计算并保存）"""
+        if self.layout is None:
+            self.layout = FieldLayout(self.fields, self.size)
+        return self.layout
+
+    def __repr__(self):
+        return f'Register({self.name!r}, offset={format_offset(self.offset)})'
+
+
+class RegisterElement(_ArrayElement, Register):
+    """寄存器数组中的一个元素（与数组共用位域和描述）"""
+
+    __slots__ = ('array', 'index')
+
+    def __init__(self, array, index):
+        dim = array.dim
+        Register.__init__(self, dim.element_name(array.name, index), array.description,
+                          array.offset + index * dim.increment, array.size,
+                          array.reset_value, array.fields)
+        self.array = array
+        self.index = index
+
+    def field_layout(self):
+        """与寄存器数组共用布局"""
+        return self.array.field_layout()
+
+
+class Cluster:
+    """
+    寄存器簇（<cluster>）
+
+    只在解析期间存在：外设产出前展开为寄存器，簇内寄存器的偏移累加簇的偏移，
+    名称加上簇名前缀（如 CH0.CCR）。
+    """
+
+    __slots__ = ('name', 'description', 'offset', 'children', 'dim')
+
+    def __init__(self, name, description='', offset=0, children=(), dim=None):
+        self.name = name
+        self.description = description
+        self.offset = offset
+        self.children = children  # 寄存器和子簇
+        self.dim = dim
+
+    def __repr__(self):
+        return f'Cluster({self.name!r}, offset={format_offset(self.offset)})'
+
+
+class Peripheral:
+    """外设（寄存器数组只保存描述对象，用 iter_registers() 展开）"""
+
+    __slots__ = ('name', 'description', 'base_address', 'registers', 'derived_from', 'dim')
+
+    def __init__(self, name, description='', base_address=0, registers=(), derived_from=None,
+                 dim=None):
+        self.name = name
+        self.description = description
+        self.base_address = base_address
+        self.registers = registers
+        self.derived_from = derived_from
+        self.dim = dim
+
+    def iter_registers(self):
+        """遍历外设的所有寄存器（寄存器数组逐个展开）"""
+        for register in self.registers:
+            yield from register.elements()
+
+    def register_count(self):
+        """展开后的寄存器个数"""
+        return sum(register.count for register in self.registers)
+
+    def elements(self):
+        """遍历外设本身，外设数组则逐个生成元素"""
+        if self.dim is None:
+            return iter((self,))
+        return (PeripheralElement(self, i) for i in range(self.dim.count))
+
+    def address_of(self, register):
+        """寄存器在本外设中的绝对地址"""
+        return self.base_address + register.offset
+
+    def __repr__(self):
+        return f'Peripheral({self.name!r}, base={format_address(self.base_address)})'
+
+
+class PeripheralElement(_ArrayElement, Peripheral):
+    """外设数组中的一个元素（与数组共用寄存器）"""
+
+    __slots__ = ('array', 'index')
+
+    def __init__(self, array, index):
+        dim = array.dim
+        Peripheral.__init__(self, dim.element_name(array.name, index), array.description,
+                            array.base_address + index * dim.increment, array.registers,
+                            array.derived_from)
+        self.array = array
+        self.index = index
+
+
+class Device:
+    """设备"""
+
+    __slots__ = ('name', 'vendor', 'version', 'description', 'peripherals', '_memo')
+
+    def __init__(self, name='Unknown', vendor='', version='', description='', peripherals=None):
+        self.name = name
+        self.vendor = vendor
+        self.version = version
+        self.description = description
+        self.peripherals = peripherals if peripherals is not None else []
+        self._memo = {}
+
+    def __getstate__(self):
+        # 派生数据（索引等）不写入磁盘缓存，加载后按需重建
+        return (self.name, self.vendor, self.version, self.description, self.peripherals)
+
+    def __setstate__(self, state):
+        self.name, self.vendor, self.version, self.description, self.peripherals = state
+        self._memo = {}
+
+    def memo(self, key, build):
+        """
+        按键缓存由设备派生的数据（如地址索引），每个设备只构建一次
+
+        Args:
+            key: 缓存键
+            build: 构建函数，参数为设备对象
+        """
+        value = self._memo.get(key)
+        if value is None:
+            value = self._memo[key] = build(self)
+        return value
+
+    def register_count(self):
+        """寄存器总数"""
+        return sum(p.register_count() for p in self.peripherals)
+
+    def field_count(self):
+        """位域总数"""
+        return sum(r.field_count() * r.count for p in self.peripherals for r in p.registers)
+
+    def __repr__(self):
+        return f'Device({self.name!r}, peripherals={len(self.peripherals)})'
+
+
+# ====== 内容指纹 ======
+
+def _dim_key(dim):
+    return None if dim is None else (dim.count, dim.increment, dim.indices)
+
+
+def _register_key(register, descriptions=True):
+    """寄存器内容的规范形式（包括位域，不包括所属外设；可以不含描述）"""
+    return (register.name, register.description if descriptions else None, register.offset,
+            register.size, register.reset_value, _dim_key(register.dim),
+            tuple((f.name, f.description if descriptions else None, f.lsb, f.msb, f.access,
+                   _dim_key(f.dim))
+                  for f in register.fields))
+
+
+def register_fingerprint(register, descriptions=True):
+    """寄存器内容的哈希（十六进制），内容相同的寄存器指纹相同"""
+    return hashlib.blake2b(repr(_register_key(register, descriptions)).encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def registers_fingerprint(registers):
+    """一组寄存器（按顺序）的哈希，派生外设共用的寄存器元组只需计算一次"""
+    h = hashlib.blake2b(digest_size=16)
+    for register in registers:
+        h.update(repr(_register_key(register)).encode('utf-8'))
+    return h.hexdigest()
+
+
+# ====== 解析 ======
+
+def _text(elem, tag, default=''):
+    """读取子节点文本，不存在时返回默认值"""
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return default
+    return child.text
+
+
+def _decode_number(text):
+    """parse_number 的实际转换，不是合法数值时返回None"""
+    text = text.strip()
+    if text[:1] == '+':
+        text = text[1:]
+    scale = _SCALES.get(text[-1:].lower(), 1)
+    if scale != 1:
+        text = text[:-1]
+    try:
+        if text[:2] in ('0x', '0X'):
+            value = int(text[2:], 16)
+        elif text[:1] == '#':
+            value = int(text[1:], 2)
+        else:
+            value = int(text, 10)
+    except ValueError:
+        return None
+    return value * scale if value >= 0 else None
+
+
+_numbers = {}
+
+
+def parse_number(text, default=None):
+    """
+    解析SVD的 scaledNonNegativeInteger（如 0x40004000、0X1F、#0101、32、4k）
+
+    同一文本只转换一次：0x00000000、32 之类的数值在文件中重复出现成千上万次。
+
+    Returns:
+        int: 数值，文本为空或不合法时返回默认值
+    """
+    if not text:
+        return default
+    try:
+        value = _numbers[text]
+    except KeyError:
+        if len(_numbers) >= _MEMO_LIMIT:
+            _numbers.clear()
+        value = _numbers[text] = _decode_number(text)
+    return default if value is None else value
+
+
+_strings = {}
+
+
+def _intern(text):
+    """复用相同内容的字符串（访问类型、重复的名称和描述），模型和缓存都只保存一份"""
+    if text is None:
+        return None
+    try:
+        return _strings[text]
+    except KeyError:
+        if len(_strings) >= _MEMO_LIMIT:
+            _strings.clear()
+        _strings[text] = text
+        return text
+
+
+def _dim_indices(text, count):
+    """
+    解析 dimIndex（如 "0-7"、"A-D"、"RX,TX"）
+
+    Returns:
+        tuple: 下标名称，与 dim 个数不符或为空时返回None
+    """
+    if not text:
+        return None
+    text = text.strip()
+    if ',' in text:
+        indices = tuple(part.strip() for part in text.split(','))
+    elif '-' in text:
+        first, last = (part.strip() for part in text.split('-', 1))
+        if first.isdigit() and last.isdigit():
+            indices = tuple(str(i) for i in range(int(first), int(last) + 1))
+        elif len(first) == 1 and len(last) == 1:
+            indices = tuple(chr(c) for c in range(ord(first), ord(last) + 1))
+        else:
+            return None
+    else:
+        indices = (text,)
+    return indices if len(indices) == count else None
+
+
+def _parse_dim(elem):
+    """解析元素的 dim/dimIncrement/dimIndex，不是数组时返回None"""
+    count = parse_number(_text(elem, 'dim', None), 0)
+    if count <= 0:
+        return None
+    return Dim(count,
+               parse_number(_text(elem, 'dimIncrement', None), 0),
+               _dim_indices(_text(elem, 'dimIndex', None), count))
+
+
+def _note_derived(links, obj, elem):
+    """记录元素的 derivedFrom 及其显式给出的子节点（解析完外设后由依赖图统一处理）"""
+    derived_from = elem.get('derivedFrom')
+    if derived_from and links is not None:
+        links[id(obj)] = (derived_from, frozenset(child.tag for child in elem))
+
+
+def parse_field(field, links=None):
+    """
+    解析单个字段元素（支持 lsb/msb、bitRange、bitOffset/bitWidth 三种格式）
+
+    Args:
+        field: <field> 元素
+        links: 可选，记录 derivedFrom 的字典（见 _note_derived）
+
+    Returns:
+        Field: 位域对象，无法解析位范围时返回None
+    """
+    field_name = field.find('name')
+    if field_name is None:
+        return None
+
+    lsb = None
+    msb = None
+
+    # 格式1: 使用 lsb 和 msb 标签（如 TLE987x.svd）
+    field_lsb = field.find('lsb')
+    field_msb = field.find('msb')
+    bit_range_elem = field.find('bitRange')
+    bit_offset_elem = field.find('bitOffset')
+    if field_lsb is not None and field_msb is not None:
+        lsb = parse_number(field_lsb.text)
+        msb = parse_number(field_msb.text)
+
+    # 格式2: 使用 bitRange 标签 [msb:lsb]（如 NSUC1602.svd）
+    elif bit_range_elem is not None:
+        bit_range = bit_range_elem.text.strip().strip('[]')
+        if ':' in bit_range:
+            msb_str, lsb_str = bit_range.split(':')
+            msb = parse_number(msb_str)
+            lsb = parse_number(lsb_str)
+        else:
+            lsb = msb = parse_number(bit_range)
+
+    # 格式3: 使用 bitOffset 和 bitWidth 标签
+    elif bit_offset_elem is not None and bit_offset_elem.text:
+        lsb = parse_number(bit_offset_elem.text)
+        bit_width = parse_number(_text(field, 'bitWidth', None), 1)
+        if lsb is not None:
+            msb = lsb + bit_width - 1
+
+    if lsb is None or msb is None:
+        if links is None or not field.get('derivedFrom'):
+            return None
+        lsb = msb = 0  # 位范围从源位域继承
+
+    field_obj = Field(_intern(field_name.text),
+                      _intern(_text(field, 'description')),
+                      lsb, msb,
+                      _intern(_text(field, 'access', 'read-write')),
+                      _parse_dim(field),
+                      _parse_enums(field))
+    _note_derived(links, field_obj, field)
+    return field_obj
+
+
+def _parse_enums(field):
+    """
+    解析位域的枚举值（所有 <enumeratedValues> 中的 <enumeratedValue>）
+
+    Returns:
+        tuple: ((名称, 值, 描述), ...)，值为 isDefault 或含无关位（如 #1x0）时为None，
+               缺少名称（部分ARM官方SVD）时名称为空字符串
+    """
+    enums = []
+    for values in field.findall('enumeratedValues'):
+        for value in values.findall('enumeratedValue'):
+            enums.append((_intern(_text(value, 'name').strip()),
+                          _enum_value(_text(value, 'value', None)),
+                          _intern(_text(value, 'description'))))
+    return tuple(enums)
+
+
+def _enum_value(text):
+    """枚举值（除 scaledNonNegativeInteger 外还允许 0b 前缀；含无关位 x 时返回None）"""
+    if not text:
+        return None
+    text = text.strip()
+    if text[:2] in ('0b', '0B'):
+        digits = text[2:]
+        return int(digits, 2) if digits and set(digits) <= {'0', '1'} else None
+    return parse_number(text)
+
+
+def parse_register(register, defaults, links=None):
+    """
+    解析单个寄存器元素
+
+    Args:
+        register: <register> 元素
+        defaults: 继承的寄存器属性 (size, reset_value)
+        links: 可选，记录 derivedFrom 的字典（见 _note_derived）
+
+    Returns:
+        Register: 寄存器对象，缺少名称时返回None
+    """
+    reg_name = register.find('name')
+    if reg_name is None:
+        return None
+
+    default_size, default_reset = defaults
+
+    # 计算偏移（ARM CoreSight格式的Core寄存器使用Index代替addressOffset）
+    offset_text = _text(register, 'addressOffset', None)
+    if offset_text is not None:
+        offset = parse_number(offset_text, 0)
+    else:
+        offset = parse_number(_text(register, 'Index', None), 0) * 4
+
+    fields = []
+    fields_elem = register.find('fields')
+    if fields_elem is not None:
+        for field in fields_elem.findall('field'):
+            field_obj = parse_field(field, links)
+            if field_obj:
+                fields.append(field_obj)
+
+    register_obj = Register(_intern(reg_name.text),
+                            _intern(_text(register, 'description')),
+                            offset,
+                            parse_number(_text(register, 'size', None), default_size),
+                            parse_number(_text(register, 'resetValue', None), default_reset),
+                            tuple(fields),
+                            _parse_dim(register))
+    _note_derived(links, register_obj, register)
+    return register_obj
+
+
+def _register_defaults(elem, defaults):
+    """在上级默认值基础上叠加元素自身的 size/resetValue 属性"""
+    default_size, default_reset = defaults
+    return (parse_number(_text(elem, 'size', None), default_size),
+            parse_number(_text(elem, 'resetValue', None), default_reset))
+
+
+def _parse_registers(registers_elem, defaults, links=None):
+    """
+    解析 <registers>（或 <cluster>）元素下的寄存器和簇
+
+    Returns:
+        tuple: 寄存器树（Register 和 Cluster，保持文件中的顺序）
+    """
+    items = []
+    for child in registers_elem:
+        if child.tag == 'register':
+            item = parse_register(child, defaults, links)
+        elif child.tag == 'cluster':
+            item = _parse_cluster(child, defaults, links)
+        else:
+            continue
+        if item:
+            items.append(item)
+    return tuple(items)
+
+
+def _parse_cluster(cluster, defaults, links=None):
+    """解析 <cluster> 元素（可嵌套），缺少名称时返回None"""
+    cluster_name = cluster.find('name')
+    if cluster_name is None:
+        return None
+    cluster_obj = Cluster(_intern(cluster_name.text),
+                          _intern(_text(cluster, 'description')),
+                          parse_number(_text(cluster, 'addressOffset', None), 0),
+                          _parse_registers(cluster, _register_defaults(cluster, defaults), links),
+                          _parse_dim(cluster))
+    _note_derived(links, cluster_obj, cluster)
+    return cluster_obj
+
+
+def _parse_peripheral(peripheral, defaults, links=None):
+    """
+    将一个 <peripheral> 元素转换为外设对象
+
+    寄存器保持为寄存器树（可能含簇），derivedFrom 只记录在 links 中，
+    由 _DerivationGraph 处理后再展开。
+    """
+    peripheral_obj = Peripheral(peripheral.find('name').text,
+                                _intern(_text(peripheral, 'description')),
+                                parse_number(_text(peripheral, 'baseAddress', None), 0),
+                                derived_from=peripheral.get('derivedFrom'),
+                                dim=_parse_dim(peripheral))
+
+    registers_elem = peripheral.find('registers')
+    if registers_elem is not None:
+        peripheral_obj.registers = _parse_registers(
+            registers_elem, _register_defaults(peripheral, defaults), links)
+
+    _note_derived(links, peripheral_obj, peripheral)
+    return peripheral_obj
+
+
+def _flatten_registers(items):
+    """
+    把寄存器树展开为寄存器元组
+
+    簇内寄存器累加簇的偏移并加上簇名前缀；只含普通寄存器的簇数组展开为
+    以簇间距为步长的寄存器数组（元素仍按需生成），其他簇数组逐个元素展开。
+    外设直接包含的寄存器保持原对象。
+    """
+    if not any(isinstance(item, Cluster) for item in items):
+        return tuple(items)
+    registers = []
+    _flatten_into(items, 0, '', registers)
+    return tuple(registers)
+
+
+def _flatten_into(items, offset, prefix, registers):
+    for item in items:
+        if isinstance(item, Register):
+            if not prefix:
+                registers.append(item)
+            else:
+                registers.append(Register(prefix + item.name, item.description,
+                                          offset + item.offset, item.size, item.reset_value,
+                                          item.fields, item.dim))
+            continue
+
+        name = prefix + item.name
+        base = offset + item.offset
+        dim = item.dim
+        if dim is None:
+            _flatten_into(item.children, base, name + '.', registers)
+        elif all(isinstance(child, Register) and child.dim is None for child in item.children):
+            if '%s' not in name:
+                name += '%s'
+            for child in item.children:
+                registers.append(Register(f'{name}.{child.name}', child.description,
+                                          base + child.offset, child.size, child.reset_value,
+                                          child.fields, dim))
+        else:
+            for i in range(dim.count):
+                _flatten_into(item.children, base + i * dim.increment,
+                              dim.element_name(name, i) + '.', registers)
+
+
+def _merge_children(inherited, own):
+    """
+    合并派生节点的下一级（写时复制）
+
+    派生节点自己没有给出子节点时直接共用源节点的元组；给出的子节点按名称覆盖源节点中的
+    同名子节点，新名称追加在后面，只生成新的元组，未覆盖的寄存器仍是源节点的对象。
+    """
+    if not own:
+        return inherited
+    overrides = {item.name: item for item in own}
+    merged = [overrides.pop(item.name, item) for item in inherited]
+    merged.extend(item for item in own if item.name in overrides)
+    return tuple(merged)
+
+
+# derivedFrom 可以继承的属性: (SVD子节点名称, 对象属性)
+_REGISTER_INHERIT = (('description', 'description'), ('size', 'size'),
+                     ('resetValue', 'reset_value'), ('fields', 'fields'), ('dim', 'dim'))
+_FIELD_INHERIT = (('description', 'description'), ('access', 'access'), ('dim', 'dim'),
+                  ('enumeratedValues', 'enums'))
+_CLUSTER_INHERIT = (('description', 'description'), ('dim', 'dim'))
+_FIELD_BIT_TAGS = frozenset(('lsb', 'msb', 'bitRange', 'bitOffset'))
+
+_ACTIVE = 1
+_DONE = 2
+
+
+class _Link:
+    """依赖图中的一条边：节点 derivedFrom 路径"""
+
+    __slots__ = ('node', 'path', 'explicit', 'scope')
+
+    def __init__(self, node, path, explicit, scope):
+        self.node = node
+        self.path = path            # 如 "CR1"、"USART1"、"TIM1.CH1.CCR"
+        self.explicit = explicit    # 节点在SVD中显式给出的子节点名称，这些属性不继承
+        self.scope = scope          # 查找相对路径的容器，由内向外（簇、外设 / 寄存器、...）
+
+
+class _DerivationGraph:
+    """
+    derivedFrom 依赖图
+
+    外设、簇、寄存器、位域的 derivedFrom（包括 外设.簇.寄存器 形式的路径）都是图中的边。
+    每个节点只解析一次并记住状态：先解析源节点（及其子树），再继承；
+    解析过程中再次遇到正在解析的节点即为循环引用。每条边只处理一次，
+    所以解析总量与文件大小成线性关系，与派生链的深度无关。
+
+    以 id() 为键的表都同时保存对象本身，并在读取时核对，避免对象释放后 id 被复用。
+    """
+
+    def __init__(self, roots):
+        self.wanted = roots     # 可能被引用的外设名称（预扫描得到）
+        self.roots = {}         # 已出现的被引用外设: 名称 -> 外设对象
+        self.finished = set()   # 已完成（finish）的被引用外设名称
+        self.links = {}         # id(节点) -> _Link
+        self.owned = {}         # id(外设) -> (外设, 外设内的 _Link 列表)
+        self.state = {}         # id(节点) -> (节点, _ACTIVE/_DONE)
+        self.complete = {}      # id(节点) -> 节点：子树中的 derivedFrom 已全部解析
+        self.trees = {}         # id(外设) -> (外设, 寄存器树)：展开后仍可能被路径引用的外设
+        self.flat = {}          # id(寄存器树) -> (寄存器树, 展开结果)：被共用的树只展开一次
+        self._names = {}        # id(容器) -> (容器, {名称: 子节点})
+
+    def children(self, node):
+        """节点的下一级：外设和簇为寄存器树，寄存器为位域"""
+        if isinstance(node, Peripheral):
+            entry = self.trees.get(id(node))
+            return entry[1] if entry is not None and entry[0] is node else node.registers
+        if isinstance(node, Cluster):
+            return node.children
+        if isinstance(node, Register):
+            return node.fields
+        return ()
+
+    def child(self, container, name):
+        """按名称查找容器的下一级节点"""
+        entry = self._names.get(id(container))
+        if entry is None or entry[0] is not container:
+            entry = (container, {c.name: c for c in self.children(container)})
+            self._names[id(container)] = entry
+        return entry[1].get(name)
+
+    def add(self, peripheral, links):
+        """
+        登记一个刚解析的外设及其中的 derivedFrom
+
+        被引用的外设只有在 finish 之后才算可用：它自己可能还在等待后面的外设，
+        此时继承它会得到不完整的寄存器树。
+
+        Returns:
+            set: 路径引用了但尚未完成的外设名称（为空时外设可以立即处理）
+        """
+        if peripheral.name in self.wanted:
+            self.roots[peripheral.name] = peripheral
+        own = []
+        if links:
+            self._collect(peripheral, (), links, own)
+        self.owned[id(peripheral)] = (peripheral, own)
+
+        missing = set()
+        for link in own:
+            root = link.path.split('.', 1)[0]
+            if root in self.finished or root == peripheral.name:
+                continue
+            if not any(self.child(container, root) is not None for container in link.scope):
+                missing.add(root)
+        return missing
+
+    def _collect(self, node, scope, links, out):
+        entry = links.get(id(node))
+        if entry is not None:
+            link = _Link(node, entry[0], entry[1], scope)
+            self.links[id(node)] = link
+            out.append(link)
+        inner = (node,) + scope
+        for child in self.children(node):
+            self._collect(child, inner, links, out)
+
+    def _link(self, node):
+        """节点自身的 derivedFrom 边，没有时返回None"""
+        link = self.links.get(id(node))
+        return link if link is not None and link.node is node else None
+
+    def _state(self, node):
+        entry = self.state.get(id(node))
+        return entry[1] if entry is not None and entry[0] is node else None
+
+    def find(self, path, scope):
+        """
+        按 derivedFrom 路径查找源节点：先在作用域内由内向外查找，再作为外设名称
+
+        Returns:
+            (节点, _Link): 路径经过的容器自身还未完成继承时（其子节点可能来自它的源），
+                           节点为None并返回需要先解析的边
+        """
+        parts = path.split('.')
+        node = None
+        for container in scope:
+            node = self.child(container, parts[0])
+            if node is not None:
+                break
+        else:
+            node = self.roots.get(parts[0])
+        for part in parts[1:]:
+            if node is None:
+                break
+            link = self._link(node)
+            if link is not None and self._state(node) != _DONE:
+                return None, link
+            node = self.child(node, part)
+        return node, None
+
+    def _pending(self, source):
+        """源节点子树中尚未解析的边（为空时记住该子树已完成）"""
+        if self.complete.get(id(source)) is source:
+            return []
+        pending = []
+        self._collect_pending(source, pending)
+        if not pending:
+            self.complete[id(source)] = source
+        return pending
+
+    def _collect_pending(self, node, pending):
+        link = self._link(node)
+        if link is not None and self._state(node) != _DONE:
+            pending.append(link)
+        for child in self.children(node):
+            self._collect_pending(child, pending)
+
+    def resolve(self, link):
+        """
+        解析一条边（用显式的栈代替递归，派生链再深也不会超出递归深度）
+
+        先解析源节点和源子树中的边，全部完成后再继承。
+        遇到循环引用时发出 DerivationCycleWarning（列出整个环），环上的节点不继承，
+        依赖环上节点的其他节点照常继承。
+        """
+        stack = [link]
+        while stack:
+            link = stack[-1]
+            node = link.node
+            state = self._state(node)
+            if state == _DONE:
+                stack.pop()
+                continue
+            if state is None:
+                self.state[id(node)] = (node, _ACTIVE)
+
+            source, blocker = self.find(link.path, link.scope)
+            if blocker is not None:
+                dependencies = [blocker]
+            elif source is node:
+                self._break_cycle(stack, len(stack) - 1, node)
+                continue
+            elif source is not None and type(source) is type(node):
+                dependencies = self._pending(source)
+            else:
+                dependencies = []
+
+            if dependencies:
+                for dependency in dependencies:
+                    if self._state(dependency.node) == _ACTIVE:
+                        # 正在解析的节点都在栈中：从它到栈顶就是整个环
+                        start = next((i for i, item in enumerate(stack)
+                                      if item.node is dependency.node), len(stack) - 1)
+                        self._break_cycle(stack, start, dependency.node)
+                        break
+                    stack.append(dependency)
+                continue
+
+            if source is not None and type(source) is type(node):
+                self._inherit(node, source, link.explicit)
+            self.state[id(node)] = (node, _DONE)
+            stack.pop()
+
+    def _break_cycle(self, stack, start, closing):
+        """报告 stack[start:] 组成的环，这些节点不继承、直接标记为已完成"""
+        chain = ' -> '.join([item.node.name for item in stack[start:]] + [closing.name])
+        warnings.warn(f'derivedFrom 循环引用，忽略继承: {chain}', DerivationCycleWarning,
+                      stacklevel=2)
+        for item in stack[start:]:
+            self.state[id(item.node)] = (item.node, _DONE)
+        del stack[start:]
+
+    def _inherit(self, node, source, explicit):
+        """
+        继承源节点中未显式给出的属性
+
+        寄存器树、位域元组等都直接共用源节点的不可变对象。
+        """
+        if isinstance(node, Peripheral):
+            if not node.description:
+                node.description = source.description
+            node.registers = _merge_children(self.children(source), node.registers)
+        elif isinstance(node, Cluster):
+            for tag, attr in _CLUSTER_INHERIT:
+                if tag not in explicit:
+                    setattr(node, attr, getattr(source, attr))
+            node.children = _merge_children(source.children, node.children)
+        elif isinstance(node, Register):
+            for tag, attr in _REGISTER_INHERIT:
+                if tag not in explicit:
+                    setattr(node, attr, getattr(source, attr))
+        else:
+            for tag, attr in _FIELD_INHERIT:
+                if tag not in explicit:
+                    setattr(node, attr, getattr(source, attr))
+            if not explicit & _FIELD_BIT_TAGS:
+                node.lsb, node.msb = source.lsb, source.msb
+        self._names.pop(id(node), None)
+
+    def finish(self, peripheral):
+        """解析外设内的所有 derivedFrom，然后把寄存器树展开为寄存器"""
+        entry = self.owned.pop(id(peripheral), None)
+        if entry is not None and entry[0] is peripheral:
+            for link in entry[1]:
+                self.resolve(link)
+
+        tree = peripheral.registers
+        if peripheral.name in self.wanted:
+            self.trees[id(peripheral)] = (peripheral, tree)
+            self.finished.add(peripheral.name)
+        entry = self.flat.get(id(tree))
+        if entry is not None and entry[0] is tree:
+            peripheral.registers = entry[1]
+            return
+        peripheral.registers = _flatten_registers(tree)
+        if peripheral.registers is not tree:
+            self.flat[id(tree)] = (tree, peripheral.registers)
+
+
+def _prescan_bytes(data):
+    """内存中的文件内容里所有 derivedFrom 路径的第一级名称"""
+    return {m.split(b'.', 1)[0].decode('utf-8') for m in _DERIVED_FROM_RE.findall(data)}
+
+
+def escape_bare_amp(data):
+    """把文件内容中未转义的 & 转义为 &amp;（部分ARM官方SVD的文本中有 "FP & MVE" 这样的写法）"""
+    return _BARE_AMP_RE.sub(b'&amp;', data)
+
+
+def prescan(svd_file):
+    """
+    预扫描文件中所有 derivedFrom 路径的第一级名称，并检查是否有未转义的 &
+
+    只逐行扫描原始字节，不构建DOM；流式解析时只需保留可能被引用的外设。
+
+    Returns:
+        (set, bool): 被引用的名称集合，是否包含未转义的 &
+    """
+    bases = set()
+    bare_amp = False
+    with open(svd_file, 'rb') as f:
+        for line in f:
+            if b'derivedFrom' in line:
+                bases.update(m.split(b'.', 1)[0].decode('utf-8')
+                             for m in _DERIVED_FROM_RE.findall(line))
+            if not bare_amp and b'&' in line:
+                bare_amp = _BARE_AMP_RE.search(line) is not None
+    return bases, bare_amp
+
+
+def _stream_peripherals(svd_file, device, progress=None):
+    """
+    基于 iterparse 的流式解析核心
+
+    每个 <peripheral> 结束标签出现时立即解析并清除对应的XML元素，
+    峰值内存只与最大的单个外设有关。外设内（外设、簇、寄存器、位域）的 derivedFrom
+    由 _DerivationGraph 解析；路径引用的外设若尚未出现，则暂存该外设，待其出现后再产出。
+
+    ARM CoreSight格式中 <group> 直接包含的 <registers> 作为一个基地址为0的虚拟外设产出。
+
+    Args:
+        progress: 可选回调 progress(已读字节数, 文件总字节数, 已解析外设数)，
+                  每解析完一个外设调用一次；回调抛出的异常会中止解析
+
+    Yields:
+        (int, Peripheral): 外设在文件中的序号和外设对象
+    """
+    bases, bare_amp = prescan(svd_file)
+    with open(svd_file, 'rb') as f:
+        if bare_amp:
+            # 部分ARM官方SVD的文本中有未转义的 &（如 "FP & MVE"），转义后再解析
+            data = escape_bare_amp(f.read())
+            yield from _iterparse_peripherals(io.BytesIO(data), len(data), bases, device, progress)
+        else:
+            total = os.fstat(f.fileno()).st_size
+            yield from _iterparse_peripherals(f, total, bases, device, progress)
+
+
+def _iterparse_peripherals(f, total, bases, device, progress, layouts=None):
+    """_stream_peripherals 的主体，f 为已打开的二进制文件；layouts 为沿用的布局表"""
+    graph = _DerivationGraph(bases)
+    layouts = {} if layouts is None else layouts   # 位域布局表，见 _attach_layouts
+    blocked = {}   # 尚未完成的外设名称 -> 等待它的外设序号列表
+    waiting = {}   # 序号 -> (外设对象, 还在等待的外设名称集合)
+
+    elems = []     # 当前打开的元素栈
+    device_defaults = (32, None)
+    cpu_names = {}
+    device_tags = set()   # 已读到的设备级子节点
+    index = 0
+
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        if event == 'start':
+            elems.append(elem)
+            continue
+
+        elems.pop()
+        depth = len(elems) + 1
+        tag = elem.tag
+        parent = elems[-1] if elems else None
+
+        if depth == 2:
+            if tag in DEVICE_FIELDS and elem.text is not None:
+                setattr(device, tag, elem.text)
+                device_tags.add(tag)
+            elif tag in ('size', 'resetValue'):
+                device_defaults = _register_defaults(parent, (32, None))
+            continue
+
+        if parent is None:
+            continue
+
+        if parent.tag == 'cpu' and tag in ('name', 'displayName'):
+            # ARM CoreSight格式没有设备名称时使用CPU名称（<cpu> 在寄存器组之前，产出外设时已确定）
+            cpu_names[tag] = elem.text
+            if 'name' not in device_tags:
+                device.name = cpu_names.get('displayName') or cpu_names.get('name') or 'Unknown'
+            continue
+
+        ready = []
+        if tag == 'peripheral' and parent.tag == 'peripherals':
+            # 一个外设已完整读入：转换为对象后立即释放XML元素
+            if elem.find('name') is not None:
+                defaults = device_defaults
+                if len(elems) >= 2 and elems[-2].tag == 'group':
+                    defaults = _register_defaults(elems[-2], defaults)
+                links = {}
+                peripheral_obj = _parse_peripheral(elem, defaults, links)
+                missing = graph.add(peripheral_obj, links)
+                if missing:
+                    waiting[index] = (peripheral_obj, missing)
+                    for name in missing:
+                        blocked.setdefault(name, []).append(index)
+                else:
+                    ready.append((index, peripheral_obj))
+                index += 1
+
+        elif tag == 'registers' and parent.tag == 'group':
+            # ARM CoreSight格式: group直接包含的寄存器（如Core组）
+            registers = _flatten_registers(
+                _parse_registers(elem, _register_defaults(parent, device_defaults)))
+            if registers:
+                ready.append((index, Peripheral(_text(parent, 'name', 'Unknown'),
+                                                _text(parent, 'description'),
+                                                0, registers)))
+                index += 1
+
+        else:
+            continue
+
+        elem.clear()
+        parent.remove(elem)
+
+        if progress is not None:
+            progress(f.tell(), total, index)
+
+        # 解析 derivedFrom、展开簇，计算位域布局，然后产出；
+        # 完成的外设再放行等待它的外设（派生链可以任意长地向后引用）
+        while ready:
+            item = ready.pop(0)
+            graph.finish(item[1])
+            _attach_layouts(item[1].registers, layouts)
+            yield item
+            for waiting_index in blocked.pop(item[1].name, ()):
+                waiting_obj, missing = waiting[waiting_index]
+                missing.discard(item[1].name)
+                if not missing:
+                    del waiting[waiting_index]
+                    ready.append((waiting_index, waiting_obj))
+
+    # 引用了不存在的外设（或与等待中的外设构成循环）的路径在这里解析：
+    # 前者无法继承，后者报告循环引用；其余部分照常处理
+    for waiting_index in sorted(waiting):
+        peripheral_obj = waiting[waiting_index][0]
+        graph.finish(peripheral_obj)
+        _attach_layouts(peripheral_obj.registers, layouts)
+        yield waiting_index, peripheral_obj
+
+
+def _attach_layouts(registers, layouts):
+    """
+    为寄存器计算位域布局
+
+    布局只取决于位域元组和位宽：派生外设共用的寄存器已有布局，直接跳过；
+    簇展开和 derivedFrom 产生的、共用同一位域元组的寄存器共用一个布局。
+
+    Args:
+        layouts: 本次解析的布局表 (id(位域元组), 位宽) -> (位域元组, 布局)
+    """
+    for register in registers:
+        if register.layout is not None:
+            continue
+        key = (id(register.fields), register.size)
+        entry = layouts.get(key)
+        if entry is None or entry[0] is not register.fields:
+            entry = layouts[key] = (register.fields, FieldLayout(register.fields, register.size))
+        register.layout = entry[1]
+
+
+def iter_peripherals(svd_file, device=None, progress=None):
+    """
+    流式解析SVD文件，按文件中的顺序逐个产出外设
+
+    引用了后面外设的外设暂存到可以产出为止，其余外设解析完立即产出。
+
+    Args:
+        svd_file: SVD文件路径
+        device: 可选的 Device 对象，解析过程中会填入设备名称等设备级信息
+        progress: 可选的进度回调，见 _stream_peripherals
+
+    Yields:
+        Peripheral: 外设对象（外设数组逐个产出元素）
+    """
+    if device is None:
+        device = Device()
+    pending = {}
+    next_index = 0
+    for index, peripheral_obj in _stream_peripherals(svd_file, device, progress):
+        pending[index] = peripheral_obj
+        while next_index in pending:
+            yield from pending.pop(next_index).elements()
+            next_index += 1
+    for index in sorted(pending):
+        yield from pending[index].elements()
+
+
+def load_device(svd_file, progress=None):
+    """
+    流式解析SVD文件并汇总为设备对象（外设保持文件中的顺序）
+
+    Args:
+        svd_file: SVD文件路径
+        progress: 可选的进度回调，见 _stream_peripherals
+
+    Returns:
+        Device: 设备对象
+
+    Raises:
+        ET.ParseError: XML格式错误
+        ParseCancelled: 进度回调请求取消
+    """
+    device = Device()
+    items = list(_stream_peripherals(svd_file, device, progress))
+    items.sort(key=lambda item: item[0])
+    # 外设数组展开为元素（元素与数组共用寄存器）
+    device.peripherals = [element for _, peripheral_obj in items
+                          for element in peripheral_obj.elements()]
+    return device
+
+
+# ====== 增量重新解析 ======
+
+def file_stamp(path):
+    """文件的 (修改时间, 大小)，用于轮询文件是否变化；文件不存在时返回None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _split_blocks(data):
+    """
+    把文件内容分为 <peripheral> 块和其余部分（设备信息等）
+
+    Returns:
+        (list[bytes], bytes): 外设块，去掉外设块后的其余内容
+    """
+    blocks = []
+    rest = []
+    pos = 0
+    for m in _PERIPHERAL_BLOCK_RE.finditer(data):
+        rest.append(data[pos:m.start()])
+        blocks.append(m.group())
+        pos = m.end()
+    rest.append(data[pos:])
+    return blocks, b''.join(rest)
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class IncrementalLoader:
+    """
+    监视模式下的增量重新解析
+
+    记住每个 <peripheral> 块的内容哈希和解析出的外设；文件保存后只重新解析内容变化的块，
+    其余外设沿用原来的对象（GUI据此原地更新树）。以下情况退回完整解析：
+    外设块以外的内容（设备信息、默认值）变化，变化的块涉及 derivedFrom（自身有派生，
+    或被其他外设引用），或文件结构无法与外设一一对应（如ARM CoreSight格式）。
+    """
+
+    def __init__(self, svd_file):
+        self.svd_file = svd_file
+        self.device = None
+        self._rest = None      # 外设块以外内容的哈希
+        self._blocks = None    # [(块哈希, 外设块名称, (外设, ...))]，不支持增量时为None
+        self._bases = set()    # 被 derivedFrom 引用的外设名称
+        self._defaults = (32, None)
+        self._layouts = {}     # 位域布局表，见 _attach_layouts（增量解析的外设沿用）
+
+    def load(self, progress=None):
+        """
+        完整解析文件并记住每个外设块
+
+        Returns:
+            Device: 设备对象
+        """
+        with open(self.svd_file, 'rb') as f:
+            data = f.read()
+        return self._load(data, progress)
+
+    def _load(self, data, progress):
+        # 哈希和解析使用同一份内容，避免读取之间文件再次被修改
+        source = _BARE_AMP_RE.sub(b'&amp;', data)
+        self._bases = _prescan_bytes(data)
+        self._layouts = {}
+        device = Device()
+        items = sorted(_iterparse_peripherals(io.BytesIO(source), len(source), self._bases,
+                                              device, progress, self._layouts),
+                       key=lambda item: item[0])
+        device.peripherals = [element for _, peripheral_obj in items
+                              for element in peripheral_obj.elements()]
+        self.device = device
+        self._remember(data, items)
+        return device
+
+    def _remember(self, data, items):
+        blocks, rest = _split_blocks(data)
+        self._rest = _digest(rest)
+        self._blocks = None
+        if len(blocks) != len(items) or b'<group' in rest:
+            return
+        entries = []
+        for block, (_, peripheral_obj) in zip(blocks, items):
+            m = _BLOCK_NAME_RE.search(block)
+            if m is None or m.group(1).decode('utf-8', 'replace') != peripheral_obj.name:
+                return
+            entries.append((_digest(block), peripheral_obj.name, tuple(peripheral_obj.elements())))
+        root = ET.fromstring(_BARE_AMP_RE.sub(b'&amp;', rest))
+        self._defaults = _register_defaults(root, (32, None))
+        self._blocks = entries
+
+    def reload(self, progress=None):
+        """
+        文件变化后重新解析
+
+        Returns:
+            (Device, int): 新的设备对象（未变化的外设是原来的对象），重新解析的外设块数；
+                           完整解析时块数为 -1，内容没有变化时返回 (原设备, 0)
+
+        Raises:
+            ET.ParseError: XML格式错误（保持原来的状态，下次保存后再试）
+        """
+        with open(self.svd_file, 'rb') as f:
+            data = f.read()
+        if self._blocks is None:
+            return self._load(data, progress), -1
+        blocks, rest = _split_blocks(data)
+        if _digest(rest) != self._rest:
+            return self._load(data, progress), -1
+
+        old = {}
+        for entry in self._blocks:
+            old.setdefault(entry[0], []).append(entry)
+        bases = _prescan_bytes(data) | self._bases
+        entries = []
+        changed = []
+        for block in blocks:
+            digest = _digest(block)
+            same = old.get(digest)
+            if same:
+                entries.append(same.pop(0))
+                continue
+            m = _BLOCK_NAME_RE.search(block)
+            name = m.group(1).decode('utf-8', 'replace') if m else None
+            if name is None or name in bases or b'derivedFrom' in block:
+                return self._load(data, progress), -1
+            entries.append(None)
+            changed.append((len(entries) - 1, digest, block))
+        if any(entry[1] in bases for rest_entries in old.values() for entry in rest_entries):
+            return self._load(data, progress), -1   # 删除了被引用的外设
+        if not changed and entries == self._blocks:
+            return self.device, 0
+
+        for position, digest, block in changed:
+            elem = ET.fromstring(_BARE_AMP_RE.sub(b'&amp;', block))
+            links = {}
+            peripheral_obj = _parse_peripheral(elem, self._defaults, links)
+            graph = _DerivationGraph(set())
+            graph.add(peripheral_obj, links)
+            graph.finish(peripheral_obj)
+            elements = tuple(peripheral_obj.elements())
+            for element in elements:
+                _attach_layouts(element.registers, self._layouts)
+            entries[position] = (digest, peripheral_obj.name, elements)
+
+        old_device = self.device
+        device = Device(old_device.name, old_device.vendor, old_device.version,
+                        old_device.description,
+                        [element for entry in entries for element in entry[2]])
+        self.device = device
+        self._blocks = entries
+        return device, len(changed)
+
+
+def open_cache():
+    """打开命令行与GUI共用的解析结果缓存"""
+    return svd_cache.SVDCache(version=PARSER_VERSION)
+
+
+def load_device_cached(svd_file, cache=None, progress=None):
+    """
+    解析SVD文件，文件未变化时直接读取磁盘缓存
+
+    Args:
+        svd_file: SVD文件路径
+        cache: SVDCache 对象，默认使用 open_cache()
+        progress: 可选的进度回调（命中缓存时不会被调用），见 _stream_peripherals
+
+    Returns:
+        Device: 设备对象
+    """
+    if cache is None:
+        cache = open_cache()
+    if progress is None:
+        return cache.load(svd_file, load_device)
+    return cache.load(svd_file, lambda path: load_device(path, progress))
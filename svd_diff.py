@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD结构比较
+比较两个SVD文件（同一器件的两个版本或同一系列的两个器件）的外设、寄存器和位域。
+
+外设和寄存器都先比较内容指纹，指纹相同的子树直接跳过；配对用名称（其次是地址/偏移/位置）
+的字典完成，总耗时与文件大小接近线性。结果为结构化的增加/删除/修改报告，
+可输出为文本或JSON。
+"""
+
+import hashlib
+
+from svd_core import format_address, format_offset, format_value, register_fingerprint
+
+
+class _Fingerprints:
+    """寄存器指纹，以 id() 为键记忆（派生外设共用的寄存器只计算一次）"""
+
+    def __init__(self, descriptions):
+        self.descriptions = descriptions
+        self._registers = {}   # id(寄存器) -> (寄存器, 指纹)
+        self._tuples = {}      # id(寄存器元组) -> (寄存器元组, 指纹)
+
+    def register(self, register):
+        entry = self._registers.get(id(register))
+        if entry is None or entry[0] is not register:
+            entry = (register, register_fingerprint(register, self.descriptions))
+            self._registers[id(register)] = entry
+        return entry[1]
+
+    def registers(self, registers):
+        entry = self._tuples.get(id(registers))
+        if entry is None or entry[0] is not registers:
+            h = hashlib.blake2b(digest_size=16)
+            for register in registers:
+                h.update(self.register(register).encode('ascii'))
+            entry = (registers, h.hexdigest())
+            self._tuples[id(registers)] = entry
+        return entry[1]
+
+
+def _pair(old_items, new_items, name, fallback):
+    """
+    按名称配对，剩下的再按 fallback（地址、偏移等）配对，只配对唯一对应的项
+
+    Returns:
+        (list, list, list): [(旧, 新)], 删除的旧项, 增加的新项
+    """
+    new_by_name = {}
+    for item in new_items:
+        new_by_name.setdefault(name(item), item)
+    pairs = []
+    removed = []
+    matched = set()
+    for item in old_items:
+        other = new_by_name.get(name(item))
+        if other is not None and id(other) not in matched:
+            pairs.append((item, other))
+            matched.add(id(other))
+        else:
+            removed.append(item)
+    added = [item for item in new_items if id(item) not in matched]
+    if not removed or not added:
+        return pairs, removed, added
+
+    # 改名：剩余项中 fallback 值唯一且相同的视为同一项
+    by_key = {}
+    for item in added:
+        by_key.setdefault(fallback(item), []).append(item)
+    still_removed = []
+    for item in removed:
+        candidates = by_key.get(fallback(item))
+        if candidates and len(candidates) == 1:
+            other = candidates.pop()
+            pairs.append((item, other))
+            matched.add(id(other))
+        else:
+            still_removed.append(item)
+    added = [item for item in added if id(item) not in matched]
+    return pairs, still_removed, added
+
+
+def _changes(old, new, attributes):
+    """列出不同的属性: {属性: [旧值, 新值]}"""
+    changes = {}
+    for attr in attributes:
+        a, b = getattr(old, attr), getattr(new, attr)
+        if a != b:
+            changes[attr] = [a, b]
+    return changes
+
+
+def _dim(item):
+    dim = item.dim
+    return None if dim is None else [dim.count, dim.increment]
+
+
+def _field_info(field):
+    return {'name': field.name, 'lsb': field.lsb, 'msb': field.msb, 'access': field.access}
+
+
+def _register_info(peripheral, register):
+    return {'name': register.name, 'address': peripheral.address_of(register),
+            'size': register.size, 'reset_value': register.reset_value}
+
+
+def _peripheral_info(peripheral):
+    return {'name': peripheral.name, 'base_address': peripheral.base_address}
+
+
+def diff_fields(old_register, new_register, descriptions=False):
+    """比较两个寄存器的位域，没有差异时返回None"""
+    attributes = ('lsb', 'msb', 'access') + (('description',) if descriptions else ())
+    pairs, removed, added = _pair(old_register.fields, new_register.fields,
+                                  lambda f: f.name, lambda f: (f.lsb, f.msb))
+    changed = []
+    for old, new in pairs:
+        changes = _changes(old, new, attributes)
+        if old.name != new.name:
+            changes['name'] = [old.name, new.name]
+        if _dim(old) != _dim(new):
+            changes['dim'] = [_dim(old), _dim(new)]
+        if changes:
+            changed.append({'name': new.name, 'changes': changes})
+    if not (changed or removed or added):
+        return None
+    return {'added': [_field_info(f) for f in added],
+            'removed': [_field_info(f) for f in removed],
+            'changed': changed}
+
+
+def diff_registers(old_peripheral, new_peripheral, fingerprints):
+    """比较两个外设的寄存器（只深入指纹不同的寄存器），没有差异时返回None"""
+    descriptions = fingerprints.descriptions
+    attributes = ('offset', 'size', 'reset_value') + (('description',) if descriptions else ())
+    pairs, removed, added = _pair(old_peripheral.registers, new_peripheral.registers,
+                                  lambda r: r.name, lambda r: r.offset)
+    changed = []
+    for old, new in pairs:
+        if fingerprints.register(old) == fingerprints.register(new):
+            continue
+        changes = _changes(old, new, attributes)
+        if old.name != new.name:
+            changes['name'] = [old.name, new.name]
+        if _dim(old) != _dim(new):
+            changes['dim'] = [_dim(old), _dim(new)]
+        fields = diff_fields(old, new, descriptions)
+        if changes or fields:
+            entry = _register_info(new_peripheral, new)
+            entry['changes'] = changes
+            entry['fields'] = fields
+            changed.append(entry)
+    if not (changed or removed or added):
+        return None
+    return {'added': [_register_info(new_peripheral, r) for r in added],
+            'removed': [_register_info(old_peripheral, r) for r in removed],
+            'changed': changed}
+
+
+def diff_devices(old_device, new_device, descriptions=False):
+    """
+    比较两个设备
+
+    Args:
+        descriptions: 是否比较描述文本（默认只比较结构：地址、大小、复位值、位范围、访问类型）
+
+    Returns:
+        dict: {'device': 设备属性的变化, 'peripherals': {'added', 'removed', 'changed'}}
+    """
+    fingerprints = _Fingerprints(descriptions)
+    attributes = ('base_address',) + (('description',) if descriptions else ())
+    pairs, removed, added = _pair(old_device.peripherals, new_device.peripherals,
+                                  lambda p: p.name, lambda p: p.base_address)
+    changed = []
+    for old, new in pairs:
+        changes = _changes(old, new, attributes)
+        if old.name != new.name:
+            changes['name'] = [old.name, new.name]
+        registers = None
+        if (old.registers is not new.registers
+                and fingerprints.registers(old.registers) != fingerprints.registers(new.registers)):
+            registers = diff_registers(old, new, fingerprints)
+        if changes or registers:
+            entry = _peripheral_info(new)
+            entry['changes'] = changes
+            entry['registers'] = registers
+            changed.append(entry)
+    return {
+        'device': _changes(old_device, new_device, ('name', 'version')),
+        'peripherals': {'added': [_peripheral_info(p) for p in added],
+                        'removed': [_peripheral_info(p) for p in removed],
+                        'changed': changed},
+    }
+
+
+def is_empty(report):
+    """比较结果是否没有任何差异"""
+    peripherals = report['peripherals']
+    return not (report['device'] or peripherals['added'] or peripherals['removed']
+                or peripherals['changed'])
+
+
+# ====== 文本格式 ======
+
+# 文本报告中描述等字符串值最多显示的字符数
+MAX_TEXT_WIDTH = 60
+
+
+def _one_line(text):
+    """字符串值压缩为一行（与头文件注释相同的空白处理），过长时截断"""
+    text = ' '.join(text.split())
+    if len(text) > MAX_TEXT_WIDTH:
+        text = text[:MAX_TEXT_WIDTH - 1] + '…'
+    return text
+
+
+def _format_change(attr, old, new, size=32):
+    if isinstance(old, str) or isinstance(new, str):
+        old = _one_line(old or '')
+        new = _one_line(new or '')
+    elif attr in ('base_address',):
+        old, new = format_address(old), format_address(new)
+    elif attr == 'offset':
+        old, new = format_offset(old), format_offset(new)
+    elif attr == 'reset_value':
+        old = '未给出' if old is None else format_value(old, size)
+        new = '未给出' if new is None else format_value(new, size)
+    return f"{attr} {old} -> {new}"
+
+
+def _bits(info):
+    if info['msb'] == info['lsb']:
+        return f"[{info['lsb']}]"
+    return f"[{info['msb']}:{info['lsb']}]"
+
+
+def format_text(report, old_label, new_label):
+    """
+    比较结果的文本形式
+
+    Returns:
+        list[str]: 输出行
+    """
+    lines = [f"--- {old_label}", f"+++ {new_label}"]
+    for attr, (old, new) in report['device'].items():
+        lines.append(f"~ 设备 {_format_change(attr, old, new).replace(' ', ': ', 1)}")
+
+    peripherals = report['peripherals']
+    for info in peripherals['removed']:
+        lines.append(f"- 外设 {info['name']} @ {format_address(info['base_address'])}")
+    for info in peripherals['added']:
+        lines.append(f"+ 外设 {info['name']} @ {format_address(info['base_address'])}")
+    for entry in peripherals['changed']:
+        changes = ', '.join(_format_change(attr, old, new)
+                            for attr, (old, new) in entry['changes'].items())
+        lines.append(f"~ 外设 {entry['name']}" + (f": {changes}" if changes else ''))
+        registers = entry['registers']
+        if registers is None:
+            continue
+        for info in registers['removed']:
+            lines.append(f"    - 寄存器 {info['name']} @ {format_address(info['address'])}")
+        for info in registers['added']:
+            lines.append(f"    + 寄存器 {info['name']} @ {format_address(info['address'])}")
+        for reg in registers['changed']:
+            changes = ', '.join(_format_change(attr, old, new, reg['size'])
+                                for attr, (old, new) in reg['changes'].items())
+            lines.append(f"    ~ 寄存器 {reg['name']} @ {format_address(reg['address'])}"
+                         + (f": {changes}" if changes else ''))
+            fields = reg['fields']
+            if fields is None:
+                continue
+            for info in fields['removed']:
+                lines.append(f"        - 位域 {info['name']} {_bits(info)} {info['access']}")
+            for info in fields['added']:
+                lines.append(f"        + 位域 {info['name']} {_bits(info)} {info['access']}")
+            for field in fields['changed']:
+                changes = ', '.join(_format_change(attr, old, new)
+                                    for attr, (old, new) in field['changes'].items())
+                lines.append(f"        ~ 位域 {field['name']}: {changes}")
+
+    if is_empty(report):
+        lines.append("没有差异")
+    else:
+        lines.append(f"外设: +{len(peripherals['added'])} -{len(peripherals['removed'])} "
+                     f"~{len(peripherals['changed'])}")
+    return lines
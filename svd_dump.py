@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD内存转储解码
+把从目标板读出的外设内存（带基地址的二进制文件或 Intel HEX 文件）一次性解码为
+所有被覆盖的寄存器和位域的值。
+
+每个设备预先构建一次解码表：寄存器的地址和字节数、位域所属的寄存器、移位和掩码。
+解码时先按地址批量取出寄存器值，再用移位/掩码表一次算出全部位域的值；
+安装了 NumPy 时用数组运算，否则用 array/memoryview 实现同样的流程。
+"""
+
+import json
+import os
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy as np
+except ImportError:     # NumPy 是可选依赖
+    np = None
+
+from svd_core import format_address, format_value
+
+
+# 按 Intel HEX 格式读取的文件扩展名
+HEX_EXTENSIONS = ('.hex', '.ihx', '.ihex')
+
+# NumPy 路径能处理的最大寄存器字节数（更宽的寄存器逐个用 int.from_bytes 解码）
+_MAX_VECTOR_BYTES = 8
+
+
+class MemoryImage:
+    """内存映像：按起始地址排序、互不相邻的连续数据段"""
+
+    def __init__(self, segments=()):
+        self.segments = []      # [(起始地址, bytes)]
+        chunks = sorted(segments, key=lambda segment: segment[0])
+        for start, data in chunks:
+            if self.segments:
+                last_start, last_data = self.segments[-1]
+                last_end = last_start + len(last_data)
+                if start <= last_end:
+                    # 相邻或重叠的段合并，重叠部分以后出现的数据为准
+                    merged = bytearray(last_data)
+                    merged[start - last_start:] = data
+                    if start + len(data) < last_end:
+                        merged += last_data[start + len(data) - last_start:]
+                    self.segments[-1] = (last_start, bytes(merged))
+                    continue
+            self.segments.append((start, bytes(data)))
+
+    def __len__(self):
+        return sum(len(data) for _, data in self.segments)
+
+    def read(self, address, size):
+        """读取 [address, address+size) 的数据，未完全覆盖时返回None"""
+        for start, data in self.segments:
+            if start <= address and address + size <= start + len(data):
+                return data[address - start:address - start + size]
+        return None
+
+
+def load_binary(path, base_address):
+    """读取二进制转储文件，文件第一个字节对应 base_address"""
+    with open(path, 'rb') as f:
+        return MemoryImage([(base_address, f.read())])
+
+
+def load_intel_hex(path):
+    """
+    读取 Intel HEX 文件（支持 00/01/02/04 记录，03/05 启动地址记录忽略）
+
+    Raises:
+        ValueError: 格式或校验和错误
+    """
+    segments = []
+    base = 0
+    start = None
+    chunk = bytearray()
+    with open(path, 'r', encoding='ascii') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if line[0] != ':':
+                    raise ValueError("缺少起始冒号")
+                record = bytes.fromhex(line[1:])
+                if len(record) < 5 or len(record) != record[0] + 5:
+                    raise ValueError("记录长度不符")
+                if sum(record) & 0xFF:
+                    raise ValueError("校验和错误")
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_no}: {e}") from None
+            kind = record[3]
+            payload = record[4:-1]
+            if kind == 0x00:
+                address = base + ((record[1] << 8) | record[2])
+                if start is None or address != start + len(chunk):
+                    if chunk:
+                        segments.append((start, bytes(chunk)))
+                    start, chunk = address, bytearray()
+                chunk += payload
+            elif kind == 0x01:
+                break
+            elif kind == 0x02:
+                base = int.from_bytes(payload, 'big') << 4
+            elif kind == 0x04:
+                base = int.from_bytes(payload, 'big') << 16
+    if chunk:
+        segments.append((start, bytes(chunk)))
+    return MemoryImage(segments)
+
+
+def load_dump(path, base_address=None):
+    """
+    按文件扩展名读取内存转储
+
+    Raises:
+        ValueError: 二进制文件未给出基地址，或 HEX 文件格式错误
+    """
+    if os.path.splitext(path)[1].lower() in HEX_EXTENSIONS:
+        return load_intel_hex(path)
+    if base_address is None:
+        raise ValueError("二进制转储文件需要给出基地址")
+    return load_binary(path, base_address)
+
+
+class DecodeTables:
+    """
+    设备的解码表（每个设备构建一次）
+
+    寄存器按地址排序；位域按所属寄存器连续存放，field_start[i]:field_start[i+1]
+    是第 i 个寄存器的位域。
+    """
+
+    def __init__(self, device):
+        entries = []
+        for peripheral in device.peripherals:
+            for instance in peripheral.elements():
+                for register in instance.iter_registers():
+                    entries.append((instance.address_of(register), instance, register))
+        entries.sort(key=lambda entry: entry[0])
+
+        self.peripherals = [entry[1] for entry in entries]
+        self.registers = [entry[2] for entry in entries]
+        self.addresses = array('Q', (entry[0] for entry in entries))
+        self.sizes = array('B', (min(register.size_bytes, 255) for register in self.registers))
+        self.fields = []
+        field_start = array('I', [0])
+        shifts = array('B')
+        masks = []
+        for register in self.registers:
+            for field in register.iter_fields():
+                if field.width <= 0 or field.lsb < 0:
+                    continue
+                self.fields.append(field)
+                shifts.append(field.lsb)
+                masks.append((1 << field.width) - 1)
+            field_start.append(len(self.fields))
+        self.field_start = field_start
+        self.shifts = shifts
+        self.masks = masks      # Python 整数（位域可能宽于64位）
+        self.masks64 = array('Q', (min(mask, 0xFFFFFFFFFFFFFFFF) for mask in masks))
+
+    def __len__(self):
+        return len(self.registers)
+
+
+def decode_tables(device):
+    """获取设备的解码表（首次调用时构建，之后复用）"""
+    return device.memo('dump_tables', DecodeTables)
+
+
+def _covered(tables, image):
+    """被内存映像完全覆盖的寄存器: [(寄存器下标, 段数据, 段内偏移)]，按地址排序"""
+    addresses = tables.addresses
+    sizes = tables.sizes
+    covered = []
+    for start, data in image.segments:
+        end = start + len(data)
+        i = bisect_left(addresses, start)
+        while i < len(addresses) and addresses[i] < end:
+            if addresses[i] + sizes[i] <= end:
+                covered.append((i, data, addresses[i] - start))
+            i += 1
+    return covered
+
+
+def _decode_python(tables, covered, byteorder):
+    """纯 Python 实现：memoryview 切片取寄存器值，移位/掩码表算位域值"""
+    values = {}
+    for i, data, offset in covered:
+        view = memoryview(data)
+        values[i] = int.from_bytes(view[offset:offset + tables.sizes[i]], byteorder)
+    field_start = tables.field_start
+    shifts = tables.shifts
+    masks = tables.masks
+    field_values = {}
+    for i, value in values.items():
+        for f in range(field_start[i], field_start[i + 1]):
+            field_values[f] = (value >> shifts[f]) & masks[f]
+    return values, field_values
+
+
+def _decode_numpy(tables, covered, byteorder):
+    """NumPy 实现：按字节位置批量拼出寄存器值，再对所有位域做一次移位和掩码"""
+    narrow = [entry for entry in covered if tables.sizes[entry[0]] <= _MAX_VECTOR_BYTES]
+    values, field_values = _decode_python(
+        tables, [entry for entry in covered if tables.sizes[entry[0]] > _MAX_VECTOR_BYTES],
+        byteorder)
+    if not narrow:
+        return values, field_values
+
+    # 所有段拼成一个字节数组，寄存器位置换算为其中的下标
+    buffers = {}
+    parts = []
+    position = 0
+    for _, data, _ in narrow:
+        if id(data) not in buffers:
+            buffers[id(data)] = position
+            parts.append(np.frombuffer(data, dtype=np.uint8))
+            position += len(data)
+    buffer = np.concatenate(parts)
+    index = np.fromiter((entry[0] for entry in narrow), dtype=np.int64, count=len(narrow))
+    offsets = np.fromiter((buffers[id(entry[1])] + entry[2] for entry in narrow),
+                          dtype=np.int64, count=len(narrow))
+    sizes = np.asarray(tables.sizes)[index]
+
+    reg_values = np.zeros(len(narrow), dtype=np.uint64)
+    for k in range(int(sizes.max())):
+        selected = sizes > k
+        if byteorder == 'little':
+            weights = np.uint64(8 * k)
+        else:
+            # 大端：第 k 个字节的权重取决于寄存器自己的字节数
+            weights = (8 * (sizes[selected].astype(np.int64) - 1 - k)).astype(np.uint64)
+        reg_values[selected] |= buffer[offsets[selected] + k].astype(np.uint64) << weights
+
+    # 位域：只取位于被覆盖寄存器上的那些
+    field_start = np.asarray(tables.field_start).astype(np.int64)
+    counts = field_start[index + 1] - field_start[index]
+    fields = np.repeat(field_start[index] - np.cumsum(counts) + counts, counts) \
+        + np.arange(int(counts.sum()), dtype=np.int64)
+    owners = np.repeat(np.arange(len(narrow)), counts)
+    shifts = np.asarray(tables.shifts)[fields].astype(np.uint64)
+    masks = np.asarray(tables.masks64)[fields]
+    decoded = (reg_values[owners] >> shifts) & masks
+
+    values.update(zip(index.tolist(), reg_values.tolist()))
+    field_values.update(zip(fields.tolist(), decoded.tolist()))
+    return values, field_values
+
+
+class DecodedRegister:
+    """一个寄存器的解码结果"""
+
+    __slots__ = ('peripheral', 'register', 'address', 'value', 'fields')
+
+    def __init__(self, peripheral, register, address, value, fields):
+        self.peripheral = peripheral
+        self.register = register
+        self.address = address
+        self.value = value
+        self.fields = fields    # [(位域, 值)]
+
+    def to_dict(self):
+        return {'peripheral': self.peripheral.name, 'register': self.register.name,
+                'address': self.address, 'size': self.register.size, 'value': self.value,
+                'fields': {field.name: value for field, value in self.fields}}
+
+
+def decode_image(device, image, byteorder='little', use_numpy=True):
+    """
+    解码内存映像中被完全覆盖的所有寄存器
+
+    Args:
+        byteorder: 'little' 或 'big'
+        use_numpy: NumPy 可用时是否使用
+
+    Returns:
+        list[DecodedRegister]: 按地址排序
+    """
+    tables = decode_tables(device)
+    covered = _covered(tables, image)
+    if use_numpy and np is not None:
+        values, field_values = _decode_numpy(tables, covered, byteorder)
+    else:
+        values, field_values = _decode_python(tables, covered, byteorder)
+
+    result = []
+    fields = tables.fields
+    for i, _, _ in covered:
+        span = range(tables.field_start[i], tables.field_start[i + 1])
+        result.append(DecodedRegister(tables.peripherals[i], tables.registers[i],
+                                      tables.addresses[i], values[i],
+                                      [(fields[f], field_values[f]) for f in span]))
+    return result
+
+
+def format_text(decoded):
+    """
+    解码结果的文本形式
+
+    Returns:
+        list[str]: 输出行
+    """
+    lines = []
+    for item in decoded:
+        register = item.register
+        lines.append(f"{item.peripheral.name}.{register.name:<24} "
+                     f"{format_address(item.address)} = {format_value(item.value, register.size)}")
+        for field, value in item.fields:
+            lines.append(f"    [{field.bit_range():>5}] {field.name:<20} "
+                         f"0x{value:X} ({value})")
+    return lines
+
+
+def format_json(device, decoded):
+    """解码结果的JSON文本（数值保持为整数）"""
+    return json.dumps({'device': device.name,
+                       'registers': [item.to_dict() for item in decoded]},
+                      ensure_ascii=False, indent=1)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD导出
+命令行和GUI共用的导出引擎：外设逐个经过行生成器交给写出器，支持文本、CSV、JSON Lines
+三种格式，可选每个位域一行。既可以导出已加载的设备，也可以直接接在流式解析器后面，
+导出整个目录时内存占用与文件数量无关。
+"""
+
+import csv
+import json
+import os
+
+from svd_core import Device, format_address, format_offset, format_value, iter_peripherals
+
+
+# 输出文件的缓冲区大小：每个外设的内容拼接后一次写入
+EXPORT_BUFFER = 1 << 16
+
+# 寄存器行的列，导出位域时在后面追加 FIELD_COLUMNS
+REGISTER_COLUMNS = ('device', 'peripheral', 'register', 'address', 'offset', 'size',
+                    'reset_value', 'description')
+FIELD_COLUMNS = ('field', 'lsb', 'msb', 'access', 'field_description')
+
+
+def iter_rows(device_name, peripheral, fields=False):
+    """
+    外设的导出行（按 REGISTER_COLUMNS [+ FIELD_COLUMNS] 排列的元组）
+
+    导出位域时每个位域一行，没有位域的寄存器输出一行空的位域列。
+    """
+    for register in peripheral.iter_registers():
+        row = (device_name, peripheral.name, register.name, peripheral.address_of(register),
+               register.offset, register.size, register.reset_value, register.description)
+        if not fields:
+            yield row
+            continue
+        empty = True
+        for field in register.iter_fields():
+            empty = False
+            yield row + (field.name, field.lsb, field.msb, field.access, field.description)
+        if empty:
+            yield row + (None, None, None, None, None)
+
+
+class TextWriter:
+    """与原先 svd_parse.py / GUI 导出相同的文本格式，导出位域时在寄存器下缩进列出"""
+
+    def __init__(self, out, fields=False):
+        self.out = out
+        self.fields = fields
+
+    def begin_device(self, device_name):
+        self.out.write(f"Device: {device_name}\n" + "=" * 100 + "\n\n")
+
+    def write_peripheral(self, device_name, peripheral):
+        lines = [f"\n外设: {peripheral.name}\n",
+                 f"基地址: {format_address(peripheral.base_address)}\n",
+                 f"描述: {peripheral.description}\n",
+                 f"寄存器数量: {peripheral.register_count()}\n",
+                 "-" * 100 + "\n"]
+        if peripheral.registers:
+            lines.append(f"{'寄存器名称':<30} {'地址':<15} {'偏移':<15} {'描述'}\n")
+            lines.append("-" * 100 + "\n")
+            for register in peripheral.iter_registers():
+                lines.append(f"{register.name:<30} "
+                             f"{format_address(peripheral.address_of(register)):<15} "
+                             f"{format_offset(register.offset):<15} {register.description}\n")
+                if self.fields:
+                    for field in register.iter_fields():
+                        lines.append(f"    [{field.bit_range():>5}] {field.name:<20} "
+                                     f"{field.access:<12} {field.description}\n")
+        lines.append("\n")
+        self.out.write(''.join(lines))
+
+
+class CsvWriter:
+    """CSV，地址、偏移、复位值为十六进制文本；多个设备共用一个表头"""
+
+    def __init__(self, out, fields=False):
+        self.fields = fields
+        self.writer = csv.writer(out)
+        self.writer.writerow(REGISTER_COLUMNS + (FIELD_COLUMNS if fields else ()))
+
+    def begin_device(self, device_name):
+        pass
+
+    def write_peripheral(self, device_name, peripheral):
+        self.writer.writerows(self._format(row)
+                              for row in iter_rows(device_name, peripheral, self.fields))
+
+    @staticmethod
+    def _format(row):
+        size = row[5]
+        reset_value = row[6]
+        return (row[0], row[1], row[2], format_address(row[3]), format_offset(row[4]), size,
+                '' if reset_value is None else format_value(reset_value, size)) + row[7:]
+
+
+class JsonLinesWriter:
+    """JSON Lines，每行一个对象，数值保持为整数"""
+
+    def __init__(self, out, fields=False):
+        self.out = out
+        self.fields = fields
+        self.columns = REGISTER_COLUMNS + (FIELD_COLUMNS if fields else ())
+
+    def begin_device(self, device_name):
+        pass
+
+    def write_peripheral(self, device_name, peripheral):
+        columns = self.columns
+        self.out.write(''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                               for row in iter_rows(device_name, peripheral, self.fields)))
+
+
+# 导出格式: 名称 -> 写出器类
+FORMATS = {
+    'text': TextWriter,
+    'csv': CsvWriter,
+    'jsonl': JsonLinesWriter,
+}
+
+# 文件扩展名 -> 导出格式
+EXTENSIONS = {
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.json': 'jsonl',
+}
+
+
+def format_for_path(path, default='text'):
+    """根据输出文件的扩展名选择导出格式"""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+
+
+def open_output(path):
+    """以导出使用的缓冲区大小打开输出文件（CSV 需要 newline=''）"""
+    return open(path, 'w', encoding='utf-8', newline='', buffering=EXPORT_BUFFER)
+
+
+def make_writer(out, fmt='text', fields=False):
+    """
+    创建写出器
+
+    Raises:
+        ValueError: 不支持的格式
+    """
+    try:
+        writer_class = FORMATS[fmt]
+    except KeyError:
+        raise ValueError(f"不支持的导出格式: {fmt}") from None
+    return writer_class(out, fields)
+
+
+def export_device(device, writer, progress=None):
+    """
+    导出已加载的设备
+
+    Args:
+        progress: 可选回调 progress(已导出外设数, 外设总数)，回调抛出的异常会中止导出
+    """
+    writer.begin_device(device.name)
+    total = len(device.peripherals)
+    for done, peripheral in enumerate(device.peripherals, 1):
+        writer.write_peripheral(device.name, peripheral)
+        if progress is not None:
+            progress(done, total)
+
+
+def export_svd_file(svd_file, writer, progress=None):
+    """
+    边解析边导出SVD文件，不构建完整的设备模型
+
+    Args:
+        progress: 可选的解析进度回调，见 svd_core._stream_peripherals
+
+    Returns:
+        int: 导出的外设数
+
+    Raises:
+        ET.ParseError: XML格式错误
+    """
+    device = Device()
+    count = 0
+    for peripheral in iter_peripherals(svd_file, device, progress):
+        if count == 0:
+            # 设备名称等信息在 <peripherals> 之前，第一个外设产出时已经读到
+            writer.begin_device(device.name)
+        writer.write_peripheral(device.name, peripheral)
+        count += 1
+    if count == 0:
+        writer.begin_device(device.name)
+    return count
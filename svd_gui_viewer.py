@@ -7,10 +7,31 @@ SVD文件图形化查看器
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import xml.etree.ElementTree as ET
 import os
 import re
-from difflib import SequenceMatcher
+import queue
+import threading
+import traceback
+
+import svd_core
+import svd_export
+from svd_codec import register_codec
+from svd_core import format_address, format_offset, parse_number
+from svd_index import address_index, parse_address
+from svd_search import NameSearch, name_index, text_index, trigram_index
+
+
+# 搜索框输入停顿多久后执行搜索（毫秒）
+SEARCH_DELAY_MS = 150
+
+# 模糊搜索最多显示的名称数（按相似度从高到低）
+FUZZY_LIMIT = 20
+
+# 后台加载时轮询进度队列的间隔（毫秒）
+LOAD_POLL_MS = 50
+
+# 监视模式下检查文件修改时间的间隔（毫秒）
+WATCH_POLL_MS = 1000
 
 
 class SVDViewerGUI:
@@ -26,21 +47,64 @@ class SVDViewerGUI:
         self.device_info = None
         self.current_file = None
         self.current_register_data = None  # 保存当前显示的寄存器数据
-        
-        # 寄存器值计算器
-        self.register_bit_values = []  # 每个位的当前值 [0, 1, 0, ...]
+        self.current_peripheral = None  # 当前寄存器所属的外设
+        
+        # 树节点与模型的映射（populate_tree 时建立）
+        self.item_models = {}     # 节点ID -> (外设, 寄存器)，外设节点的寄存器为None
+        self.model_items = {}     # (外设, 寄存器) -> 节点ID
+        self.unloaded_items = {}  # 尚未插入子节点的外设/寄存器数组节点 -> 占位子节点
+        self.detached_items = []  # 过滤模式移除（detach）的节点
+        self.array_views = {}     # 寄存器数组 -> 位图显示的元素（每个数组只生成一次）
+        
+        # 解析结果磁盘缓存（与命令行共用）
+        self.cache = svd_core.open_cache()
+        
+        # 后台加载：解析在工作线程中进行，进度通过队列传回主线程
+        self.load_queue = None   # 当前加载任务的消息队列
+        self.load_cancel = None  # 当前加载任务的取消标志（threading.Event）
+        
+        # 后台导出：与加载相同，写文件在工作线程中进行
+        self.export_queue = None
+        self.export_fields = tk.BooleanVar(value=False)
+        
+        # 监视模式：轮询文件修改时间，变化后在工作线程中增量重新解析
+        self.watch_var = tk.BooleanVar(value=False)
+        self.watch_loader = None     # svd_core.IncrementalLoader
+        self.watch_queue = None      # 正在进行的解析任务的消息队列
+        self.watch_stamp = None      # 上次检查时的 (修改时间, 大小)
+        self.watch_after_id = None
+        
+        # 寄存器值计算器（当前值保存为一个整数，位域的读写经过 svd_codec）
+        self.register_value = 0  # 当前值
+        self.register_codec = None  # 当前寄存器的编解码器
         self.register_size = 32  # 当前寄存器大小
         self.register_reset_value = 0  # 重置值
         self.current_register_id = None  # 当前寄存器标识符（用于检测切换）
+        self.selected_field = None  # 正在编辑的位域名称
+        self.field_value_var = tk.StringVar()
+        
+        # 位图画布：每个寄存器只创建一次画布项，值变化时只修改变化的项
+        self.diagram_register = None  # 位图对应的寄存器
+        self.diagram_peripheral = None  # 位图对应的外设
+        self.diagram_width = 0  # 创建位图时的画布宽度
+        self.diagram_value = 0  # 位图当前显示的值
+        self.diagram_value_items = []  # 位域值文字: (标签, 移位, 掩码)
+        self.diagram_used_mask = 0  # 属于某个位域的位
+        self.diagram_outlines = {}  # 位域框标签 -> (边框颜色, 宽度)
         
         # 搜索选项（复选框）
         self.match_case = tk.BooleanVar(value=False)
         self.match_whole_word = tk.BooleanVar(value=False)
         self.use_regex = tk.BooleanVar(value=False)
+        self.full_text = tk.BooleanVar(value=False)    # 全文搜索（名称、描述、枚举值）
+        self.fuzzy = tk.BooleanVar(value=False)        # 模糊匹配名称（按相似度排序）
         self.filter_mode = tk.BooleanVar(value=False)  # 过滤模式
         
-        # 跟踪搜索高亮标签
-        self.search_tags = []
+        # 搜索：名称索引在加载文件时构建，输入停顿后才执行查询
+        self.name_search = None
+        self.search_after_id = None
+        self.highlighted_items = []  # 当前高亮的节点
+        self.search_fields = {}      # 全文/模糊搜索命中的位域: (外设, 寄存器) -> {位域名称}
         
         # 创建界面
         self.create_widgets()
@@ -67,11 +131,20 @@ class SVDViewerGUI:
                                 font=("Arial", 10), padx=10, pady=5)
         btn_collapse.pack(side=tk.LEFT, padx=5)
         
-        # 导出按钮
-        btn_export = tk.Button(toolbar, text="💾 导出文本", command=self.export_to_text,
+        # 导出按钮（格式由保存的文件扩展名决定）
+        btn_export = tk.Button(toolbar, text="💾 导出", command=self.export_to_text,
                               font=("Arial", 10), padx=10, pady=5)
         btn_export.pack(side=tk.LEFT, padx=5)
         
+        cb_export_fields = tk.Checkbutton(toolbar, text="导出位域", variable=self.export_fields,
+                                          font=("Arial", 9))
+        cb_export_fields.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # 监视文件：保存后自动增量重新加载
+        cb_watch = tk.Checkbutton(toolbar, text="👁 监视文件", variable=self.watch_var,
+                                  font=("Arial", 9), command=self.toggle_watch)
+        cb_watch.pack(side=tk.LEFT, padx=5)
+        
         # 文件名标签
         self.file_label = tk.Label(toolbar, text="未加载文件", font=("Arial", 10), fg="gray")
         self.file_label.pack(side=tk.RIGHT, padx=10)
@@ -108,6 +181,14 @@ class SVDViewerGUI:
                                  font=("Arial", 9), command=self.on_search_option_change)
         cb_regex.pack(side=tk.LEFT, padx=2)
         
+        cb_full_text = tk.Checkbutton(options_frame, text="全文", variable=self.full_text,
+                                      font=("Arial", 9), command=self.on_search_option_change)
+        cb_full_text.pack(side=tk.LEFT, padx=2)
+        
+        cb_fuzzy = tk.Checkbutton(options_frame, text="模糊", variable=self.fuzzy,
+                                  font=("Arial", 9), command=self.on_search_option_change)
+        cb_fuzzy.pack(side=tk.LEFT, padx=2)
+        
         # 分隔线
         tk.Label(search_frame, text="|", font=("Arial", 9), fg="gray").pack(side=tk.LEFT, padx=5)
         
@@ -131,6 +212,21 @@ class SVDViewerGUI:
         tk.Label(tree_frame, text="外设与寄存器树形结构", 
                 font=("Arial", 11, "bold")).pack(side=tk.TOP, pady=5)
         
+        # 跳转到地址
+        goto_frame = tk.Frame(tree_frame)
+        goto_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 5))
+        
+        tk.Label(goto_frame, text="📍 跳转地址:", font=("Arial", 9)).pack(side=tk.LEFT, padx=5)
+        self.goto_var = tk.StringVar()
+        goto_entry = tk.Entry(goto_frame, textvariable=self.goto_var,
+                             font=("Courier New", 10), width=14)
+        goto_entry.pack(side=tk.LEFT, padx=5)
+        goto_entry.bind('<Return>', self.goto_address)
+        
+        btn_goto = tk.Button(goto_frame, text="跳转", command=self.goto_address,
+                            font=("Arial", 9))
+        btn_goto.pack(side=tk.LEFT, padx=5)
+        
         # 创建树形控件
         tree_scroll_y = tk.Scrollbar(tree_frame, orient=tk.VERTICAL)
         tree_scroll_x = tk.Scrollbar(tree_frame, orient=tk.HORIZONTAL)
@@ -160,6 +256,7 @@ class SVDViewerGUI:
         
         # 绑定选择事件
         self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        self.tree.bind('<<TreeviewOpen>>', self.on_tree_open)
         
         # 右侧：详细信息面板
         detail_frame = tk.Frame(main_frame, width=350, relief=tk.RIDGE, borderwidth=2)
@@ -183,6 +280,16 @@ class SVDViewerGUI:
                                      font=("Arial", 9), anchor=tk.W)
         self.status_label.pack(side=tk.LEFT, padx=10, pady=2)
         
+        # 加载进度条和取消按钮（仅在加载时显示）
+        self.load_cancel_btn = tk.Button(status_bar, text="取消", command=self.cancel_load,
+                                         font=("Arial", 9), padx=8)
+        self.load_progress = ttk.Progressbar(status_bar, mode='determinate',
+                                             length=200, maximum=100)
+        
+        # 导出进度条（仅在导出时显示）
+        self.export_progress = ttk.Progressbar(status_bar, mode='determinate',
+                                               length=200, maximum=100)
+        
         # ====== 寄存器位图区域（底部） ======
         bit_diagram_frame = tk.Frame(self.root, relief=tk.RIDGE, borderwidth=2)
         bit_diagram_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, padx=10, pady=(0, 5), before=status_bar)
@@ -218,6 +325,25 @@ class SVDViewerGUI:
                                            font=("Arial", 10, "bold"), fg='#666', bg='white', width=12)
         self.inverse_value_label.pack(side=tk.LEFT, padx=2)
         
+        # 位域值：点击位域后输入精确的值，回车写入
+        field_frame = tk.Frame(calc_frame, bg='white')
+        field_frame.pack(side=tk.LEFT, padx=20)
+        
+        self.field_name_label = tk.Label(field_frame, text="Field value (点击位域选择)",
+                                         font=("Arial", 9), bg='white')
+        self.field_name_label.pack(side=tk.TOP, anchor=tk.W)
+        field_entry_frame = tk.Frame(field_frame, bg='white')
+        field_entry_frame.pack(side=tk.TOP, fill=tk.X)
+        
+        self.field_value_entry = tk.Entry(field_entry_frame, textvariable=self.field_value_var,
+                                          font=("Courier New", 10), width=14, state=tk.DISABLED)
+        self.field_value_entry.pack(side=tk.LEFT, padx=2)
+        self.field_value_entry.bind('<Return>', self.apply_field_value)
+        
+        self.field_apply_btn = tk.Button(field_entry_frame, text="写入", command=self.apply_field_value,
+                                         font=("Arial", 9), state=tk.DISABLED)
+        self.field_apply_btn.pack(side=tk.LEFT, padx=2)
+        
         # Right side: Reset button
         reset_btn = tk.Button(calc_frame, text="Reset", command=self.reset_register_value,
                              font=("Arial", 10), bg='#f0f0f0', relief=tk.RAISED, padx=15, pady=5)
@@ -226,6 +352,7 @@ class SVDViewerGUI:
         # 位域图canvas
         self.bit_diagram_canvas = tk.Canvas(bit_diagram_frame, height=150, bg='white')
         self.bit_diagram_canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self.bit_diagram_canvas.bind('<Configure>', self.on_bit_diagram_configure)
         
     def open_file(self):
         """打开SVD文件"""
@@ -238,479 +365,439 @@ class SVDViewerGUI:
             self.load_svd_file(file_path)
     
     def load_svd_file(self, file_path):
-        """加载并解析SVD文件"""
+        """在后台线程中加载并解析SVD文件，界面保持响应"""
+        # 正在加载其他文件时先取消它；监视在新文件加载完成后重新开始
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+        self.stop_watch()
+        
+        self.load_queue = queue.Queue()
+        self.load_cancel = threading.Event()
+        
+        self.status_label.config(text=f"正在加载 {os.path.basename(file_path)}...")
+        self.load_progress.config(value=0)
+        self.load_cancel_btn.pack(side=tk.RIGHT, padx=5, pady=2)
+        self.load_progress.pack(side=tk.RIGHT, padx=5, pady=2)
+        
+        worker = threading.Thread(target=self.load_worker,
+                                  args=(file_path, self.load_queue, self.load_cancel),
+                                  daemon=True)
+        worker.start()
+        self.root.after(LOAD_POLL_MS, self.poll_load, file_path, self.load_queue)
+    
+    def load_worker(self, file_path, messages, cancel):
+        """
+        工作线程：解析SVD文件（文件未变化时直接读取缓存）
+        
+        不访问任何Tk对象，所有结果都通过 messages 队列交给主线程。
+        """
+        def progress(done, total, count):
+            if cancel.is_set():
+                raise svd_core.ParseCancelled()
+            messages.put(('progress', done, total, count))
+        
         try:
-            self.status_label.config(text=f"正在加载 {os.path.basename(file_path)}...")
-            self.root.update()
-            
-            # 解析SVD文件
-            self.device_info = self.parse_svd(file_path)
+            device = svd_core.load_device_cached(file_path, self.cache, progress)
+            messages.put(('done', device))
+        except svd_core.ParseCancelled:
+            messages.put(('cancelled',))
+        except Exception as e:
+            messages.put(('error', e, traceback.format_exc()))
+    
+    def poll_load(self, file_path, messages):
+        """主线程：取出工作线程的消息，更新进度或完成加载"""
+        if messages is not self.load_queue:
+            return  # 已被新的加载任务取代
+        
+        result = None
+        try:
+            while True:
+                message = messages.get_nowait()
+                if message[0] == 'progress':
+                    _, done, total, count = message
+                    self.load_progress.config(value=done * 100 / max(total, 1))
+                    self.status_label.config(
+                        text=f"正在加载 {os.path.basename(file_path)}... 已解析 {count} 个外设")
+                else:
+                    result = message
+                    break
+        except queue.Empty:
+            pass
+        
+        if result is None:
+            self.root.after(LOAD_POLL_MS, self.poll_load, file_path, messages)
+            return
+        
+        self.load_queue = None
+        self.load_cancel = None
+        self.load_progress.pack_forget()
+        self.load_cancel_btn.pack_forget()
+        
+        if result[0] == 'done':
+            self.finish_load(file_path, result[1])
+        elif result[0] == 'cancelled':
+            self.status_label.config(text="已取消加载")
+        else:
+            _, e, error_details = result
+            print(f"解析错误: {e}")
+            self.status_label.config(text="加载出错")
+            messagebox.showerror("错误", f"加载文件时出错:\n{str(e)}\n\n详细信息:\n{error_details}")
+    
+    def cancel_load(self):
+        """取消正在进行的加载（工作线程在解析下一个外设时退出）"""
+        if self.load_cancel is not None:
+            self.load_cancel.set()
+            self.status_label.config(text="正在取消加载...")
+    
+    def toggle_watch(self):
+        """监视文件复选框"""
+        if self.watch_var.get():
+            self.start_watch()
+        else:
+            self.stop_watch()
+            self.status_label.config(text="已停止监视文件")
+    
+    def start_watch(self):
+        """
+        开始监视当前文件
+        
+        增量解析需要知道每个外设块对应的外设，所以先在工作线程中完整解析一次，
+        完成后按名称替换树节点（保留展开和选中状态）。
+        """
+        self.stop_watch()
+        if not self.current_file:
+            return
+        loader = svd_core.IncrementalLoader(self.current_file)
+        self.watch_loader = loader
+        self.watch_stamp = svd_core.file_stamp(self.current_file)
+        self.run_watch_task(lambda: (loader.load(), -1))
+        self.status_label.config(text=f"正在监视 {os.path.basename(self.current_file)}")
+    
+    def stop_watch(self):
+        """停止监视（正在进行的解析结果会被丢弃）"""
+        if self.watch_after_id is not None:
+            self.root.after_cancel(self.watch_after_id)
+            self.watch_after_id = None
+        self.watch_loader = None
+        self.watch_queue = None
+    
+    def poll_watch(self):
+        """主线程：定时检查文件的修改时间和大小，变化后增量重新解析"""
+        self.watch_after_id = None
+        loader = self.watch_loader
+        if loader is None:
+            return
+        stamp = svd_core.file_stamp(loader.svd_file)
+        if stamp is not None and stamp != self.watch_stamp:
+            self.watch_stamp = stamp
+            self.run_watch_task(loader.reload)
+            return
+        self.watch_after_id = self.root.after(WATCH_POLL_MS, self.poll_watch)
+    
+    def run_watch_task(self, task):
+        """在工作线程中执行解析任务 task() -> (设备, 重新解析的外设块数)"""
+        messages = queue.Queue()
+        self.watch_queue = messages
+        
+        def worker():
+            try:
+                messages.put(('done',) + tuple(task()))
+            except Exception as e:
+                messages.put(('error', e))
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_watch_task, self.watch_loader, messages)
+    
+    def poll_watch_task(self, loader, messages):
+        """主线程：等待解析任务完成并原地更新树"""
+        if loader is not self.watch_loader or messages is not self.watch_queue:
+            return  # 监视已停止或已切换文件
+        try:
+            message = messages.get_nowait()
+        except queue.Empty:
+            self.root.after(LOAD_POLL_MS, self.poll_watch_task, loader, messages)
+            return
+        
+        self.watch_queue = None
+        name = os.path.basename(loader.svd_file)
+        if message[0] == 'error':
+            # 编辑过程中文件可能暂时不完整，保持当前显示，下次保存后再试
+            self.status_label.config(text=f"{name} 解析出错，保存后自动重试: {message[1]}")
+        else:
+            _, device, reparsed = message
+            if device is not self.device_info:
+                self.apply_device_update(device)
+                if reparsed >= 0:
+                    self.status_label.config(text=f"{name} 已更新，重新解析 {reparsed} 个外设")
+                else:
+                    self.status_label.config(text=f"{name} 已重新加载")
+        self.watch_after_id = self.root.after(WATCH_POLL_MS, self.poll_watch)
+    
+    def apply_device_update(self, device):
+        """
+        文件变化后原地更新树
+        
+        未变化的外设（同一个对象）保留原节点及其展开状态；变化的外设替换为新节点，
+        并按名称恢复展开状态和选中的节点。
+        """
+        self.device_info = device
+        self.name_search = NameSearch(name_index(device))
+        
+        roots = self.tree.get_children()
+        if self.detached_items or not roots:
+            # 过滤模式下树只保留匹配的节点，直接重建（随后重新搜索）
+            self.populate_tree()
+        else:
+            self.reconcile_tree(roots[0])
+        if self.search_var.get():
+            self.run_search()
+        
+        # 当前显示的寄存器按名称在新模型中重新查找
+        if self.current_register_data is not None:
+            item = self.find_item(self.current_peripheral.name, self.current_register_data.name)
+            if item is None:
+                self.current_register_data = None
+                self.current_peripheral = None
+                self.bit_diagram_canvas.master.pack_forget()
+            else:
+                self.draw_register(*self.item_models[item])
+        
+        self.stats_label.config(
+            text=f"外设: {len(device.peripherals)} | 寄存器: {device.register_count()}")
+    
+    def reconcile_tree(self, device_node):
+        """按新的外设列表调整设备节点的子节点（只插入、删除变化的外设节点）"""
+        self.tree.item(device_node, text=self.device_node_text(),
+                       values=('', '', self.device_info.description))
+        
+        old_nodes = {}   # id(外设) -> (外设, 节点)
+        by_name = {}     # 外设名称 -> 旧节点
+        for node in self.tree.get_children(device_node):
+            peripheral = self.item_models[node][0]
+            old_nodes[id(peripheral)] = (peripheral, node)
+            by_name.setdefault(peripheral.name, node)
+        
+        selection = self.tree.selection()
+        selected = None
+        if selection and selection[0] in self.item_models:
+            peripheral, register = self.item_models[selection[0]]
+            selected = (peripheral.name, register.name if register is not None else None)
+        
+        kept = set()
+        replaced = []
+        for index, peripheral in enumerate(self.device_info.peripherals):
+            entry = old_nodes.get(id(peripheral))
+            if entry is not None and entry[0] is peripheral:
+                self.tree.move(entry[1], device_node, index)
+                kept.add(entry[1])
+                continue
+            node = self.insert_peripheral_node(device_node, peripheral, index)
+            if peripheral.name in by_name:
+                replaced.append((by_name[peripheral.name], node))
+        
+        for old_node, node in replaced:
+            self.copy_open_state(old_node, node)
+        for _, node in old_nodes.values():
+            if node not in kept:
+                self.remove_node(node)
+        
+        if selected is not None and not self.tree.exists(selection[0]):
+            item = self.find_item(*selected)
+            if item is not None:
+                self.tree.selection_set(item)
+                self.tree.see(item)
+    
+    def copy_open_state(self, old_node, node):
+        """把旧外设节点的展开状态（包括展开的寄存器数组）复制到新节点"""
+        if not self.tree.item(old_node, 'open') or old_node in self.unloaded_items:
+            return
+        open_names = {self.item_models[child][1].name
+                      for child in self.tree.get_children(old_node)
+                      if child in self.item_models and self.tree.item(child, 'open')}
+        self.load_node(node)
+        self.tree.item(node, open=True)
+        for child in self.tree.get_children(node):
+            if self.item_models[child][1].name in open_names:
+                self.load_node(child)
+                self.tree.item(child, open=True)
+    
+    def find_item(self, peripheral_name, register_name=None):
+        """按名称查找外设/寄存器的树节点（必要时加载子节点），找不到时返回None"""
+        for peripheral in self.device_info.peripherals:
+            if peripheral.name == peripheral_name:
+                break
+        else:
+            return None
+        if register_name is None:
+            return self.item_for(peripheral)
+        for register in peripheral.registers:
+            if register.name == register_name:
+                return self.item_for(peripheral, register)
+            if register.dim is not None:
+                for element in register.elements():
+                    if element.name == register_name:
+                        return self.item_for(peripheral, element)
+        return None
+    
+    def finish_load(self, file_path, device):
+        """解析完成后在主线程中显示设备"""
+        try:
+            self.device_info = device
             
             if self.device_info:
                 self.current_file = file_path
                 self.file_label.config(text=f"📄 {os.path.basename(file_path)}", fg="green")
                 
+                # 构建名称搜索索引（每次加载只构建一次）
+                self.name_search = NameSearch(name_index(self.device_info))
+                self.array_views = {}
+                
                 # 显示到树形控件
                 self.populate_tree()
                 
                 # 更新统计信息
-                total_regs = sum(len(p['registers']) for p in self.device_info['peripherals'])
+                total_regs = self.device_info.register_count()
                 self.stats_label.config(
-                    text=f"外设: {len(self.device_info['peripherals'])} | 寄存器: {total_regs}"
+                    text=f"外设: {len(self.device_info.peripherals)} | 寄存器: {total_regs}"
                 )
                 
                 self.status_label.config(text=f"成功加载 {os.path.basename(file_path)}")
-                messagebox.showinfo("成功", f"成功加载SVD文件！\n\n外设数量: {len(self.device_info['peripherals'])}\n寄存器总数: {total_regs}")
+                if self.watch_var.get():
+                    self.start_watch()
+                messagebox.showinfo("成功", f"成功加载SVD文件！\n\n外设数量: {len(self.device_info.peripherals)}\n寄存器总数: {total_regs}")
             else:
                 self.status_label.config(text="加载失败")
                 messagebox.showerror("错误", "无法解析SVD文件")
                 
         except Exception as e:
-            import traceback
             error_details = traceback.format_exc()
             self.status_label.config(text="加载出错")
             messagebox.showerror("错误", f"加载文件时出错:\n{str(e)}\n\n详细信息:\n{error_details}")
     
     def parse_svd(self, svd_file):
-        """解析SVD文件（支持标准SVD格式和ARM CoreSight格式）"""
+        """解析SVD文件（标准SVD格式和ARM CoreSight格式均由 svd_core 处理）"""
         try:
-            tree = ET.parse(svd_file)
-            root = tree.getroot()
-            
-            # 尝试从cpu元素获取设备名称（ARM CoreSight格式）
-            cpu_elem = root.find('cpu')
-            cpu_name = None
-            cpu_display_name = None
-            if cpu_elem is not None:
-                cpu_name_elem = cpu_elem.find('name')
-                cpu_display_elem = cpu_elem.find('displayName')
-                if cpu_name_elem is not None:
-                    cpu_name = cpu_name_elem.text
-                if cpu_display_elem is not None:
-                    cpu_display_name = cpu_display_elem.text
-            
-            device_info = {
-                'name': root.find('name').text if root.find('name') is not None else (cpu_display_name or cpu_name or 'Unknown'),
-                'vendor': root.find('vendor').text if root.find('vendor') is not None else 'ARM',
-                'version': root.find('version').text if root.find('version') is not None else '',
-                'description': root.find('description').text if root.find('description') is not None else '',
-                'peripherals': []
-            }
-            
-            # 检查标准SVD格式
-            peripherals_elem = root.find('peripherals')
-            
-            # 如果没有标准peripherals元素，尝试解析ARM CoreSight格式
-            # ARM CoreSight格式结构: <device><cpu><groups><group>...
-            if peripherals_elem is None and cpu_elem is not None:
-                device_info = self._parse_arm_coresight_format(root, device_info)
-                return device_info
-            
-            # 如果仍然没有找到任何外设
-            if peripherals_elem is None:
-                return device_info
-            
-            # 第一步：构建外设字典（用于derivedFrom查找）
-            peripheral_dict = {}
-            for peripheral in peripherals_elem.findall('peripheral'):
-                periph_name_elem = peripheral.find('name')
-                if periph_name_elem is not None:
-                    peripheral_dict[periph_name_elem.text] = peripheral
-            
-            # 第二步：解析所有外设（包括派生外设）
-            for peripheral in peripherals_elem.findall('peripheral'):
-                peripheral_name = peripheral.find('name')
-                peripheral_desc = peripheral.find('description')
-                peripheral_base = peripheral.find('baseAddress')
-                
-                if peripheral_name is None:
-                    continue
-                
-                peripheral_data = {
-                    'name': peripheral_name.text,
-                    'description': peripheral_desc.text if peripheral_desc is not None else '',
-                    'base_address': peripheral_base.text if peripheral_base is not None else '0x0',
-                    'registers': []
-                }
-                
-                # 检查是否派生自其他外设
-                derived_from = peripheral.get('derivedFrom')
-                registers_elem = None
-                
-                if derived_from and derived_from in peripheral_dict:
-                    # 使用基础外设的寄存器定义
-                    source_peripheral = peripheral_dict[derived_from]
-                    registers_elem = source_peripheral.find('registers')
-                else:
-                    # 使用自己的寄存器定义
-                    registers_elem = peripheral.find('registers')
-                
-                # 解析寄存器（无论是自己的还是继承的）
-                if registers_elem is not None:
-                    # 获取当前外设的基地址（用于计算绝对地址）
-                    current_base_addr = int(peripheral_data['base_address'], 16)
-                    
-                    for register in registers_elem.findall('register'):
-                        reg_name = register.find('name')
-                        reg_desc = register.find('description')
-                        reg_offset = register.find('addressOffset')
-                        reg_size = register.find('size')
-                        reg_reset = register.find('resetValue')
-                        
-                        if reg_name is None:
-                            continue
-                        
-                        # 计算绝对地址（使用当前外设的基地址）
-                        offset = int(reg_offset.text, 16) if reg_offset is not None else 0
-                        absolute_addr = current_base_addr + offset
-                        
-                        # 解析size字段（支持十六进制和十进制）
-                        size_str = reg_size.text if reg_size is not None else '32'
-                        try:
-                            size_value = int(size_str, 0)  # base 0 自动检测进制
-                        except (ValueError, TypeError):
-                            size_value = 32
-                        
-                        register_data = {
-                            'name': reg_name.text,
-                            'description': reg_desc.text if reg_desc is not None else '',
-                            'offset': reg_offset.text if reg_offset is not None else '0x0',
-                            'address': f'0x{absolute_addr:08X}',
-                            'size': str(size_value),  # 转换为字符串存储
-                            'reset_value': reg_reset.text if reg_reset is not None else '',
-                            'fields': []
-                        }
-                        
-                        # 解析字段信息（支持多种格式）
-                        fields_elem = register.find('fields')
-                        if fields_elem is not None:
-                            for field in fields_elem.findall('field'):
-                                field_name = field.find('name')
-                                field_desc = field.find('description')
-                                field_access = field.find('access')
-                                
-                                if field_name is None:
-                                    continue
-                                
-                                # 尝试多种位域定义格式
-                                lsb = None
-                                msb = None
-                                
-                                # 格式1: 使用 lsb 和 msb 标签（如 TLE987x.svd）
-                                field_lsb = field.find('lsb')
-                                field_msb = field.find('msb')
-                                if field_lsb is not None and field_msb is not None:
-                                    lsb = int(field_lsb.text)
-                                    msb = int(field_msb.text)
-                                
-                                # 格式2: 使用 bitRange 标签（如 NSUC1602.svd）
-                                # bitRange 格式: "[msb:lsb]" 例如 "[7:0]"
-                                elif field.find('bitRange') is not None:
-                                    bit_range = field.find('bitRange').text
-                                    # 解析 [msb:lsb] 格式
-                                    bit_range = bit_range.strip('[]')
-                                    if ':' in bit_range:
-                                        msb_str, lsb_str = bit_range.split(':')
-                                        msb = int(msb_str.strip())
-                                        lsb = int(lsb_str.strip())
-                                    else:
-                                        # 单个位，如 "[5]"
-                                        lsb = msb = int(bit_range.strip())
-                                
-                                # 格式3: 使用 bitOffset 和 bitWidth 标签
-                                elif field.find('bitOffset') is not None:
-                                    bit_offset_elem = field.find('bitOffset')
-                                    bit_width_elem = field.find('bitWidth')
-                                    
-                                    if bit_offset_elem is not None and bit_offset_elem.text:
-                                        bit_offset = int(bit_offset_elem.text)
-                                        lsb = bit_offset
-                                        
-                                        if bit_width_elem is not None and bit_width_elem.text:
-                                            bit_width = int(bit_width_elem.text)
-                                            msb = bit_offset + bit_width - 1
-                                        else:
-                                            # 如果只有 bitOffset，假设为单位
-                                            msb = lsb
-                                
-                                # 如果成功解析出位范围，添加字段
-                                if lsb is not None and msb is not None:
-                                    field_data = {
-                                        'name': field_name.text,
-                                        'description': field_desc.text if field_desc is not None else '',
-                                        'lsb': lsb,
-                                        'msb': msb,
-                                        'access': field_access.text if field_access is not None else 'read-write'
-                                    }
-                                    register_data['fields'].append(field_data)
-
-                        
-                        peripheral_data['registers'].append(register_data)
-
-                
-                device_info['peripherals'].append(peripheral_data)
-            
-            return device_info
-            
+            return svd_core.load_device_cached(svd_file, self.cache)
         except Exception as e:
             print(f"解析错误: {e}")
             return None
     
-    def _parse_arm_coresight_format(self, root, device_info):
-        """解析ARM CoreSight格式的SVD文件
-        
-        这种格式使用 <device><cpu><groups><group> 结构，例如Cortex-M3.svd：
-        - <group name="Core"> 直接包含CPU核心寄存器
-        - <group name="Peripherals"> 包含标准的外设定义
-        """
-        cpu_elem = root.find('cpu')
-        if cpu_elem is None:
-            return device_info
-        
-        groups_elem = cpu_elem.find('groups')
-        if groups_elem is None:
-            return device_info
-        
-        # 遍历所有group
-        for group in groups_elem.findall('group'):
-            group_name = group.find('name')
-            group_desc = group.find('description')
-            group_size = group.find('size')
-            
-            group_name_text = group_name.text if group_name is not None else 'Unknown'
-            group_desc_text = group_desc.text if group_desc is not None else ''
-            default_size = group_size.text if group_size is not None else '32'
-            
-            # 检查group是否直接包含寄存器（如Core组）
-            registers_elem = group.find('registers')
-            if registers_elem is not None:
-                # 创建一个虚拟外设来容纳这些寄存器
-                peripheral_data = {
-                    'name': group_name_text,
-                    'description': group_desc_text,
-                    'base_address': '0x00000000',  # Core寄存器没有固定地址
-                    'registers': []
-                }
-                
-                for register in registers_elem.findall('register'):
-                    reg_data = self._parse_register_element(register, 0, default_size)
-                    if reg_data:
-                        peripheral_data['registers'].append(reg_data)
-                
-                if peripheral_data['registers']:
-                    device_info['peripherals'].append(peripheral_data)
-            
-            # 检查group是否包含peripherals（如Peripherals组）
-            peripherals_elem = group.find('peripherals')
-            if peripherals_elem is not None:
-                # 构建外设字典用于derivedFrom查找
-                peripheral_dict = {}
-                for peripheral in peripherals_elem.findall('peripheral'):
-                    periph_name_elem = peripheral.find('name')
-                    if periph_name_elem is not None:
-                        peripheral_dict[periph_name_elem.text] = peripheral
-                
-                # 解析所有外设
-                for peripheral in peripherals_elem.findall('peripheral'):
-                    peripheral_name = peripheral.find('name')
-                    peripheral_desc = peripheral.find('description')
-                    peripheral_base = peripheral.find('baseAddress')
-                    
-                    if peripheral_name is None:
-                        continue
-                    
-                    peripheral_data = {
-                        'name': peripheral_name.text,
-                        'description': peripheral_desc.text if peripheral_desc is not None else '',
-                        'base_address': peripheral_base.text if peripheral_base is not None else '0x0',
-                        'registers': []
-                    }
-                    
-                    # 检查是否派生自其他外设
-                    derived_from = peripheral.get('derivedFrom')
-                    reg_elem = None
-                    
-                    if derived_from and derived_from in peripheral_dict:
-                        source_peripheral = peripheral_dict[derived_from]
-                        reg_elem = source_peripheral.find('registers')
-                    else:
-                        reg_elem = peripheral.find('registers')
-                    
-                    if reg_elem is not None:
-                        try:
-                            current_base_addr = int(peripheral_data['base_address'], 16)
-                        except ValueError:
-                            current_base_addr = 0
-                        
-                        for register in reg_elem.findall('register'):
-                            reg_data = self._parse_register_element(register, current_base_addr, default_size)
-                            if reg_data:
-                                peripheral_data['registers'].append(reg_data)
-                    
-                    if peripheral_data['registers'] or peripheral_desc is not None:
-                        device_info['peripherals'].append(peripheral_data)
-        
-        return device_info
-    
-    def _parse_register_element(self, register, base_addr, default_size='32'):
-        """解析单个寄存器元素，返回寄存器数据字典"""
-        reg_name = register.find('name')
-        reg_desc = register.find('description')
-        reg_offset = register.find('addressOffset')
-        reg_size = register.find('size')
-        reg_reset = register.find('resetValue')
-        reg_index = register.find('Index')  # ARM CoreSight格式使用Index代替addressOffset
-        
-        if reg_name is None:
-            return None
-        
-        # 计算地址
-        if reg_offset is not None and reg_offset.text:
-            try:
-                offset = int(reg_offset.text, 16)
-            except ValueError:
-                offset = int(reg_offset.text, 0) if reg_offset.text else 0
-        elif reg_index is not None and reg_index.text:
-            # 对于Core寄存器，使用Index乘以4作为偏移
-            offset = int(reg_index.text) * 4
-        else:
-            offset = 0
-        
-        absolute_addr = base_addr + offset
-        
-        # 解析size字段
-        size_str = reg_size.text if reg_size is not None else default_size
-        try:
-            size_value = int(size_str, 0)
-        except (ValueError, TypeError):
-            size_value = 32
-        
-        register_data = {
-            'name': reg_name.text,
-            'description': reg_desc.text if reg_desc is not None else '',
-            'offset': f'0x{offset:X}',
-            'address': f'0x{absolute_addr:08X}',
-            'size': str(size_value),
-            'reset_value': reg_reset.text if reg_reset is not None else '',
-            'fields': []
-        }
-        
-        # 解析字段信息
-        fields_elem = register.find('fields')
-        if fields_elem is not None:
-            for field in fields_elem.findall('field'):
-                field_data = self._parse_field_element(field)
-                if field_data:
-                    register_data['fields'].append(field_data)
-        
-        return register_data
-    
-    def _parse_field_element(self, field):
-        """解析单个字段元素，返回字段数据字典"""
-        field_name = field.find('name')
-        field_desc = field.find('description')
-        field_access = field.find('access')
-        
-        if field_name is None:
-            return None
-        
-        # 尝试多种位域定义格式
-        lsb = None
-        msb = None
-        
-        # 格式1: 使用 lsb 和 msb 标签
-        field_lsb = field.find('lsb')
-        field_msb = field.find('msb')
-        if field_lsb is not None and field_msb is not None:
-            lsb = int(field_lsb.text)
-            msb = int(field_msb.text)
-        
-        # 格式2: 使用 bitRange 标签 [msb:lsb]
-        elif field.find('bitRange') is not None:
-            bit_range = field.find('bitRange').text
-            bit_range = bit_range.strip('[]')
-            if ':' in bit_range:
-                msb_str, lsb_str = bit_range.split(':')
-                msb = int(msb_str.strip())
-                lsb = int(lsb_str.strip())
-            else:
-                lsb = msb = int(bit_range.strip())
-        
-        # 格式3: 使用 bitOffset 和 bitWidth 标签
-        elif field.find('bitOffset') is not None:
-            bit_offset_elem = field.find('bitOffset')
-            bit_width_elem = field.find('bitWidth')
-            
-            if bit_offset_elem is not None and bit_offset_elem.text:
-                bit_offset = int(bit_offset_elem.text)
-                lsb = bit_offset
-                
-                if bit_width_elem is not None and bit_width_elem.text:
-                    bit_width = int(bit_width_elem.text)
-                    msb = bit_offset + bit_width - 1
-                else:
-                    msb = lsb
-        
-        if lsb is not None and msb is not None:
-            return {
-                'name': field_name.text,
-                'description': field_desc.text if field_desc is not None else '',
-                'lsb': lsb,
-                'msb': msb,
-                'access': field_access.text if field_access is not None else 'read-write'
-            }
-        
-        return None
-
-    
     def populate_tree(self):
-        """填充树形控件"""
-        # 清空现有内容
+        """填充树形控件（只插入外设节点，寄存器节点在展开时再插入）"""
+        # 清空现有内容（被过滤移除的节点不在树中，需要单独删除）
         self.tree.delete(*self.tree.get_children())
+        for item in self.detached_items:
+            if self.tree.exists(item):
+                self.tree.delete(item)
+        self.item_models = {}
+        self.model_items = {}
+        self.unloaded_items = {}
+        self.detached_items = []
+        self.highlighted_items = []
         
         if not self.device_info:
             return
         
         # 添加根节点（设备）
-        device_name = self.device_info['name']
-        device_desc = self.device_info.get('description', '')
-        vendor = self.device_info.get('vendor', '')
-        
-        root_text = f"📱 {device_name}"
-        if vendor:
-            root_text += f" ({vendor})"
-        
-        device_node = self.tree.insert('', 'end', text=root_text,
-                                      values=('', '', device_desc),
+        device_node = self.tree.insert('', 'end', text=self.device_node_text(),
+                                      values=('', '', self.device_info.description),
                                       tags=('device',))
         
-        # 添加外设和寄存器
-        for peripheral in self.device_info['peripherals']:
-            # 外设节点
-            periph_text = f"📦 {peripheral.get('name', 'Unknown')}"
-            periph_desc = peripheral.get('description', '')
-            periph_node = self.tree.insert(device_node, 'end', text=periph_text,
-                                          values=(f"{len(peripheral.get('registers', []))} 个寄存器", 
-                                                 peripheral.get('base_address', ''),
-                                                 periph_desc if periph_desc else ''),
-                                          tags=('peripheral',))
-            
-            # 寄存器节点
-            for register in peripheral.get('registers', []):
-                reg_text = f"📋 {register.get('name', 'Unknown')}"
-                reg_desc = register.get('description', '')
-                # 安全地截取描述文本
-                desc_preview = reg_desc[:50] if reg_desc else ''
-                self.tree.insert(periph_node, 'end', text=reg_text,
-                               values=(f"{register.get('size', '32')} bits",
-                                      register.get('address', ''),
-                                      desc_preview),
-                               tags=('register',))
+        # 添加外设（寄存器在展开时再插入）
+        for peripheral in self.device_info.peripherals:
+            self.insert_peripheral_node(device_node, peripheral)
         
         # 配置标签颜色
         self.tree.tag_configure('device', font=('Arial', 10, 'bold'))
         self.tree.tag_configure('peripheral', font=('Arial', 9, 'bold'), foreground='blue')
         self.tree.tag_configure('register', font=('Arial', 9))
+        self.tree.tag_configure('register_array', font=('Arial', 9), foreground='#6a1b9a')
+        self.tree.tag_configure('search_match', background='yellow')
+    
+    def device_node_text(self):
+        """设备节点的显示文本"""
+        text = f"📱 {self.device_info.name}"
+        if self.device_info.vendor:
+            text += f" ({self.device_info.vendor})"
+        return text
+    
+    def insert_peripheral_node(self, parent, peripheral, index='end'):
+        """插入一个外设节点（带占位子节点，展开时再插入寄存器）"""
+        periph_node = self.tree.insert(parent, index, text=f"📦 {peripheral.name}",
+                                      values=(f"{peripheral.register_count()} 个寄存器", 
+                                             format_address(peripheral.base_address),
+                                             peripheral.description),
+                                      tags=('peripheral',))
+        self.item_models[periph_node] = (peripheral, None)
+        self.model_items[(peripheral, None)] = periph_node
+        
+        # 占位子节点使外设节点显示展开标记
+        if peripheral.registers:
+            placeholder = self.tree.insert(periph_node, 'end', text='...', tags=('placeholder',))
+            self.unloaded_items[periph_node] = placeholder
+        return periph_node
+    
+    def remove_node(self, item):
+        """删除节点及其子节点，并清除它们在节点映射中的记录"""
+        for child in self.tree.get_children(item):
+            self.remove_node(child)
+        model = self.item_models.pop(item, None)
+        if model is not None and self.model_items.get(model) == item:
+            del self.model_items[model]
+        self.unloaded_items.pop(item, None)
+        self.tree.delete(item)
+    
+    def load_node(self, item):
+        """
+        为外设节点插入寄存器子节点，或为寄存器数组节点插入元素子节点（每个节点只插入一次）
+        
+        展开节点、全部展开、搜索和地址跳转都通过这里按需加载。
+        """
+        placeholder = self.unloaded_items.pop(item, None)
+        if placeholder is None:
+            return
+        self.tree.delete(placeholder)
+        
+        peripheral, register = self.item_models[item]
+        if register is None:
+            for register in peripheral.registers:
+                self.insert_register_node(item, peripheral, register)
+        else:
+            for element in register.elements():
+                self.insert_register_node(item, peripheral, element)
+    
+    def insert_register_node(self, parent, peripheral, register):
+        """插入一个寄存器节点；寄存器数组插入一个可展开的节点，元素在展开时再插入"""
+        address = format_address(peripheral.address_of(register))
+        if register.dim is None:
+            reg_node = self.tree.insert(parent, 'end', text=f"📋 {register.name}",
+                                       values=(f"{register.size} bits", address,
+                                              register.description[:50]),
+                                       tags=('register',))
+        else:
+            reg_node = self.tree.insert(parent, 'end',
+                                       text=f"📚 {register.dim.range_name(register.name)}",
+                                       values=(f"{register.dim.count} × {register.size} bits", address,
+                                              register.description[:50]),
+                                       tags=('register_array',))
+            placeholder = self.tree.insert(reg_node, 'end', text='...', tags=('placeholder',))
+            self.unloaded_items[reg_node] = placeholder
+        self.item_models[reg_node] = (peripheral, register)
+        self.model_items[(peripheral, register)] = reg_node
+    
+    def item_for(self, peripheral, register=None):
+        """取得外设/寄存器对应的树节点（必要时先加载外设和寄存器数组的子节点）"""
+        if register is not None:
+            self.load_node(self.model_items[(peripheral, None)])
+            if isinstance(register, svd_core.RegisterElement):
+                self.load_node(self.model_items[(peripheral, register.array)])
+        return self.model_items[(peripheral, register)]
+    
+    def on_tree_open(self, event):
+        """展开节点事件：按需插入子节点"""
+        item = self.tree.focus()
+        if item in self.unloaded_items:
+            self.load_node(item)
     
     def on_tree_select(self, event):
         """树形控件选择事件"""
@@ -740,10 +827,19 @@ class SVDViewerGUI:
                 self.detail_text.insert(tk.END, f"\n描述:\n{item_values[2]}\n")
         
         # 根据类型显示不同信息
+        if 'placeholder' in item_tags:
+            return
+        
         if 'register' in item_tags:
             self.detail_text.insert(tk.END, f"\n类型: 寄存器\n")
             # 尝试获取并绘制寄存器位图
             self.draw_register_bit_diagram(item)
+        elif 'register_array' in item_tags:
+            peripheral, array = self.item_models[item]
+            self.detail_text.insert(tk.END, f"\n类型: 寄存器数组\n")
+            self.detail_text.insert(tk.END, f"元素: {array.dim.count} 个，间距 {format_offset(array.dim.increment)}\n")
+            # 所有元素的位域布局相同，显示第一个元素
+            self.draw_register(peripheral, self.array_view(array))
         elif 'peripheral' in item_tags:
             self.detail_text.insert(tk.END, f"\n类型: 外设模块\n")
             self.bit_diagram_canvas.master.pack_forget()  # Hide canvas frame
@@ -751,87 +847,95 @@ class SVDViewerGUI:
             self.detail_text.insert(tk.END, f"\n类型: 设备\n")
             self.bit_diagram_canvas.master.pack_forget()  # Hide canvas frame
             if self.device_info:
-                vendor = self.device_info.get('vendor', '')
-                version = self.device_info.get('version', '')
+                vendor = self.device_info.vendor
+                version = self.device_info.version
                 if vendor:
                     self.detail_text.insert(tk.END, f"厂商: {vendor}\n")
                 if version:
                     self.detail_text.insert(tk.END, f"版本: {version}\n")
     
     def draw_register_bit_diagram(self, tree_item):
+        """绘制树节点对应寄存器的位图"""
+        # 通过节点映射直接取得寄存器（同名寄存器属于不同外设时也不会混淆）
+        peripheral_data, register_data = self.item_models.get(tree_item, (None, None))
+        self.draw_register(peripheral_data, register_data)
+    
+    def array_view(self, array):
+        """寄存器数组在位图中显示的元素（重复选择同一数组时是同一个对象，位图只做增量更新）"""
+        view = self.array_views.get(array)
+        if view is None:
+            view = self.array_views[array] = array.element(0)
+        return view
+    
+    def draw_register(self, peripheral_data, register_data):
         """绘制寄存器位图"""
-        # 查找对应的寄存器数据
-        register_data = None
-        item_text = self.tree.item(tree_item, 'text')
-        reg_name = item_text.replace('📋 ', '')
-        
-        # 查找寄存器数据
-        if self.device_info:
-            for peripheral in self.device_info['peripherals']:
-                for register in peripheral['registers']:
-                    if register['name'] == reg_name:
-                        register_data = register
-                        break
-                if register_data:
-                    break
-        
         # 如果没有字段信息,隐藏Canvas frame
-        if not register_data or not register_data.get('fields'):
+        if not register_data or not register_data.fields:
             self.bit_diagram_canvas.master.pack_forget()
             self.current_register_data = None
+            self.current_peripheral = None
+            self.diagram_register = None
             return
         
         # 保存当前寄存器数据供点击事件使用
         self.current_register_data = register_data
-        
-        # 获取寄存器大小（支持十六进制和十进制）
-        reg_size_str = register_data.get('size', '32')
-        try:
-            # 自动检测十六进制（0x前缀）或十进制
-            reg_size = int(reg_size_str, 0)  # base 0 自动检测进制
-        except (ValueError, TypeError):
-            reg_size = 32  # 默认32位
+        self.current_peripheral = peripheral_data
         
         # 初始化寄存器值计算器
-        self.register_size = reg_size
-        # 解析重置值
-        try:
-            reset_val_str = register_data.get('reset_value', '0x0')
-            self.register_reset_value = int(reset_val_str, 0) if reset_val_str else 0
-        except (ValueError, TypeError):
-            self.register_reset_value = 0
+        reg_size = register_data.size
+        self.register_codec = register_codec(self.device_info, register_data)
+        self.register_reset_value = self.register_codec.reset_value
         
         # 生成寄存器唯一标识符（使用地址+名称）
-        register_id = f"{register_data.get('address', '')}_{register_data.get('name', '')}"
+        register_id = f"{peripheral_data.address_of(register_data)}_{register_data.name}"
         
-        # *** 关键修复：只在切换到不同寄存器或大小改变时才初始化 ***
-        # 这样可以保留同一寄存器的修改，但切换寄存器时重新初始化
-        if self.current_register_id != register_id or len(self.register_bit_values) != reg_size:
-            print(f"DEBUG: Initializing bit array (register changed from '{self.current_register_id}' to '{register_id}')")
+        # 只在切换到不同寄存器或大小改变时才初始化，保留同一寄存器的修改
+        if self.current_register_id != register_id or self.register_size != reg_size:
             self.current_register_id = register_id
-            self.register_bit_values = []
-            for i in range(reg_size):
-                bit_val = (self.register_reset_value >> i) & 1
-                self.register_bit_values.append(bit_val)
-        else:
-            print(f"DEBUG: Keeping existing bit values for register '{register_id}'")
+            self.register_size = reg_size
+            self.register_value = self.register_reset_value & self.register_codec.value_mask
+            self.select_field(None)
+        elif self.selected_field is not None and self.selected_field not in self.register_codec:
+            # 重新加载后位域已不存在
+            self.select_field(None)
         
         # 更新显示的值
         self.update_register_value_display()
         
-        fields = register_data['fields']
-
-        
-        # 清空canvas并显示frame
-        self.bit_diagram_canvas.delete('all')
+        # 显示frame
         if not self.bit_diagram_canvas.master.winfo_ismapped():
             self.bit_diagram_canvas.master.pack(side=tk.BOTTOM, fill=tk.BOTH, padx=10, pady=(0, 5), before=self.status_label.master)
         
-        # Canvas尺寸
+        # 同一外设的同一个寄存器且宽度未变时只更新变化的项，否则重建位图
+        # （派生外设共用寄存器对象，但搜索命中的位域按外设区分）
         canvas_width = self.bit_diagram_canvas.winfo_width()
         if canvas_width <= 1:  # Canvas未初始化
             canvas_width = 1180  # 默认宽度（更大）
-        canvas_height = 150
+        if (self.diagram_register is register_data and self.diagram_peripheral is peripheral_data
+                and self.diagram_width == canvas_width):
+            self.update_bit_diagram()
+        else:
+            self.build_bit_diagram(register_data, canvas_width)
+    
+    @staticmethod
+    def bit_colors(bit_value):
+        """位值圆圈的 (填充色, 文字颜色)"""
+        if bit_value:
+            return '#4CAF50', 'white'
+        return '#E0E0E0', '#666'
+    
+    def build_bit_diagram(self, register_data, canvas_width):
+        """
+        创建寄存器位图的所有画布项（每个寄存器只创建一次）
+        
+        位值圆圈和位域值文字带有固定的标签（bit_N_oval、bit_N_value、field_N_value），
+        之后值的变化由 update_bit_diagram 只修改这些项。
+        """
+        reg_size = register_data.size
+        layout = register_data.field_layout()
+        
+        # 清空canvas
+        self.bit_diagram_canvas.delete('all')
         
         # 边距和布局参数
         margin_left = 20
@@ -854,38 +958,50 @@ class SVDViewerGUI:
                                                     font=('Arial', 9, 'bold'), 
                                                     fill='#333')
         
-        # 绘制字段框
+        # 绘制字段框和预留位（位域布局在解析时已经计算，按段绘制）
         y_field = margin_top + 15
+        y_bit_range = y_field + bit_height + 10
         
         # 准备颜色列表
         field_colors = ['#E3F2FD', '#FFF3E0', '#F3E5F5', '#E8F5E9', '#FFF9C4', '#FCE4EC']
         
-        # 创建位数组,标记哪些位已被使用
-        bit_used = [False] * reg_size
+        # 位域值文字: (标签, 移位, 掩码)
+        value_items = []
         
-        # 按字段绘制
-        for idx, field in enumerate(fields):
-            lsb = field['lsb']
-            msb = field['msb']
-            field_name = field['name']
-            access_type = field.get('access', 'rw')
+        # 全文/模糊搜索命中的位域加粗橙色边框，鼠标离开后恢复为这里记录的边框
+        matched_fields = self.matched_fields(self.current_peripheral, register_data)
+        self.diagram_outlines = {}
+        
+        for idx, span in enumerate(layout):
+            # 计算段的位置和宽度
+            x1 = margin_left + (reg_size - 1 - span.msb) * bit_width
+            x2 = margin_left + (reg_size - span.lsb) * bit_width
             
-            # 标记使用的位
-            for bit in range(lsb, msb + 1):
-                if bit < reg_size:
-                    bit_used[bit] = True
+            if span.reserved:
+                # 绘制预留区域
+                self.bit_diagram_canvas.create_rectangle(x1, y_field, x2, y_field + bit_height,
+                                                        fill='#F5F5F5', outline='#999', 
+                                                        width=1, dash=(2, 2))
+                
+                # 如果宽度足够,显示"RES"
+                if (x2 - x1) > 20:
+                    self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2,
+                                                       text='RES', 
+                                                       font=('Arial', 8), 
+                                                       fill='#999')
+                continue
             
-            # 计算字段框的位置和宽度
-            x1 = margin_left + (reg_size - 1 - msb) * bit_width
-            x2 = margin_left + (reg_size - lsb) * bit_width
+            field = span.field
             
             # 选择颜色
             color = field_colors[idx % len(field_colors)]
             
             # 绘制字段框（添加标签以便点击识别）
-            field_rect = self.bit_diagram_canvas.create_rectangle(
+            outline = ('#FF6F00', 3) if field.name in matched_fields else ('#333', 1)
+            self.diagram_outlines[f'field_{idx}'] = outline
+            self.bit_diagram_canvas.create_rectangle(
                 x1, y_field, x2, y_field + bit_height,
-                fill=color, outline='#333', width=1,
+                fill=color, outline=outline[0], width=outline[1],
                 tags=f'field_{idx}'
             )
             
@@ -897,79 +1013,36 @@ class SVDViewerGUI:
                                             lambda e, tag=f'field_{idx}': self.on_field_enter(tag))
             self.bit_diagram_canvas.tag_bind(f'field_{idx}', '<Leave>', 
                                             lambda e, tag=f'field_{idx}': self.on_field_leave(tag))
-            # 绘制字段名称 (如果宽度足够)
+            # 绘制字段名称 (如果宽度足够)，与其他位域重叠时加标记
             field_width = x2 - x1
             if field_width > 15:  # 降低最小宽度要求
                 # 显示完整字段名称,不截断
-                self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2 - 8,
-                                                   text=field_name, 
+                self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2 - 13,
+                                                   text=field.name + (' ⚠' if span.overlap else ''), 
                                                    font=('Arial', 8), 
-                                                   fill='#000')
+                                                   fill='#C62828' if span.overlap else '#000')
             
-            # 绘制访问类型
+            # 绘制访问类型和位域的当前值
             if field_width > 20:  # 提高访问类型显示的最小宽度
-                access_short = access_type.replace('read-write', 'rw').replace('read-only', 'r').replace('write-only', 'w')
-                self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2 + 10,
+                access_short = field.access.replace('read-write', 'rw').replace('read-only', 'r').replace('write-only', 'w')
+                self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2 + 2,
                                                    text=access_short, 
                                                    font=('Arial', 7), 
                                                    fill='#666')
-        
-        # 绘制预留位(Reserved)
-        current_reserved_start = None
-        for bit in range(reg_size):
-            if not bit_used[bit]:
-                if current_reserved_start is None:
-                    current_reserved_start = bit
-            else:
-                if current_reserved_start is not None:
-                    # 绘制预留区域
-                    x1 = margin_left + (reg_size - 1 - (bit - 1)) * bit_width
-                    x2 = margin_left + (reg_size - current_reserved_start) * bit_width
-                    
-                    self.bit_diagram_canvas.create_rectangle(x1, y_field, x2, y_field + bit_height,
-                                                            fill='#F5F5F5', outline='#999', 
-                                                            width=1, dash=(2, 2))
-                    
-                    # 如果宽度足够,显示"RES"
-                    if (x2 - x1) > 20:
-                        self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2,
-                                                           text='RES', 
-                                                           font=('Arial', 8), 
-                                                           fill='#999')
-                    
-                    current_reserved_start = None
-        
-        # 处理最后的预留位
-        if current_reserved_start is not None:
-            x1 = margin_left
-            x2 = margin_left + (reg_size - current_reserved_start) * bit_width
-            
-            self.bit_diagram_canvas.create_rectangle(x1, y_field, x2, y_field + bit_height,
-                                                    fill='#F5F5F5', outline='#999', 
-                                                    width=1, dash=(2, 2))
+                if field.name in self.register_codec:
+                    shift, mask = self.register_codec.spec(field.name)
+                    value_tag = f'field_{idx}_value'
+                    self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2 + 15,
+                                                       text=f'0x{(self.register_value >> shift) & mask:X}',
+                                                       font=('Arial', 7, 'bold'),
+                                                       fill='#1565C0',
+                                                       tags=value_tag)
+                    value_items.append((value_tag, shift, mask))
             
-            if (x2 - x1) > 20:
-                self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_field + bit_height/2,
-                                                   text='RES', 
-                                                   font=('Arial', 8), 
-                                                   fill='#999')
-        
-        # 在底部绘制位范围标签
-        y_bit_range = y_field + bit_height + 10
-        for field in fields:
-            lsb = field['lsb']
-            msb = field['msb']
-            x1 = margin_left + (reg_size - 1 - msb) * bit_width
-            x2 = margin_left + (reg_size - lsb) * bit_width
-            
-            if msb == lsb:
-                bit_range = str(lsb)
-            else:
-                bit_range = f"{msb}:{lsb}"
-            
-            if (x2 - x1) > 15:
+            # 在底部绘制位范围标签
+            if field_width > 15:
                 self.bit_diagram_canvas.create_text((x1 + x2) / 2, y_bit_range,
-                                                   text=bit_range, 
+                                                   text=field.bit_range(), 
                                                    font=('Arial', 8, 'bold'), 
                                                    fill='#333')
         
@@ -982,46 +1055,40 @@ class SVDViewerGUI:
             x_center = margin_left + (reg_size - bit_pos - 0.5) * bit_width
             
             # 检查该bit是否为保留位（未被任何field使用）
-            is_reserved = not bit_used[bit_pos]
+            is_reserved = not (layout.used_mask >> bit_pos) & 1
             
             # 获取当前位的值
-            bit_value = self.register_bit_values[bit_pos] if bit_pos < len(self.register_bit_values) else 0
-            
-            # DEBUG: 输出前几个bit的值
-            if bit_pos < 5:
-                print(f"DEBUG: Drawing bit {bit_pos}, value={bit_value}, reserved={is_reserved}, array_len={len(self.register_bit_values)}")
+            bit_value = (self.register_value >> bit_pos) & 1
             
             # 圆圈颜色：保留位固定为浅灰色，正常位根据值显示
             if is_reserved:
                 circle_color = '#D0D0D0'  # 保留位固定浅灰色
                 text_color = '#999'
             else:
-                circle_color = '#4CAF50' if bit_value else '#E0E0E0'
-                text_color = 'white' if bit_value else '#666'
+                circle_color, text_color = self.bit_colors(bit_value)
             
             # 创建圆圈
             circle_tag = f'bit_{bit_pos}'
-            circle = self.bit_diagram_canvas.create_oval(
+            self.bit_diagram_canvas.create_oval(
                 x_center - circle_radius, y_bit_circle - circle_radius,
                 x_center + circle_radius, y_bit_circle + circle_radius,
                 fill=circle_color, outline='#999', width=1,
-                tags=(circle_tag, 'bit_circle')
+                tags=(circle_tag, f'{circle_tag}_oval', 'bit_circle')
             )
             
             # 在圆圈中显示值（保留位显示'-'）
             display_text = '-' if is_reserved else str(bit_value)
-            text = self.bit_diagram_canvas.create_text(
+            self.bit_diagram_canvas.create_text(
                 x_center, y_bit_circle,
                 text=display_text,
                 font=('Arial', 10, 'bold'),
                 fill=text_color,
-                tags=(circle_tag, 'bit_circle')
+                tags=(circle_tag, f'{circle_tag}_value', 'bit_circle')
             )
             
             # 只为非保留位绑定点击事件
             if not is_reserved:
                 # 绑定点击事件 - 切换该位的值
-                print(f"DEBUG: Binding click for bit {bit_pos}")  # 调试
                 self.bit_diagram_canvas.tag_bind(circle_tag, '<Button-1>', 
                                                 lambda e, bp=bit_pos: self.toggle_single_bit(bp))
                 
@@ -1041,36 +1108,77 @@ class SVDViewerGUI:
                 font=('Arial', 7),
                 fill='#666'
             )
+        
+        # 记录位图对应的寄存器和值，之后只做增量更新
+        self.diagram_register = register_data
+        self.diagram_peripheral = self.current_peripheral
+        self.diagram_width = canvas_width
+        self.diagram_value = self.register_value
+        self.diagram_value_items = value_items
+        self.diagram_used_mask = layout.used_mask
+    
+    def update_bit_diagram(self):
+        """寄存器值变化后只修改变化的位圆圈和位域值文字"""
+        changed = self.register_value ^ self.diagram_value
+        if not changed or self.diagram_register is None:
+            return
+        canvas = self.bit_diagram_canvas
+        value = self.register_value
+        
+        # 保留位的圆圈不随值变化
+        bits = changed & self.diagram_used_mask
+        while bits:
+            low = bits & -bits
+            bits ^= low
+            bit_pos = low.bit_length() - 1
+            bit_value = (value >> bit_pos) & 1
+            circle_color, text_color = self.bit_colors(bit_value)
+            canvas.itemconfig(f'bit_{bit_pos}_oval', fill=circle_color)
+            canvas.itemconfig(f'bit_{bit_pos}_value', text=str(bit_value), fill=text_color)
+        
+        for tag, shift, mask in self.diagram_value_items:
+            if (changed >> shift) & mask:
+                canvas.itemconfig(tag, text=f'0x{(value >> shift) & mask:X}')
+        
+        self.diagram_value = value
+    
+    def refresh_register_value(self):
+        """寄存器值改变后更新数值显示和位图"""
+        self.update_register_value_display()
+        self.update_bit_diagram()
+    
+    def on_bit_diagram_configure(self, event):
+        """位图区域宽度变化时按新宽度重建位图"""
+        if self.diagram_register is not None and event.width > 1 and event.width != self.diagram_width:
+            self.build_bit_diagram(self.diagram_register, event.width)
 
     
     def on_field_click(self, field_data):
-        """位域点击事件处理 - 切换位值"""
-        # 切换位域的值
-        self.toggle_bit_in_field(field_data)
+        """位域点击事件处理 - 选择位域以输入其值"""
+        self.select_field(field_data.name)
+        self.field_value_entry.focus_set()
+        self.field_value_entry.select_range(0, tk.END)
         
         # 同时在详细信息中显示位域信息（保留原有功能）
         self.detail_text.delete('1.0', tk.END)
         
         # 显示位域详细信息
         self.detail_text.insert('1.0', f"{'='*40}\n")
-        self.detail_text.insert(tk.END, f"位域: {field_data['name']}\n")
+        self.detail_text.insert(tk.END, f"位域: {field_data.name}\n")
         self.detail_text.insert(tk.END, f"{'='*40}\n\n")
         
         # 位范围
-        lsb = field_data['lsb']
-        msb = field_data['msb']
-        if msb == lsb:
-            bit_range = f"Bit {lsb}"
+        if field_data.msb == field_data.lsb:
+            bit_range = f"Bit {field_data.lsb}"
         else:
-            bit_range = f"Bits {msb}:{lsb}"
+            bit_range = f"Bits {field_data.bit_range()}"
         self.detail_text.insert(tk.END, f"位范围: {bit_range}\n")
         
         # 位宽
-        bit_width = msb - lsb + 1
-        self.detail_text.insert(tk.END, f"位宽: {bit_width} bit(s)\n")
+        self.detail_text.insert(tk.END, f"位宽: {field_data.width} bit(s)\n")
         
         # 访问类型
-        access_type = field_data.get('access', 'read-write')
+        access_type = field_data.access
         access_map = {
             'read-write': '读写',
             'read-only': '只读',
@@ -1083,20 +1191,20 @@ class SVDViewerGUI:
         self.detail_text.insert(tk.END, f"访问权限: {access_cn} ({access_type})\n")
         
         # 描述信息
-        description = field_data.get('description', '')
-        if description:
-            self.detail_text.insert(tk.END, f"\n描述:\n{description}\n")
+        if field_data.description:
+            self.detail_text.insert(tk.END, f"\n描述:\n{field_data.description}\n")
         
         # 如果有寄存器信息，也显示
         if self.current_register_data:
-            self.detail_text.insert(tk.END, f"\n所属寄存器: {self.current_register_data['name']}\n")
-            self.detail_text.insert(tk.END, f"寄存器地址: {self.current_register_data['address']}\n")
+            register_address = self.current_peripheral.address_of(self.current_register_data)
+            self.detail_text.insert(tk.END, f"\n所属寄存器: {self.current_register_data.name}\n")
+            self.detail_text.insert(tk.END, f"寄存器地址: {format_address(register_address)}\n")
         
         self.detail_text.insert(tk.END, f"\n{'='*40}\n")
-        self.detail_text.insert(tk.END, "提示: 点击位域切换值 (0/1)\n")
+        self.detail_text.insert(tk.END, "提示: 在上方输入位域的值（0x、#二进制或十进制），回车写入\n")
         
         # 更新状态栏
-        self.status_label.config(text=f"已切换位域: {field_data['name']} [{bit_range}]")
+        self.status_label.config(text=f"已选择位域: {field_data.name} [{bit_range}]")
 
     
     def on_field_enter(self, tag):
@@ -1112,15 +1220,18 @@ class SVDViewerGUI:
         """鼠标离开位域时恢复"""
         # 恢复默认光标
         self.bit_diagram_canvas.config(cursor='')
-        # 恢复边框
+        # 恢复边框（全文/模糊搜索命中的位域保持高亮）
+        outline, width = self.diagram_outlines.get(tag, ('#333', 1))
         items = self.bit_diagram_canvas.find_withtag(tag)
         for item in items:
-            self.bit_diagram_canvas.itemconfig(item, width=1, outline='#333')
+            self.bit_diagram_canvas.itemconfig(item, width=width, outline=outline)
 
 
     def expand_all(self):
         """展开所有节点"""
         def expand_recursive(item):
+            if item in self.unloaded_items:
+                self.load_node(item)
             self.tree.item(item, open=True)
             for child in self.tree.get_children(item):
                 expand_recursive(child)
@@ -1143,196 +1254,308 @@ class SVDViewerGUI:
         self.status_label.config(text="已折叠所有节点")
     
     def on_search(self, *args):
-        """搜索功能"""
+        """搜索框内容变化：延迟执行搜索，连续输入时只执行最后一次"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DELAY_MS, self.run_search)
+    
+    def run_search(self):
+        """执行搜索"""
+        self.search_after_id = None
         search_text = self.search_var.get()
         
         if not search_text:
             # 恢复所有项目
             self.populate_tree()
+            self.set_search_fields({})
             return
         
         # 高亮匹配项
         self.highlight_search_results(search_text)
     
     def on_search_option_change(self):
-        """搜索选项改变时重新搜索"""
+        """搜索选项改变时立即重新搜索"""
         if self.search_var.get():
-            self.on_search()
+            self.run_search()
+    
+    def clear_highlight(self):
+        """清除上一次搜索的高亮"""
+        for item in self.highlighted_items:
+            if self.tree.exists(item):
+                tags = tuple(tag for tag in self.tree.item(item, 'tags') if tag != 'search_match')
+                self.tree.item(item, tags=tags)
+        self.highlighted_items = []
+    
+    def matched_fields(self, peripheral, register):
+        """全文/模糊搜索在该寄存器中命中的位域名称（寄存器数组的元素按数组查找）"""
+        if isinstance(register, svd_core.RegisterElement):
+            register = register.array
+        return self.search_fields.get((peripheral, register), ())
+    
+    def set_search_fields(self, search_fields):
+        """更新全文/模糊搜索命中的位域，当前显示的位图随之重绘"""
+        if not search_fields and not self.search_fields:
+            return
+        self.search_fields = search_fields
+        if self.diagram_register is not None:
+            self.build_bit_diagram(self.diagram_register, self.diagram_width)
+    
+    def full_text_targets(self, search_text, fuzzy=False):
+        """
+        在全文索引（或三元组索引，按相似度排序）上查询
+        
+        Returns:
+            (list, dict): [(外设, 寄存器)]（外设命中时寄存器为None）,
+                          (外设, 寄存器) -> 命中的位域名称
+        """
+        if fuzzy:
+            index = trigram_index(self.device_info)
+            hits = matches = [target for _, target in index.query(search_text, FUZZY_LIMIT)]
+        else:
+            index = text_index(self.device_info)
+            hits = index.query(search_text)
+            # 高亮位域自身命中的位域，包括外设或寄存器也命中、在列表中不单独列出的位域
+            matches = index.field_matches(search_text)
+        targets = [index.target(hit)[:2] for hit in hits]
+        search_fields = {}
+        for match in matches:
+            peripheral, register, field = index.target(match)
+            if field is not None:
+                # 位图中显示的是展开后的位域名称（位域数组逐个元素）
+                search_fields.setdefault((peripheral, register), set()).update(
+                    element.name for element in field.elements())
+        return targets, search_fields
     
     def highlight_search_results(self, search_text):
         """搜索结果（支持过滤模式和高亮模式）"""
-        # 清除之前的高亮
-        for tag in self.search_tags:
-            self.tree.tag_configure(tag, background='')
-        self.search_tags = []
+        if not self.device_info or self.name_search is None:
+            return
         
-        # 搜索并高亮
-        matches = []
         match_case = self.match_case.get()
         match_whole = self.match_whole_word.get()
         use_regex = self.use_regex.get()
+        full_text = self.full_text.get()
+        fuzzy = self.fuzzy.get()
         filter_enabled = self.filter_mode.get()  # 是否启用过滤模式
         
-        # 编译正则表达式（如果启用正则）
-        regex_pattern = None
-        if use_regex:
+        if full_text or fuzzy:
+            # 全文索引：名称、描述、枚举值，多个词同时匹配；模糊：名称相似度最高的若干项
+            targets, search_fields = self.full_text_targets(search_text, fuzzy=fuzzy)
+        else:
+            # 在预先构建的名称索引上查询（模式只编译一次）
             try:
-                flags = 0 if match_case else re.IGNORECASE
-                regex_pattern = re.compile(search_text, flags)
+                hits = self.name_search.query(search_text, match_case, match_whole, use_regex)
             except re.error as e:
                 self.status_label.config(text=f"正则表达式错误: {str(e)}")
                 return
+            targets = [self.name_search.index.target(pos) for pos in hits]
+            search_fields = {}
         
-        def is_match_text(text_to_search, pattern):
-            """根据搜索选项判断是否匹配"""
-            if use_regex:
-                # 使用正则表达式
-                return regex_pattern and regex_pattern.search(text_to_search) is not None
-            else:
-                # 普通文本搜索
-                search_str = pattern if match_case else pattern.lower()
-                target_str = text_to_search if match_case else text_to_search.lower()
-                
-                if match_whole:
-                    # 整词匹配：使用单词边界
-                    word_pattern = r'\b' + re.escape(search_str) + r'\b'
-                    flags = 0 if match_case else re.IGNORECASE
-                    return re.search(word_pattern, target_str, flags) is not None
-                else:
-                    # 包含匹配
-                    return search_str in target_str
-            return False
-        
-        # 收集所有节点和它们的匹配状态
-        all_nodes = {}
-        
-        def collect_nodes(item):
-            """递归收集所有节点"""
-            item_text = self.tree.item(item, 'text')
-            clean_text = item_text.replace('📱 ', '').replace('📦 ', '').replace('📋 ', '')
-            is_match = is_match_text(clean_text, search_text)
-            
-            all_nodes[item] = {
-                'match': is_match,
-                'children': list(self.tree.get_children(item)),
-                'parent': self.tree.parent(item)
-            }
-            
-            for child in self.tree.get_children(item):
-                collect_nodes(child)
+        # 上一次过滤移除过节点时先重建树（只有外设节点，代价很小），否则只清除高亮
+        if self.detached_items:
+            self.populate_tree()
+        else:
+            self.clear_highlight()
         
-        # 收集所有节点
-        for root_item in self.tree.get_children():
-            collect_nodes(root_item)
+        roots = self.tree.get_children()
+        if not roots:
+            return
+        device_node = roots[0]
         
-        # 确定哪些节点应该显示（匹配的节点 + 它们的所有父节点）
+        # 可见节点 = 匹配的节点 + 它们的所有父节点
+        # 只为包含匹配寄存器的外设加载寄存器节点
+        matches = []
+        matched_items = set()
         visible_nodes = set()
-        
-        for item, info in all_nodes.items():
-            if info['match']:
-                matches.append(item)
-                # 添加此节点及其所有父节点到可见集合
-                current = item
-                while current:
-                    visible_nodes.add(current)
-                    current = all_nodes[current]['parent'] if current in all_nodes else None
+        for peripheral, register in targets:
+            if peripheral is None:
+                item = device_node
+            else:
+                item = self.item_for(peripheral, register)
+                if item in matched_items:
+                    continue    # 同一寄存器的多个位域命中
+                matched_items.add(item)
+                parent = self.tree.parent(item)
+                while parent and parent not in visible_nodes:
+                    visible_nodes.add(parent)
+                    parent = self.tree.parent(parent)
+            matches.append(item)
+            visible_nodes.add(item)
+        if matches:
+            visible_nodes.add(device_node)
         
         # 如果启用过滤模式，隐藏不匹配的节点
         if filter_enabled:
-            for item in all_nodes.keys():
-                try:
-                    if item not in visible_nodes:
-                        self.tree.detach(item)
-                except:
-                    pass
+            hidden = [item for item in self.item_models if item not in visible_nodes]
+            if device_node not in visible_nodes:
+                hidden.append(device_node)
+            if hidden:
+                self.tree.detach(*hidden)
+                self.detached_items = hidden
         
         # 高亮匹配的节点
-        for idx, item in enumerate(matches, 1):
-            try:
-                search_tag = f'search_{idx}'
-                current_tags = list(self.tree.item(item, 'tags'))
-                current_tags.append(search_tag)
-                self.tree.item(item, tags=current_tags)
-                self.tree.tag_configure(search_tag, background='yellow')
-                self.search_tags.append(search_tag)
-                
-                # 展开所有父节点
-                parent = self.tree.parent(item)
-                while parent:
-                    self.tree.item(parent, open=True)
-                    parent = self.tree.parent(parent)
-                # 展开匹配的外设节点
-                if self.tree.get_children(item):
-                    self.tree.item(item, open=True)
-            except:
-                pass
+        for item in matches:
+            self.tree.item(item, tags=self.tree.item(item, 'tags') + ('search_match',))
+            
+            # 展开所有父节点
+            parent = self.tree.parent(item)
+            while parent:
+                self.tree.item(parent, open=True)
+                parent = self.tree.parent(parent)
+            # 展开匹配的外设节点（过滤模式下不加载未匹配的寄存器）
+            if item in self.unloaded_items and not filter_enabled:
+                self.load_node(item)
+            if item not in self.unloaded_items and self.tree.get_children(item):
+                self.tree.item(item, open=True)
+        self.highlighted_items = matches
+        self.set_search_fields(search_fields)
+        if fuzzy and matches:
+            self.tree.see(matches[0])    # 相似度最高的一项
         
         # 更新状态显示
         options = []
-        if match_case:
-            options.append('Aa')
-        if match_whole:
-            options.append('|w|')
-        if use_regex:
-            options.append('.*')
+        if fuzzy:
+            options.append('模糊')
+        elif full_text:
+            options.append('全文')
+        else:
+            if match_case:
+                options.append('Aa')
+            if match_whole:
+                options.append('|w|')
+            if use_regex:
+                options.append('.*')
         option_text = ' '.join(options) if options else '默认'
-        self.status_label.config(text=f"[{option_text}] 找到 {len(matches)} 个匹配项")
+        status = f"[{option_text}] 找到 {len(matches)} 个匹配项"
+        if search_fields:
+            status += f"（{sum(len(names) for names in search_fields.values())} 个位域）"
+        self.status_label.config(text=status)
+    
+    def goto_address(self, event=None):
+        """跳转到地址所在的寄存器（使用地址索引，O(log n)）"""
+        if not self.device_info:
+            messagebox.showwarning("警告", "请先加载SVD文件")
+            return
+        
+        text = self.goto_var.get()
+        try:
+            address = parse_address(text)
+        except ValueError:
+            self.status_label.config(text=f"无效的地址: {text}")
+            return
+        
+        match = address_index(self.device_info).lookup(address)
+        if match is None:
+            self.status_label.config(text=f"{format_address(address)} 不属于任何外设")
+            return
+        
+        # 过滤模式下部分节点已被移除，先恢复完整的树
+        if self.search_var.get():
+            self.clear_search()
+        
+        item = self.item_for(match.peripheral, match.register)
+        parent = self.tree.parent(item)
+        while parent:
+            self.tree.item(parent, open=True)
+            parent = self.tree.parent(parent)
+        
+        self.tree.see(item)
+        self.tree.selection_set(item)
+        self.tree.focus(item)
+        
+        # 状态栏显示该字节覆盖的位域
+        status = f"{format_address(address)} -> {match.name()}"
+        if match.register is not None:
+            low = (address - match.address) * 8
+            fields = [f.name for f in match.register.iter_fields() if f.lsb <= low + 7 and f.msb >= low]
+            if fields:
+                status += f" [位 {low + 7}:{low}: {', '.join(fields)}]"
+        self.status_label.config(text=status)
     
     def clear_search(self):
         """清除搜索"""
         self.search_var.set('')
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+            self.search_after_id = None
         self.populate_tree()
+        self.set_search_fields({})
         self.status_label.config(text="搜索已清除")
     
     def export_to_text(self):
-        """导出到文本文件"""
+        """导出到文件（文本、CSV 或 JSON Lines），在后台线程中写出"""
         if not self.device_info:
             messagebox.showwarning("警告", "请先加载SVD文件")
             return
+        if self.export_queue is not None:
+            messagebox.showwarning("警告", "正在导出，请稍候")
+            return
         
         output_file = filedialog.asksaveasfilename(
-            title="保存文本文件",
+            title="导出",
             defaultextension=".txt",
-            filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")],
-            initialfile=f"{self.device_info['name']}_registers.txt"
+            filetypes=[("文本文件", "*.txt"), ("CSV文件", "*.csv"),
+                       ("JSON Lines", "*.jsonl"), ("所有文件", "*.*")],
+            initialfile=f"{self.device_info.name}_registers.txt"
         )
         
         if output_file:
-            try:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write(f"Device: {self.device_info['name']}\n")
-                    f.write("=" * 100 + "\n\n")
-                    
-                    for peripheral in self.device_info['peripherals']:
-                        f.write(f"\n外设: {peripheral['name']}\n")
-                        f.write(f"基地址: {peripheral['base_address']}\n")
-                        f.write(f"描述: {peripheral['description']}\n")
-                        f.write(f"寄存器数量: {len(peripheral['registers'])}\n")
-                        f.write("-" * 100 + "\n")
-                        
-                        if peripheral['registers']:
-                            f.write(f"{'寄存器名称':<30} {'地址':<15} {'偏移':<15} {'描述'}\n")
-                            f.write("-" * 100 + "\n")
-                            
-                            for register in peripheral['registers']:
-                                f.write(f"{register['name']:<30} {register['address']:<15} "
-                                       f"{register['offset']:<15} {register['description']}\n")
-                        
-                        f.write("\n")
-                
-                messagebox.showinfo("成功", f"已导出到:\n{output_file}")
-                self.status_label.config(text=f"已导出到 {os.path.basename(output_file)}")
-                
-            except Exception as e:
-                messagebox.showerror("错误", f"导出失败:\n{str(e)}")
+            self.export_queue = queue.Queue()
+            self.status_label.config(text=f"正在导出到 {os.path.basename(output_file)}...")
+            self.export_progress.config(value=0)
+            self.export_progress.pack(side=tk.RIGHT, padx=5, pady=2)
+            
+            worker = threading.Thread(target=self.export_worker,
+                                      args=(self.device_info, output_file,
+                                            self.export_fields.get(), self.export_queue),
+                                      daemon=True)
+            worker.start()
+            self.root.after(LOAD_POLL_MS, self.poll_export, output_file, self.export_queue)
+    
+    def export_worker(self, device, output_file, fields, messages):
+        """工作线程：写出导出文件（设备模型只读，不访问任何Tk对象）"""
+        def progress(done, total):
+            messages.put(('progress', done, total))
+        
+        try:
+            with svd_export.open_output(output_file) as f:
+                writer = svd_export.make_writer(f, svd_export.format_for_path(output_file), fields)
+                svd_export.export_device(device, writer, progress)
+            messages.put(('done',))
+        except Exception as e:
+            messages.put(('error', e))
+    
+    def poll_export(self, output_file, messages):
+        """主线程：更新导出进度，完成后提示结果"""
+        result = None
+        try:
+            while True:
+                message = messages.get_nowait()
+                if message[0] == 'progress':
+                    _, done, total = message
+                    self.export_progress.config(value=done * 100 / max(total, 1))
+                else:
+                    result = message
+                    break
+        except queue.Empty:
+            pass
+        
+        if result is None:
+            self.root.after(LOAD_POLL_MS, self.poll_export, output_file, messages)
+            return
+        
+        self.export_queue = None
+        self.export_progress.pack_forget()
+        if result[0] == 'done':
+            messagebox.showinfo("成功", f"已导出到:\n{output_file}")
+            self.status_label.config(text=f"已导出到 {os.path.basename(output_file)}")
+        else:
+            self.status_label.config(text="导出失败")
+            messagebox.showerror("错误", f"导出失败:\n{str(result[1])}")
     
     def update_register_value_display(self):
         """更新寄存器值显示"""
-        # 计算当前值
-        value = 0
-        for i, bit in enumerate(self.register_bit_values):
-            if bit:
-                value |= (1 << i)
+        value = self.register_value
         
         # 计算反转值
         max_val = (1 << self.register_size) - 1
@@ -1344,82 +1567,68 @@ class SVDViewerGUI:
         
         self.selected_value_label.config(text=format_str.format(value))
         self.inverse_value_label.config(text=format_str.format(inverse_value))
+        
+        # 正在编辑的位域显示其当前值
+        if self.selected_field is not None:
+            field_value = self.register_codec.get(value, self.selected_field)
+            self.field_value_var.set(f"0x{field_value:X}")
     
-    def reset_register_value(self):
-        """重置寄存器值到默认值"""
-        if not self.register_bit_values:
+    def select_field(self, name):
+        """选择要输入值的位域（None 表示不选择）"""
+        self.selected_field = name
+        state = tk.DISABLED if name is None else tk.NORMAL
+        self.field_value_var.set('')
+        self.field_value_entry.config(state=state)
+        self.field_apply_btn.config(state=state)
+        if name is None:
+            self.field_name_label.config(text="Field value (点击位域选择)")
             return
-        
-        # 重置位值数组
-        for i in range(len(self.register_bit_values)):
-            bit_val = (self.register_reset_value >> i) & 1
-            self.register_bit_values[i] = bit_val
-        
-        # 更新显示
+        _, mask = self.register_codec.spec(name)
+        self.field_name_label.config(text=f"{name} (0..0x{mask:X})")
         self.update_register_value_display()
+    
+    def apply_field_value(self, event=None):
+        """把输入的值写入选中的位域"""
+        if self.selected_field is None:
+            return
+        text = self.field_value_var.get().strip()
+        x = parse_number(text)
+        if x is None:
+            self.status_label.config(text=f"无效的位域值: {text}")
+            return
+        try:
+            self.register_value = self.register_codec.with_field(self.register_value,
+                                                                 self.selected_field, x)
+        except ValueError as e:
+            self.status_label.config(text=str(e))
+            return
         
-        # 重绘位域图以更新位的视觉状态
-        if self.current_register_data:
-            # 找到当前寄存器在树中的节点
-            selection = self.tree.selection()
-            if selection:
-                item = selection[0]
-                item_tags = self.tree.item(item, 'tags')
-                if 'register' in item_tags:
-                    self.draw_register_bit_diagram(item)
-        
-        self.status_label.config(text="已重置寄存器值")
+        self.refresh_register_value()
+        self.status_label.config(text=f"已写入位域: {self.selected_field} = 0x{x:X}")
     
-    def toggle_bit_in_field(self, field_data):
-        """切换位域中的位值"""
-        lsb = field_data['lsb']
-        msb = field_data['msb']
-        
-        # 切换此位域的所有位（简单实现：全0变全1，否则变全0）
-        field_value = 0
-        for i in range(lsb, msb + 1):
-            if i < len(self.register_bit_values) and self.register_bit_values[i]:
-                field_value = 1
-                break
+    def reset_register_value(self):
+        """重置寄存器值到默认值"""
+        if self.register_codec is None:
+            return
         
-        # 如果当前有任何位为1，全部设为0；否则全部设为1
-        new_val = 0 if field_value else 1
-        for i in range(lsb, msb + 1):
-            if i < len(self.register_bit_values):
-                self.register_bit_values[i] = new_val
+        self.register_value = self.register_reset_value & self.register_codec.value_mask
         
-        # 更新显示
-        self.update_register_value_display()
+        # 更新显示和位图中变化的位
+        self.refresh_register_value()
         
-        # 重绘位域图
-        selection = self.tree.selection()
-        if selection:
-            item = selection[0]
-            self.draw_register_bit_diagram(item)
+        self.status_label.config(text="已重置寄存器值")
     
     def toggle_single_bit(self, bit_pos):
         """切换单个bit的值"""
-        if bit_pos < len(self.register_bit_values):
-            # 切换位值
-            old_value = self.register_bit_values[bit_pos]
-            self.register_bit_values[bit_pos] = 1 - self.register_bit_values[bit_pos]
-            new_value = self.register_bit_values[bit_pos]
-            
-            print(f"DEBUG: Toggled bit {bit_pos}: {old_value} -> {new_value}")  # 调试输出
-            
-            # 更新显示
-            self.update_register_value_display()
-            
-            # 重绘位域图以更新视觉
-            selection = self.tree.selection()
-            if selection:
-                item = selection[0]
-                self.draw_register_bit_diagram(item)
-            
-            # 更新状态栏
-            self.status_label.config(text=f"已切换 Bit {bit_pos} -> {self.register_bit_values[bit_pos]}")
-        else:
-            print(f"DEBUG: bit_pos {bit_pos} out of range (len={len(self.register_bit_values)})")
+        if bit_pos >= self.register_size:
+            return
+        self.register_value ^= 1 << bit_pos
+        
+        # 更新显示和位图中变化的位
+        self.refresh_register_value()
+        
+        # 更新状态栏
+        self.status_label.config(text=f"已切换 Bit {bit_pos} -> {(self.register_value >> bit_pos) & 1}")
 
     
     def on_bit_enter(self, tag):
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD C头文件生成
+根据设备模型生成CMSIS风格的外设头文件：寄存器结构体（含保留填充）、基地址宏、
+实例指针宏和位域的 _Pos/_Msk 宏。
+
+每种外设结构（派生外设共用一种）生成一个头文件，另有一个包含全部头文件的设备头文件。
+输出目录中的清单记录每个头文件的内容指纹，重新生成时只改写指纹变化的头文件，
+内容未变的头文件保持原修改时间，固件构建不会因此重新编译。
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import re
+
+from svd_core import registers_fingerprint
+
+
+# 生成器版本号：输出格式变化时递增，使所有头文件重新生成
+GENERATOR_VERSION = 1
+
+# 输出目录中的指纹清单
+MANIFEST_FILE = '.svd_header.json'
+
+# 寄存器位宽 -> (C类型, 字节数)，其他位宽按32位处理
+_C_TYPES = {8: ('uint8_t', 1), 16: ('uint16_t', 2), 32: ('uint32_t', 4), 64: ('uint64_t', 8)}
+
+
+def c_identifier(name):
+    """把SVD名称转换为C标识符（去掉数组占位符 %s，其他非法字符替换为下划线）"""
+    name = re.sub(r'\W', '_', name.replace('[%s]', '').replace('%s', ''))
+    if not name or name[0].isdigit():
+        name = '_' + name
+    return name
+
+
+def _qualifier(register):
+    """由位域访问类型推断寄存器的 CMSIS 访问限定符"""
+    accesses = {field.access for field in register.fields}
+    if accesses == {'read-only'}:
+        return '__I'
+    if accesses and accesses <= {'write-only', 'writeOnce'}:
+        return '__O'
+    return '__IO'
+
+
+def _comment(text):
+    """结构体成员的注释（描述压缩为一行）"""
+    text = ' '.join((text or '').split())
+    return text.replace('*/', '* /')
+
+
+class HeaderGroup:
+    """一种外设结构及其所有实例（共用同一个寄存器元组的外设）"""
+
+    __slots__ = ('type_name', 'registers', 'instances')
+
+    def __init__(self, type_name, registers):
+        self.type_name = type_name
+        self.registers = registers
+        self.instances = []     # (实例的C名称, 外设)
+
+
+def group_peripherals(device):
+    """
+    按寄存器元组把外设分组（derivedFrom 派生的外设与源外设共用寄存器）
+
+    类型名称和实例名称转换为C标识符后重复时加下划线后缀区分。
+
+    Returns:
+        list[HeaderGroup]: 保持外设在文件中的顺序
+    """
+    groups = {}
+    type_names = set()
+    instance_names = set()
+    for peripheral in device.peripherals:
+        group = groups.get(id(peripheral.registers))
+        if group is None:
+            type_name = _unique(c_identifier(peripheral.name), type_names)
+            group = groups[id(peripheral.registers)] = HeaderGroup(type_name, peripheral.registers)
+        group.instances.append((_unique(c_identifier(peripheral.name), instance_names),
+                                peripheral))
+    return list(groups.values())
+
+
+def _unique(name, used):
+    while name in used:
+        name += '_'
+    used.add(name)
+    return name
+
+
+def _members(registers):
+    """
+    结构体成员：(偏移, 占用字节数, 类型字节数, 声明, 注释)
+
+    步长等于寄存器宽度的寄存器数组生成C数组，其他数组逐个元素展开。
+    """
+    members = []
+    for register in registers:
+        ctype, width = _C_TYPES.get(register.size, _C_TYPES[32])
+        qualifier = _qualifier(register)
+        comment = _comment(register.description)
+        dim = register.dim
+        if dim is not None and dim.increment == width:
+            members.append((register.offset, width * dim.count, width,
+                            f'{qualifier} {ctype} {c_identifier(register.name)}[{dim.count}];',
+                            comment))
+            continue
+        for element in register.elements():
+            members.append((element.offset, width, width,
+                            f'{qualifier} {ctype} {c_identifier(element.name)};', comment))
+    members.sort(key=lambda member: member[0])
+    return members
+
+
+def _reserved(index, gap):
+    """填充 gap 字节的保留成员"""
+    for ctype, width in (('uint32_t', 4), ('uint16_t', 2), ('uint8_t', 1)):
+        if gap % width == 0:
+            count = gap // width
+            return f'{ctype} RESERVED{index}[{count}];' if count > 1 else f'{ctype} RESERVED{index};'
+
+
+def struct_lines(type_name, registers):
+    """
+    外设寄存器结构体的代码行
+
+    偏移相同的寄存器放在一个匿名联合中；与前面的寄存器部分重叠、未按类型对齐或与前面的
+    成员重名的寄存器无法用结构体表示，只生成注释。
+    """
+    lines = ['typedef struct', '{']
+    position = 0
+    reserved = 0
+    declared = set()
+    for offset, group in itertools.groupby(_members(registers), key=lambda member: member[0]):
+        group = list(group)
+        names = [member[3].split()[2].split('[')[0].rstrip(';') for member in group]
+        if (offset < position or any(offset % member[2] for member in group)
+                or len(set(names)) < len(names) or declared.intersection(names)):
+            for _, _, _, declaration, _ in group:
+                lines.append(f'  /* 0x{offset:03X}: {declaration} 与前面的寄存器重叠、未对齐或重名，省略 */')
+            continue
+        declared.update(names)
+        if offset > position:
+            lines.append(f'  {_reserved(reserved, offset - position)}')
+            reserved += 1
+        if len(group) == 1:
+            _, _, _, declaration, comment = group[0]
+            lines.append(f'  {declaration:<40} /*!< 0x{offset:03X} {comment} */')
+        else:
+            lines.append('  union')
+            lines.append('  {')
+            for _, _, _, declaration, comment in group:
+                lines.append(f'    {declaration:<38} /*!< 0x{offset:03X} {comment} */')
+            lines.append('  };')
+        position = offset + max(member[1] for member in group)
+    lines.append(f'}} {type_name}_TypeDef;')
+    return lines
+
+
+def field_macro_lines(type_name, registers):
+    """位域的 _Pos/_Msk 宏（同名的宏只生成一次，位范围无效的位域跳过）"""
+    lines = []
+    seen = set()
+    for register in registers:
+        suffix = 'ULL' if register.size > 32 else 'UL'
+        prefix = f'{type_name}_{c_identifier(register.name)}_'
+        for field in register.iter_fields():
+            name = prefix + c_identifier(field.name)
+            if name in seen or field.width <= 0:
+                continue
+            seen.add(name)
+            lines.append(f'#define {name + "_Pos":<48} {field.lsb}U')
+            lines.append(f'#define {name + "_Msk":<48} '
+                         f'(0x{(1 << field.width) - 1:X}{suffix} << {name}_Pos)')
+    return lines
+
+
+def header_text(device, group, guard):
+    """一种外设结构的头文件内容"""
+    lines = ['/*',
+             f' * {device.name} {group.type_name} 外设定义',
+             ' * 由 svd_header.py 根据SVD文件生成，请勿手工修改',
+             ' */',
+             f'#ifndef {guard}',
+             f'#define {guard}',
+             '']
+    if group.registers:
+        lines += struct_lines(group.type_name, group.registers)
+        lines.append('')
+    for name, peripheral in group.instances:
+        lines.append(f'#define {name + "_BASE":<48} 0x{peripheral.base_address:08X}UL')
+        if group.registers:
+            lines.append(f'#define {name:<48} (({group.type_name}_TypeDef *) {name}_BASE)')
+    macros = field_macro_lines(group.type_name, group.registers)
+    if macros:
+        lines.append('')
+        lines += macros
+    lines += ['', f'#endif /* {guard} */', '']
+    return '\n'.join(lines)
+
+
+def device_header_text(device, guard, filenames):
+    """设备头文件：访问限定符和所有外设头文件的 #include"""
+    lines = ['/*',
+             f' * {device.name} 外设定义',
+             ' * 由 svd_header.py 根据SVD文件生成，请勿手工修改',
+             ' */',
+             f'#ifndef {guard}',
+             f'#define {guard}',
+             '',
+             '#include <stdint.h>',
+             '',
+             '#ifndef __I',
+             '#define __I  volatile const',
+             '#endif',
+             '#ifndef __O',
+             '#define __O  volatile',
+             '#endif',
+             '#ifndef __IO',
+             '#define __IO volatile',
+             '#endif',
+             '']
+    lines += [f'#include "{filename}"' for filename in filenames]
+    lines += ['', f'#endif /* {guard} */', '']
+    return '\n'.join(lines)
+
+
+def _fingerprint(*parts):
+    return hashlib.blake2b(repr((GENERATOR_VERSION,) + parts).encode('utf-8'),
+                           digest_size=16).hexdigest()
+
+
+def _load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == GENERATOR_VERSION:
+            return manifest.get('headers', {})
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {}
+
+
+def generate_headers(device, out_dir, force=False):
+    """
+    生成设备的全部头文件，只改写内容指纹变化（或文件不存在）的头文件
+
+    不再对应任何外设的旧头文件会被删除。
+
+    Args:
+        force: 忽略清单，全部重新生成
+
+    Returns:
+        (list, list, list): 改写的、未变的、删除的文件名
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    old = {} if force else _load_manifest(manifest_path)
+    device_name = c_identifier(device.name)
+
+    plan = []   # (文件名, 指纹, 生成内容的函数)
+    for group in group_peripherals(device):
+        filename = f'{device_name}_{group.type_name}.h'
+        guard = f'{device_name}_{group.type_name}_H'.upper()
+        instances = tuple((name, p.base_address) for name, p in group.instances)
+        fingerprint = _fingerprint(device.name, group.type_name, instances,
+                                   registers_fingerprint(group.registers))
+        plan.append((filename, fingerprint,
+                     lambda group=group, guard=guard: header_text(device, group, guard)))
+    filenames = [entry[0] for entry in plan]
+    guard = f'{device_name}_H'.upper()
+    plan.append((f'{device_name}.h', _fingerprint(device.name, filenames),
+                 lambda: device_header_text(device, guard, filenames)))
+
+    written, unchanged = [], []
+    headers = {}
+    for filename, fingerprint, build in plan:
+        headers[filename] = fingerprint
+        path = os.path.join(out_dir, filename)
+        if old.get(filename) == fingerprint and os.path.exists(path):
+            unchanged.append(filename)
+            continue
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(build())
+        written.append(filename)
+
+    removed = []
+    for filename in old:
+        if filename not in headers:
+            try:
+                os.remove(os.path.join(out_dir, filename))
+                removed.append(filename)
+            except OSError:
+                pass
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': GENERATOR_VERSION, 'headers': headers}, f, indent=1)
+    return written, unchanged, removed
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD地址索引
+按地址排序的寄存器区间表，用 bisect 在 O(log n) 内回答
+"0x40004008 是哪个寄存器、第几位属于哪个位域"。
+"""
+
+from bisect import bisect_right
+
+from svd_core import format_address
+
+
+def parse_address(text):
+    """
+    解析用户输入的地址（支持 0x 前缀、下划线分隔，无前缀时按十六进制处理）
+
+    Raises:
+        ValueError: 不是合法的地址
+    """
+    text = text.strip().replace('_', '')
+    if text[:2].lower() in ('0x', '0b', '0o'):
+        return int(text, 0)
+    return int(text, 16)
+
+
+class AddressMatch:
+    """一次地址查找的结果"""
+
+    __slots__ = ('peripheral', 'register', 'address', 'size_bytes',
+                 'peripheral_index', 'register_index')
+
+    def __init__(self, peripheral, register, address, size_bytes,
+                 peripheral_index, register_index):
+        self.peripheral = peripheral
+        self.register = register              # 只命中外设地址范围时为None
+        self.address = address                # 寄存器（或外设）起始地址
+        self.size_bytes = size_bytes          # 占用的字节数
+        self.peripheral_index = peripheral_index
+        self.register_index = register_index
+
+    @property
+    def end(self):
+        """结束地址（不含）"""
+        return self.address + self.size_bytes
+
+    def field_at(self, address, bit):
+        """
+        查找给定地址上某一位所属的位域
+
+        Args:
+            address: 字节地址（必须落在本寄存器内）
+            bit: 该字节内的位号（0-7），或超出8时视为从该地址起的位号
+
+        Returns:
+            Field: 位域对象，保留位返回None
+        """
+        if self.register is None:
+            return None
+        return field_at_bit(self.register, (address - self.address) * 8 + bit)
+
+    def name(self):
+        """显示名称，如 USART1.DR"""
+        if self.register is None:
+            return self.peripheral.name
+        return f'{self.peripheral.name}.{self.register.name}'
+
+    def __repr__(self):
+        return f'AddressMatch({self.name()}, {format_address(self.address)})'
+
+
+def field_at_bit(register, bit):
+    """
+    查找寄存器中覆盖给定位号的位域（在解析时计算好的位域布局上二分查找）
+
+    Returns:
+        Field: 位域对象，保留位返回None
+    """
+    return register.field_layout().field_at(bit)
+
+
+class AddressIndex:
+    """
+    设备的地址索引（每个设备构建一次）
+
+    寄存器数组只占一个条目（覆盖所有元素），查找命中时才计算对应的元素。
+    条目按起始地址排序，并记录每个位置及之前所有条目的最大结束地址：查找时从二分查找的位置
+    向前扫描，直到前面的条目都不可能覆盖该地址为止（一个很大的寄存器数组不会让其他地址的
+    查找都扫描它范围内的所有条目）。
+    """
+
+    def __init__(self, device):
+        entries = []
+        spans = []
+        for p_idx, peripheral in enumerate(device.peripherals):
+            base = peripheral.base_address
+            end = base
+            for r_idx, register in enumerate(peripheral.registers):
+                start = peripheral.address_of(register)
+                span_bytes = register.span_bytes
+                entries.append((start, span_bytes, p_idx, r_idx))
+                end = max(end, start + span_bytes)
+            spans.append((base, max(end - base, 1), p_idx))
+
+        entries.sort()
+        spans.sort()
+
+        self.device = device
+        self._starts = [entry[0] for entry in entries]
+        self._entries = entries
+        self._max_ends = _running_max_ends(entries)
+        self._span_starts = [span[0] for span in spans]
+        self._spans = spans
+        self._max_span_ends = _running_max_ends(spans)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _match(self, entry, address):
+        """条目覆盖的地址范围内的命中；寄存器数组落在元素间隙中时返回None"""
+        start, _, p_idx, r_idx = entry
+        peripheral = self.device.peripherals[p_idx]
+        register = peripheral.registers[r_idx]
+        if register.dim is not None:
+            increment = register.dim.increment
+            i = min((address - start) // increment, register.dim.count - 1) if increment > 0 else 0
+            start += i * increment
+            if address >= start + register.size_bytes:
+                return None
+            register = register.element(i)
+        return AddressMatch(peripheral, register, start, register.size_bytes, p_idx, r_idx)
+
+    def lookup_all(self, address):
+        """
+        返回覆盖给定地址的所有寄存器（别名寄存器可能有多个）
+
+        Returns:
+            list[AddressMatch]: 按起始地址从高到低排列
+        """
+        matches = []
+        pos = bisect_right(self._starts, address) - 1
+        while pos >= 0 and self._max_ends[pos] > address:
+            entry = self._entries[pos]
+            if address < entry[0] + entry[1]:
+                match = self._match(entry, address)
+                if match is not None:
+                    matches.append(match)
+            pos -= 1
+        return matches
+
+    def lookup(self, address):
+        """
+        查找给定地址所在的寄存器；没有寄存器时退而返回所在外设
+
+        Returns:
+            AddressMatch: 查找结果，地址不属于任何外设时返回None
+        """
+        matches = self.lookup_all(address)
+        if matches:
+            return matches[0]
+        return self.lookup_peripheral(address)
+
+    def lookup_peripheral(self, address):
+        """查找地址所在的外设（地址范围由其寄存器推算）"""
+        pos = bisect_right(self._span_starts, address) - 1
+        while pos >= 0 and self._max_span_ends[pos] > address:
+            base, size_bytes, p_idx = self._spans[pos]
+            if address < base + size_bytes:
+                return AddressMatch(self.device.peripherals[p_idx], None, base, size_bytes,
+                                    p_idx, None)
+            pos -= 1
+        return None
+
+    def lookup_field(self, address, bit):
+        """
+        查找 (地址, 位) 对应的寄存器和位域
+
+        Returns:
+            (AddressMatch, Field): 未命中寄存器时为 (None, None)，保留位时位域为None
+        """
+        match = self.lookup(address)
+        if match is None or match.register is None:
+            return match, None
+        return match, match.field_at(address, bit)
+
+
+def _running_max_ends(items):
+    """按起始地址排序的 (起始地址, 字节数, ...) 列表中，每个位置及之前的最大结束地址"""
+    max_ends = []
+    end = 0
+    for item in items:
+        end = max(end, item[0] + item[1])
+        max_ends.append(end)
+    return max_ends
+
+
+def address_index(device):
+    """获取设备的地址索引（首次调用时构建，之后复用）"""
+    return device.memo('address_index', AddressIndex)
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD器件库索引
+把多个SVD文件的器件、外设、寄存器和位域写入一个 SQLite 数据库（FTS5 全文索引），
+之后的查询只读数据库，不再解析任何SVD文件。
+
+每个文件记录大小、修改时间和内容哈希：重新建索引时只解析新增或内容变化的文件，
+已不存在的文件从库中删除。库结构或解析器版本变化时整个库重建。
+"""
+
+import os
+import re
+import sqlite3
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import svd_cache
+from svd_core import PARSER_VERSION, load_device, load_device_cached
+from svd_search import SCOPES
+
+
+# 库结构版本（与解析器版本一起记录，任一变化时重建）
+LIBRARY_VERSION = 2
+
+DEFAULT_LIBRARY_FILE = 'library.sqlite'
+
+# 查询中可以限定的范围: 写法 -> FTS 列名
+COLUMNS = dict(SCOPES, device='device')
+
+_WORD_RE = re.compile(r'[A-Za-z0-9_]+')
+
+# FTS5 的运算符（只在两个查询词之间时保留）
+_OPERATORS = ('AND', 'OR', 'NOT')
+
+_TABLES = ('entries_fts', 'entries', 'files')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER,
+    mtime REAL,
+    digest TEXT,
+    device TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    parent INTEGER,
+    address INTEGER,
+    size INTEGER,
+    lsb INTEGER,
+    msb INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_file ON entries (file_id);
+CREATE INDEX IF NOT EXISTS entries_address ON entries (address);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5 (
+    device, peripheral, register, field, description, enum
+);
+"""
+
+
+def default_library_path():
+    """默认的库文件：解析缓存目录下的 library.sqlite（目录可由 SVD_CACHE_DIR 配置）"""
+    cache_dir = os.environ.get('SVD_CACHE_DIR') or svd_cache.DEFAULT_CACHE_DIR
+    return os.path.join(cache_dir, DEFAULT_LIBRARY_FILE)
+
+
+def open_library(path=None):
+    """
+    打开（必要时创建）器件库
+
+    Returns:
+        sqlite3.Connection: 数据库连接
+    """
+    path = path or default_library_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    version = f'{LIBRARY_VERSION}.{PARSER_VERSION}'
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if row is None or row[0] != version:
+        # 版本变化：删除旧表后按新的结构和解析结果重建
+        with conn:
+            for table in _TABLES:
+                conn.execute(f'DROP TABLE IF EXISTS {table}')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def device_rows(device):
+    """
+    设备的索引行（寄存器数组、外设数组和位域数组逐个展开）
+
+    Returns:
+        list: [(类型, 地址, 位宽, lsb, msb, 外设, 寄存器, 位域, 描述, 枚举值)]
+    """
+    rows = []
+    for peripheral in device.peripherals:
+        rows.append(('peripheral', peripheral.base_address, None, None, None,
+                     peripheral.name, '', '', peripheral.description, ''))
+        for register in peripheral.iter_registers():
+            address = peripheral.address_of(register)
+            rows.append(('register', address, register.size, None, None,
+                         peripheral.name, register.name, '', register.description, ''))
+            for field in register.iter_fields():
+                enums = ' '.join(f'{name} {description}'
+                                 for name, _, description in field.enums)
+                rows.append(('field', address, field.width, field.lsb, field.msb,
+                             peripheral.name, register.name, field.name,
+                             field.description, enums))
+    return rows
+
+
+def index_file_rows(path, use_cache=False):
+    """
+    解析单个文件得到索引行（在工作进程中运行，错误记录在结果中）
+
+    Returns:
+        (str, list, str): 设备名称, 索引行, 错误信息（成功时为None）
+    """
+    try:
+        device = load_device_cached(path) if use_cache else load_device(path)
+        return device.name, device_rows(device), None
+    except ET.ParseError as e:
+        return None, [], f"XML解析错误: {e}"
+    except Exception as e:
+        return None, [], f"{type(e).__name__}: {e}"
+
+
+def _remove_file(conn, file_id):
+    conn.execute('DELETE FROM entries_fts WHERE rowid IN '
+                 '(SELECT id FROM entries WHERE file_id = ?)', (file_id,))
+    conn.execute('DELETE FROM entries WHERE file_id = ?', (file_id,))
+
+
+def _store_file(conn, path, stat, digest, device_name, rows, error):
+    """写入一个文件的索引（替换原有的行）"""
+    row = conn.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+    if row is not None:
+        file_id = row[0]
+        _remove_file(conn, file_id)
+        conn.execute('UPDATE files SET size = ?, mtime = ?, digest = ?, device = ?, error = ? '
+                     'WHERE id = ?',
+                     (stat.st_size, stat.st_mtime, digest, device_name, error, file_id))
+    else:
+        file_id = conn.execute(
+            'INSERT INTO files (path, size, mtime, digest, device, error) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (path, stat.st_size, stat.st_mtime, digest, device_name, error)).lastrowid
+    if not rows:
+        return
+    start = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM entries').fetchone()[0]
+    ids = range(start, start + len(rows))
+    # 上一级条目：寄存器属于前面最近的外设，位域属于前面最近的寄存器
+    parents = []
+    peripheral_id = register_id = None
+    for i, row in zip(ids, rows):
+        if row[0] == 'peripheral':
+            peripheral_id = i
+            parents.append(None)
+        elif row[0] == 'register':
+            register_id = i
+            parents.append(peripheral_id)
+        else:
+            parents.append(register_id)
+    conn.executemany('INSERT INTO entries (id, file_id, kind, parent, address, size, lsb, msb) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                     [(i, file_id, row[0], parent) + row[1:5]
+                      for i, parent, row in zip(ids, parents, rows)])
+    conn.executemany('INSERT INTO entries_fts '
+                     '(rowid, device, peripheral, register, field, description, enum) '
+                     'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                     [(i, device_name) + row[5:] for i, row in zip(ids, rows)])
+
+
+def update_library(conn, paths, use_cache=False, jobs=None, progress=None):
+    """
+    增量更新器件库
+
+    大小和修改时间都未变化的文件直接跳过；否则比较内容哈希，只有内容变化的文件重新解析
+    （多个文件时并行）。库中记录的、已不存在的文件被删除。
+
+    Args:
+        paths: SVD文件路径列表
+        use_cache: 工作进程是否读写解析缓存（默认不使用：库本身已记录了解析结果）
+        jobs: 工作进程数（默认为CPU核数）
+        progress: 可选的回调 progress(路径, 状态)，状态为 'added'/'updated'/'failed'
+
+    Returns:
+        dict: {'added', 'updated', 'unchanged', 'removed', 'failed'} 各状态的文件数
+    """
+    stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    known = {row[0]: row[1:] for row in conn.execute(
+        'SELECT path, id, size, mtime, digest FROM files')}
+
+    pending = []    # [(路径, stat, 哈希, 是否新文件)]
+    for path in dict.fromkeys(os.path.abspath(p) for p in paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = known.get(path)
+        if entry is not None and entry[1] == stat.st_size and entry[2] == stat.st_mtime:
+            stats['unchanged'] += 1
+            continue
+        digest = svd_cache.file_digest(path)
+        if entry is not None and entry[3] == digest:
+            # 内容未变（例如仅被touch）：只更新记录的大小和修改时间
+            with conn:
+                conn.execute('UPDATE files SET size = ?, mtime = ? WHERE id = ?',
+                             (stat.st_size, stat.st_mtime, entry[0]))
+            stats['unchanged'] += 1
+            continue
+        pending.append((path, stat, digest, entry is None))
+
+    def store(item, result):
+        path, stat, digest, is_new = item
+        device_name, rows, error = result
+        with conn:
+            _store_file(conn, path, stat, digest, device_name, rows, error)
+        status = 'failed' if error else ('added' if is_new else 'updated')
+        stats[status] += 1
+        if progress is not None:
+            progress(path, status)
+
+    if len(pending) > 1 and jobs != 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(index_file_rows, [item[0] for item in pending],
+                                   [use_cache] * len(pending))
+            for item, result in zip(pending, results):
+                store(item, result)
+    else:
+        for item in pending:
+            store(item, index_file_rows(item[0], use_cache))
+
+    for path, entry in known.items():
+        if not os.path.exists(path):
+            with conn:
+                _remove_file(conn, entry[0])
+                conn.execute('DELETE FROM files WHERE id = ?', (entry[0],))
+            stats['removed'] += 1
+    return stats
+
+
+def fts_query(text):
+    """
+    把查询文本转换为 FTS5 查询
+
+    语法与 GUI 的全文搜索相同：空格分隔的词全部要匹配，词尾 * 为前缀匹配，
+    范围:词 只在该列中匹配（另有 device:）；每个词都加引号，名称中的 . [ ] " 等符号
+    不会被当作 FTS5 语法。大写的 AND、OR、NOT 在两个查询词之间时作为运算符
+    （如 "reg:CR1 NOT periph:USART1"），在开头、结尾或与其他运算符相连时按普通的词匹配。
+    """
+    items = []   # [(是否运算符, 文本)]
+    for part in text.split():
+        if part in _OPERATORS:
+            items.append((True, part))
+            continue
+        column = None
+        key, sep, rest = part.partition(':')
+        if sep and key.lower() in COLUMNS:
+            column = COLUMNS[key.lower()]
+            part = rest
+        # ADC1.CR2 这样的路径拆成各自独立匹配的词（外设和寄存器名称在不同的列中）
+        words = _WORD_RE.findall(part)
+        terms = []
+        for i, word in enumerate(words):
+            term = f'"{word}"' + ('*' if part.endswith('*') and i == len(words) - 1 else '')
+            terms.append(f'{column} : {term}' if column else term)
+        if terms:
+            # 一个路径的各个词作为整体参与 OR/NOT
+            items.append((False, terms[0] if len(terms) == 1 else f"({' '.join(terms)})"))
+
+    parts = []
+    for i, (operator, part) in enumerate(items):
+        if operator and (i == 0 or items[i - 1][0] or i + 1 == len(items) or items[i + 1][0]):
+            part = f'"{part}"'
+            operator = False
+        parts.append(part)
+        items[i] = (operator, part)   # 后面的运算符据此判断左边是否为查询词
+    return ' '.join(parts)
+
+
+def query_library(conn, text='', address=None, kind=None, limit=50):
+    """
+    查询器件库
+
+    Args:
+        text: 全文查询（语法见 fts_query），为空时只按地址和类型筛选
+        address: 只返回该地址的外设（基地址）、寄存器和位域
+        kind: 只返回 'peripheral'、'register' 或 'field'
+
+    与 GUI 的全文搜索相同，上一级条目（外设或寄存器）本身也命中时，不再单独列出
+    它的寄存器和位域。
+
+    Returns:
+        list[dict]: 命中的条目，有全文查询时按相关度排序
+
+    Raises:
+        ValueError: 查询语法错误，或查询文本中没有可检索的词（如 "reg:"）
+    """
+    conditions = []
+    params = []
+    match = fts_query(text) if text else ''
+    if text and not match:
+        raise ValueError(f"查询中没有可检索的词: {text}")
+    if match:
+        conditions.append('entries_fts MATCH ?')
+        params.append(match)
+    if address is not None:
+        conditions.append('e.address = ?')
+        params.append(address)
+    if kind:
+        conditions.append('e.kind = ?')
+        params.append(kind)
+    where = (' WHERE ' + ' AND '.join(conditions)) if conditions else ''
+    if match:
+        # 先求出全部命中的条目，再去掉上一级或上两级也命中的条目
+        sql = ('WITH hits AS (SELECT e.id, e.parent, t.rank FROM entries_fts t '
+               'JOIN entries e ON e.id = t.rowid' + where + ') '
+               'SELECT f.path, t.device, t.peripheral, t.register, t.field, t.description, '
+               'e.kind, e.address, e.size, e.lsb, e.msb '
+               'FROM hits h JOIN entries e ON e.id = h.id '
+               'JOIN entries_fts t ON t.rowid = h.id JOIN files f ON f.id = e.file_id '
+               'LEFT JOIN entries p ON p.id = h.parent '
+               'WHERE COALESCE(h.parent, 0) NOT IN (SELECT id FROM hits) '
+               'AND COALESCE(p.parent, 0) NOT IN (SELECT id FROM hits) '
+               'ORDER BY h.rank')
+    else:
+        sql = ('SELECT f.path, t.device, t.peripheral, t.register, t.field, t.description, '
+               'e.kind, e.address, e.size, e.lsb, e.msb '
+               'FROM entries_fts t JOIN entries e ON e.id = t.rowid '
+               'JOIN files f ON f.id = e.file_id' + where + ' ORDER BY e.id')
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        raise ValueError(f"查询错误: {e}") from None
+    keys = ('file', 'device', 'peripheral', 'register', 'field', 'description',
+            'kind', 'address', 'size', 'lsb', 'msb')
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def library_stats(conn):
+    """库中的文件数、失败的文件数和各类条目数"""
+    files, failed = conn.execute(
+        'SELECT COUNT(*), COUNT(error) FROM files').fetchone()
+    counts = dict(conn.execute('SELECT kind, COUNT(*) FROM entries GROUP BY kind'))
+    return {'files': files, 'failed': failed, 'peripherals': counts.get('peripheral', 0),
+            'registers': counts.get('register', 0), 'fields': counts.get('field', 0)}
@@ -6,76 +6,44 @@ SVD文件解析脚本
 """
 
 import xml.etree.ElementTree as ET
+import argparse
+import glob
+import json
+import os
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import svd_dump
+from svd_codec import find_register, format_fields, parse_assignments, register_codec
+from svd_core import load_device, load_device_cached, format_address, format_value, parse_number
+from svd_diff import diff_devices, format_text, is_empty
+from svd_export import FORMATS, export_device, export_svd_file, format_for_path, make_writer, open_output
+from svd_header import generate_headers
+from svd_index import address_index, parse_address
+from svd_library import library_stats, open_library, query_library, update_library
+from svd_search import text_index, trigram_index
 
-def parse_svd(svd_file):
+
+def parse_svd(svd_file, use_cache=True):
     """
     解析SVD文件
     
     Args:
         svd_file: SVD文件路径
+        use_cache: 是否使用磁盘缓存（文件未变化时直接读取上次的解析结果）
         
     Returns:
-        dict: 包含设备信息的字典
+        Device: 设备对象（见 svd_core）
     """
     try:
-        tree = ET.parse(svd_file)
-        root = tree.getroot()
-        
-        device_info = {
-            'name': root.find('name').text if root.find('name') is not None else 'Unknown',
-            'peripherals': []
-        }
-        
-        peripherals_elem = root.find('peripherals')
-        if peripherals_elem is None:
-            print("未找到peripherals节点")
-            return device_info
-        
-        for peripheral in peripherals_elem.findall('peripheral'):
-            peripheral_name = peripheral.find('name')
-            peripheral_desc = peripheral.find('description')
-            peripheral_base = peripheral.find('baseAddress')
-            
-            if peripheral_name is None:
-                continue
-            
-            peripheral_data = {
-                'name': peripheral_name.text,
-                'description': peripheral_desc.text if peripheral_desc is not None else '',
-                'base_address': peripheral_base.text if peripheral_base is not None else '0x0',
-                'registers': []
-            }
-            
-            # 解析寄存器
-            registers_elem = peripheral.find('registers')
-            if registers_elem is not None:
-                for register in registers_elem.findall('register'):
-                    reg_name = register.find('name')
-                    reg_desc = register.find('description')
-                    reg_offset = register.find('addressOffset')
-                    
-                    if reg_name is None:
-                        continue
-                    
-                    # 计算绝对地址
-                    base_addr = int(peripheral_data['base_address'], 16)
-                    offset = int(reg_offset.text, 16) if reg_offset is not None else 0
-                    absolute_addr = base_addr + offset
-                    
-                    register_data = {
-                        'name': reg_name.text,
-                        'description': reg_desc.text if reg_desc is not None else '',
-                        'offset': reg_offset.text if reg_offset is not None else '0x0',
-                        'address': f'0x{absolute_addr:08X}'
-                    }
-                    
-                    peripheral_data['registers'].append(register_data)
-                
-            device_info['peripherals'].append(peripheral_data)
-        
-        return device_info
+        if use_cache:
+            device = load_device_cached(svd_file)
+        else:
+            device = load_device(svd_file)
+        if not device.peripherals:
+            print("未找到外设定义")
+        return device
         
     except ET.ParseError as e:
         print(f"XML解析错误: {e}")
@@ -85,101 +53,643 @@ def parse_svd(svd_file):
         return None
 
 
-def print_device_tree(device_info):
+def print_device_tree(device):
     """
     以树形结构打印设备信息
     
     Args:
-        device_info: 设备信息字典
+        device: 设备对象
     """
-    if not device_info:
+    if not device:
         print("没有可显示的设备信息")
         return
     
     print(f"╔═══════════════════════════════════════════════════════════════════")
-    print(f"║ Device: {device_info['name']}")
+    print(f"║ Device: {device.name}")
     print(f"╠═══════════════════════════════════════════════════════════════════")
     print(f"║ {'名称':<25} {'寄存器数量':<15} {'描述'}")
     print(f"╠═══════════════════════════════════════════════════════════════════")
     
-    for peripheral in device_info['peripherals']:
-        reg_count = len(peripheral['registers'])
-        print(f"║ ├─ {peripheral['name']:<22} {reg_count:<15} {peripheral['description'][:50]}")
+    for peripheral in device.peripherals:
+        reg_count = peripheral.register_count()
+        print(f"║ ├─ {peripheral.name:<22} {reg_count:<15} {peripheral.description[:50]}")
         
-        for idx, register in enumerate(peripheral['registers']):
-            is_last = (idx == len(peripheral['registers']) - 1)
+        for idx, register in enumerate(peripheral.iter_registers()):
+            is_last = (idx == reg_count - 1)
             prefix = "   └──" if is_last else "   ├──"
-            reg_info = f"{register['name']:<20} @ {register['address']}"
-            print(f"║ {prefix} {reg_info:<45} {register['description'][:30]}")
+            reg_info = f"{register.name:<20} @ {format_address(peripheral.address_of(register))}"
+            print(f"║ {prefix} {reg_info:<45} {register.description[:30]}")
     
     print(f"╚═══════════════════════════════════════════════════════════════════")
 
 
-def export_to_file(device_info, output_file):
+def export_to_file(device, output_file, fields=False):
     """
-    将解析结果导出到文件
+    将解析结果导出到文件（格式由扩展名决定: .csv、.jsonl，其他为文本）
     
     Args:
-        device_info: 设备信息字典
+        device: 设备对象
         output_file: 输出文件路径
+        fields: 是否导出位域
     """
-    if not device_info:
+    if not device:
         print("没有可导出的设备信息")
         return
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(f"Device: {device_info['name']}\n")
-        f.write("=" * 100 + "\n\n")
-        
-        for peripheral in device_info['peripherals']:
-            f.write(f"\n外设: {peripheral['name']}\n")
-            f.write(f"基地址: {peripheral['base_address']}\n")
-            f.write(f"描述: {peripheral['description']}\n")
-            f.write(f"寄存器数量: {len(peripheral['registers'])}\n")
-            f.write("-" * 100 + "\n")
-            
-            if peripheral['registers']:
-                f.write(f"{'寄存器名称':<30} {'地址':<15} {'偏移':<15} {'描述'}\n")
-                f.write("-" * 100 + "\n")
-                
-                for register in peripheral['registers']:
-                    f.write(f"{register['name']:<30} {register['address']:<15} "
-                           f"{register['offset']:<15} {register['description']}\n")
-            
-            f.write("\n")
+    with open_output(output_file) as f:
+        export_device(device, make_writer(f, format_for_path(output_file), fields))
     
     print(f"结果已导出到: {output_file}")
 
 
+def _command_parser(command, description, cache=True):
+    """创建子命令的参数解析器（使用解析缓存的子命令都支持 --no-cache）"""
+    parser = argparse.ArgumentParser(prog=f'svd_parse.py {command}', description=description)
+    if cache:
+        parser.add_argument('--no-cache', action='store_true', help='不使用解析缓存')
+    return parser
+
+
+def cmd_lookup(argv):
+    """子命令: 查询地址所在的外设、寄存器和位域"""
+    parser = _command_parser('lookup', '查询地址所在的外设、寄存器和位域')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('address', help='地址，如 0x40004008')
+    parser.add_argument('--bit', type=int,
+                        help='位号，从该地址的字节的第0位起算（0-7 为该字节内的位，更大的值延续到'
+                             '后面的字节；地址为寄存器首地址时即寄存器位号）')
+    args = parser.parse_args(argv)
+    
+    try:
+        address = parse_address(args.address)
+    except ValueError:
+        print(f"无效的地址: {args.address}")
+        return 2
+    if args.bit is not None and args.bit < 0:
+        print(f"无效的位号: {args.bit}", file=sys.stderr)
+        return 2
+    
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！")
+        return 1
+    
+    index = address_index(device)
+    matches = index.lookup_all(address)
+    if not matches:
+        match = index.lookup_peripheral(address)
+        if match is None:
+            print(f"{format_address(address)}: 不属于任何外设")
+            return 1
+        print(f"{format_address(address)}: 外设 {match.peripheral.name} "
+              f"(基地址 {format_address(match.address)})，无对应寄存器")
+        return 0
+    
+    if args.bit is not None:
+        for match in matches:
+            reg_bit = (address - match.address) * 8 + args.bit
+            if reg_bit >= match.register.size:
+                limit = match.register.size - 1 - (address - match.address) * 8
+                print(f"位号超出范围: {args.bit}（{match.name()} 为 {match.register.size} 位，"
+                      f"从 {format_address(address)} 起可用的位号为 0-{limit}）", file=sys.stderr)
+                return 2
+    
+    for match in matches:
+        register = match.register
+        byte_offset = address - match.address
+        print(f"{format_address(address)}: {match.name()}")
+        print(f"  外设:   {match.peripheral.name} @ {format_address(match.peripheral.base_address)}")
+        print(f"  寄存器: {format_address(match.address)} - {format_address(match.end - 1)} "
+              f"({register.size} bits, 字节偏移 {byte_offset})")
+        if register.description:
+            print(f"  描述:   {register.description}")
+        
+        if args.bit is not None:
+            field = match.field_at(address, args.bit)
+            reg_bit = byte_offset * 8 + args.bit
+            name = f"{field.name} [{field.bit_range()}] ({field.access})" if field else "保留位"
+            print(f"  位 {args.bit} (寄存器位 {reg_bit}): {name}")
+            continue
+        
+        # 列出该字节覆盖的位域
+        low = byte_offset * 8
+        high = low + 7
+        fields = [f for f in register.iter_fields() if f.lsb <= high and f.msb >= low]
+        if fields:
+            print(f"  位域 (寄存器位 {high}:{low}):")
+            for field in sorted(fields, key=lambda f: -f.msb):
+                print(f"    [{field.bit_range():>5}] {field.name:<20} {field.access}")
+    return 0
+
+
+def expand_svd_paths(patterns):
+    """
+    展开命令行给出的文件、目录和通配符为SVD文件列表（去重并保持顺序）
+    
+    目录展开为其中的 *.svd 文件。
+    """
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            found = sorted(glob.glob(os.path.join(pattern, '*.svd')))
+        elif glob.has_magic(pattern):
+            found = sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+        else:
+            found = [pattern]
+        for path in found:
+            if path not in seen:
+                seen.add(path)
+                paths.append(path)
+    return paths
+
+
+def batch_stats(svd_file, use_cache=True):
+    """
+    解析单个文件并汇总统计信息（在工作进程中运行，任何错误都记录在结果中）
+    
+    各工作进程直接使用共享的解析缓存：缓存索引的更新在文件锁内完成，
+    并发写入不会丢失记录，大小上限照常生效。
+    
+    Returns:
+        dict: file, device, peripherals, registers, fields, parse_ms, error
+    """
+    result = {'file': svd_file, 'device': None, 'peripherals': 0,
+              'registers': 0, 'fields': 0, 'parse_ms': 0.0, 'error': None}
+    start = time.perf_counter()
+    try:
+        device = load_device_cached(svd_file) if use_cache else load_device(svd_file)
+        result.update(device=device.name,
+                      peripherals=len(device.peripherals),
+                      registers=device.register_count(),
+                      fields=device.field_count())
+    except ET.ParseError as e:
+        result['error'] = f"XML解析错误: {e}"
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['parse_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def cmd_batch(argv):
+    """子命令: 并行解析多个SVD文件，每完成一个输出一行JSON"""
+    parser = _command_parser('batch', '并行解析目录或通配符匹配的所有SVD文件，按完成顺序输出 JSON Lines')
+    parser.add_argument('paths', nargs='+', help='SVD文件、目录或通配符（如 "svd/*.svd"）')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='工作进程数（默认为CPU核数）')
+    parser.add_argument('-o', '--output', help='JSON Lines 输出文件（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+    
+    files = expand_svd_paths(args.paths)
+    if not files:
+        print("没有找到SVD文件", file=sys.stderr)
+        return 2
+    
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    failed = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            futures = {executor.submit(batch_stats, path, not args.no_cache): path
+                       for path in files}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # 工作进程异常退出等情况：只影响这一个文件
+                    result = {'file': futures[future], 'device': None, 'peripherals': 0,
+                              'registers': 0, 'fields': 0, 'parse_ms': 0.0,
+                              'error': f"{type(e).__name__}: {e}"}
+                if result['error']:
+                    failed += 1
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"已解析 {len(files)} 个文件，失败 {failed} 个，用时 {elapsed:.2f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_export(argv):
+    """子命令: 边解析边导出一个或多个SVD文件"""
+    parser = _command_parser('export', '流式解析并导出SVD文件（多个文件依次写入同一个输出）',
+                             cache=False)
+    parser.add_argument('paths', nargs='+', help='SVD文件、目录或通配符')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS),
+                        help='导出格式（默认由输出文件扩展名决定，否则为 text）')
+    parser.add_argument('--fields', action='store_true', help='导出位域（每个位域一行）')
+    parser.add_argument('-o', '--output', help='输出文件（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+    
+    files = expand_svd_paths(args.paths)
+    if not files:
+        print("没有找到SVD文件", file=sys.stderr)
+        return 2
+    
+    fmt = args.format or (format_for_path(args.output) if args.output else 'text')
+    out = open_output(args.output) if args.output else sys.stdout
+    failed = 0
+    try:
+        writer = make_writer(out, fmt, args.fields)
+        for path in files:
+            try:
+                export_svd_file(path, writer)
+            except ET.ParseError as e:
+                failed += 1
+                print(f"{path}: XML解析错误: {e}", file=sys.stderr)
+            except Exception as e:
+                failed += 1
+                print(f"{path}: {type(e).__name__}: {e}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    
+    if args.output:
+        print(f"已导出 {len(files) - failed} 个文件到 {args.output}，失败 {failed} 个", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_header(argv):
+    """子命令: 生成CMSIS风格的C头文件（只改写内容变化的头文件）"""
+    parser = _command_parser('header', '生成CMSIS风格的C头文件，只改写内容发生变化的外设头文件')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('-o', '--output', default='.', help='输出目录（默认为当前目录）')
+    parser.add_argument('--force', action='store_true', help='忽略指纹清单，全部重新生成')
+    args = parser.parse_args(argv)
+    
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！")
+        return 1
+    
+    written, unchanged, removed = generate_headers(device, args.output, force=args.force)
+    for filename in written:
+        print(f"已生成: {os.path.join(args.output, filename)}")
+    for filename in removed:
+        print(f"已删除: {os.path.join(args.output, filename)}")
+    print(f"生成 {len(written)} 个，未变化 {len(unchanged)} 个，删除 {len(removed)} 个头文件")
+    return 0
+
+
+def cmd_diff(argv):
+    """子命令: 比较两个SVD文件的外设、寄存器和位域"""
+    parser = _command_parser('diff', '比较两个SVD文件，列出增加、删除和修改的外设、寄存器和位域')
+    parser.add_argument('old', help='旧的SVD文件')
+    parser.add_argument('new', help='新的SVD文件')
+    parser.add_argument('--json', action='store_true', help='输出JSON')
+    parser.add_argument('--descriptions', action='store_true', help='同时比较描述文本')
+    parser.add_argument('-o', '--output', help='输出文件（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+    
+    old = parse_svd(args.old, use_cache=not args.no_cache)
+    new = parse_svd(args.new, use_cache=not args.no_cache)
+    if not old or not new:
+        print("解析失败！", file=sys.stderr)
+        return 2
+    
+    report = diff_devices(old, new, descriptions=args.descriptions)
+    if args.json:
+        text = json.dumps(dict(report, old=args.old, new=args.new), ensure_ascii=False, indent=1)
+    else:
+        text = '\n'.join(format_text(report, args.old, args.new))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0 if is_empty(report) else 1
+
+
+def cmd_dump(argv):
+    """子命令: 把内存转储文件解码为寄存器和位域的值"""
+    parser = _command_parser('dump', '解码内存转储（二进制或 Intel HEX）中所有被覆盖的寄存器和位域')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('dump_file', help='内存转储文件（.hex/.ihx 按 Intel HEX 读取，其他按二进制读取）')
+    parser.add_argument('--base', help='二进制转储文件第一个字节的地址，如 0x40012400')
+    parser.add_argument('--big-endian', action='store_true', help='按大端字节序解码寄存器值')
+    parser.add_argument('--json', action='store_true', help='输出JSON')
+    parser.add_argument('-o', '--output', help='输出文件（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+    
+    try:
+        base = parse_address(args.base) if args.base else None
+        image = svd_dump.load_dump(args.dump_file, base)
+    except (OSError, ValueError) as e:
+        print(f"无法读取内存转储: {e}", file=sys.stderr)
+        return 2
+    
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！", file=sys.stderr)
+        return 2
+    
+    start = time.perf_counter()
+    decoded = svd_dump.decode_image(device, image, 'big' if args.big_endian else 'little')
+    elapsed = time.perf_counter() - start
+    if args.json:
+        text = svd_dump.format_json(device, decoded)
+    else:
+        text = '\n'.join(svd_dump.format_text(decoded))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    elif text:
+        print(text)
+    print(f"已解码 {len(decoded)} 个寄存器（{len(image)} 字节），用时 {elapsed * 1000:.1f} ms",
+          file=sys.stderr)
+    return 0 if decoded else 1
+
+
+def _print_register_value(peripheral, register, codec, value, as_json):
+    """输出寄存器值及其各位域的值"""
+    if as_json:
+        print(json.dumps({'peripheral': peripheral.name, 'register': register.name,
+                          'address': peripheral.address_of(register), 'size': register.size,
+                          'value': value, 'fields': codec.decode(value)}, ensure_ascii=False))
+        return
+    print(f"{peripheral.name}.{register.name} @ {format_address(peripheral.address_of(register))}"
+          f" = {format_value(value, register.size)}")
+    for line in format_fields(codec, value):
+        print(line)
+
+
+def cmd_decode(argv):
+    """子命令: 把寄存器值拆分为位域的值"""
+    parser = _command_parser('decode', '把寄存器值拆分为各位域的值')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('register', help='外设.寄存器，如 ADC1.CR1')
+    parser.add_argument('value', help='寄存器值，如 0x00050000')
+    parser.add_argument('--json', action='store_true', help='输出JSON')
+    args = parser.parse_args(argv)
+    
+    value = parse_number(args.value)
+    if value is None:
+        print(f"无效的寄存器值: {args.value}", file=sys.stderr)
+        return 2
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！", file=sys.stderr)
+        return 2
+    try:
+        peripheral, register = find_register(device, args.register)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    
+    codec = register_codec(device, register)
+    if not 0 <= value <= codec.value_mask:
+        limit = format_value(codec.value_mask, register.size)
+        print(f"{register.name} 的取值范围为 0..{limit}: {args.value}", file=sys.stderr)
+        return 2
+    _print_register_value(peripheral, register, codec, value, args.json)
+    return 0
+
+
+def cmd_encode(argv):
+    """子命令: 由位域的值组合寄存器值"""
+    parser = _command_parser('encode', '由位域的值组合寄存器值（未给出的位域取复位值）')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('register', help='外设.寄存器，如 ADC1.CR1')
+    parser.add_argument('fields', nargs='*', help='位域=值，如 DUALMOD=6')
+    parser.add_argument('--base', help='起始值（默认为复位值）')
+    parser.add_argument('--json', action='store_true', help='输出JSON')
+    args = parser.parse_args(argv)
+    
+    base = parse_number(args.base) if args.base else None
+    if args.base and base is None:
+        print(f"无效的起始值: {args.base}", file=sys.stderr)
+        return 2
+    try:
+        fields = parse_assignments(args.fields)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！", file=sys.stderr)
+        return 2
+    try:
+        peripheral, register = find_register(device, args.register)
+        codec = register_codec(device, register)
+        if base is None:
+            value = codec.encode(fields)
+        elif not 0 <= base <= codec.value_mask:
+            limit = format_value(codec.value_mask, register.size)
+            raise ValueError(f"{register.name} 的取值范围为 0..{limit}: {args.base}")
+        else:
+            value = codec.with_fields(base, fields)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    
+    _print_register_value(peripheral, register, codec, value, args.json)
+    return 0
+
+
+def cmd_search(argv):
+    """子命令: 在名称、描述和枚举值中全文搜索"""
+    parser = _command_parser('search', '全文搜索外设、寄存器和位域（名称、描述、枚举值）')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('query', nargs='+',
+                        help='查询词（全部匹配；词尾 * 为前缀匹配；'
+                             'field:/reg:/periph:/desc:/enum: 限定范围）')
+    parser.add_argument('-n', '--limit', type=int, default=0, help='最多显示的结果数')
+    args = parser.parse_args(argv)
+    
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！", file=sys.stderr)
+        return 2
+    
+    index = text_index(device)
+    hits = index.query(' '.join(args.query))
+    for doc in hits[:args.limit or None]:
+        peripheral, register, field = index.target(doc)
+        if register is None:
+            print(f"{peripheral.name:<40} {format_address(peripheral.base_address)}  "
+                  f"{peripheral.description[:60]}")
+        elif field is None:
+            print(f"{peripheral.name + '.' + register.name:<40} "
+                  f"{format_address(peripheral.address_of(register))}  {register.description[:60]}")
+        else:
+            name = f"{peripheral.name}.{register.name}.{field.name}"
+            print(f"{name:<40} [{field.bit_range():>5}]     {field.description[:60]}")
+    print(f"找到 {len(hits)} 个匹配项", file=sys.stderr)
+    return 0 if hits else 1
+
+
+def cmd_fuzzy(argv):
+    """子命令: 按相似度查找名称（拼错、少了下划线、带外设前缀等）"""
+    parser = _command_parser('fuzzy', '按相似度查找外设、寄存器和位域名称')
+    parser.add_argument('svd_file', help='SVD文件路径')
+    parser.add_argument('name', help='名称，如 TRG_SEL、ADC1_CHx')
+    parser.add_argument('-n', '--limit', type=int, default=10, help='最多显示的名称数')
+    parser.add_argument('--cutoff', type=float, default=0.3, help='最低相似度（0~1）')
+    args = parser.parse_args(argv)
+    
+    device = parse_svd(args.svd_file, use_cache=not args.no_cache)
+    if not device:
+        print("解析失败！", file=sys.stderr)
+        return 2
+    
+    index = trigram_index(device)
+    hits = index.query(args.name, args.limit, args.cutoff)
+    for score, target in hits:
+        peripheral, register, field = index.target(target)
+        name = '.'.join(item.name for item in (peripheral, register, field) if item is not None)
+        print(f"{score:.2f}  {name}")
+    return 0 if hits else 1
+
+
+def cmd_index(argv):
+    """子命令: 建立或增量更新器件库索引"""
+    parser = _command_parser('index', '把目录中所有SVD文件写入器件库（只重新解析新增或内容变化的文件）',
+                             cache=False)
+    parser.add_argument('paths', nargs='+', help='SVD文件、目录或通配符（如 "svd/*.svd"）')
+    parser.add_argument('--db', help='库文件（默认为解析缓存目录下的 library.sqlite）')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='工作进程数（默认为CPU核数）')
+    args = parser.parse_args(argv)
+    
+    files = expand_svd_paths(args.paths)
+    if not files:
+        print("没有找到SVD文件", file=sys.stderr)
+        return 2
+    
+    def progress(path, status):
+        if status == 'failed':
+            print(f"解析失败: {path}", file=sys.stderr)
+    
+    start = time.perf_counter()
+    conn = open_library(args.db)
+    try:
+        stats = update_library(conn, files, jobs=args.jobs, progress=progress)
+        totals = library_stats(conn)
+    finally:
+        conn.close()
+    elapsed = time.perf_counter() - start
+    print(f"新增 {stats['added']}，更新 {stats['updated']}，未变化 {stats['unchanged']}，"
+          f"删除 {stats['removed']}，失败 {stats['failed']}，用时 {elapsed:.2f} s")
+    print(f"器件库: {totals['files']} 个文件，{totals['peripherals']} 个外设，"
+          f"{totals['registers']} 个寄存器，{totals['fields']} 个位域")
+    # 解析失败的文件在内容变化前不会重新解析，每次都要报告
+    if totals['failed']:
+        print(f"器件库中有 {totals['failed']} 个文件解析失败", file=sys.stderr)
+    return 1 if stats['failed'] or totals['failed'] else 0
+
+
+def cmd_query(argv):
+    """子命令: 在器件库中查询（不解析SVD文件）"""
+    parser = _command_parser('query', '在器件库中全文查询外设、寄存器和位域', cache=False)
+    parser.add_argument('query', nargs='*',
+                        help='查询词（全部匹配；词尾 * 为前缀匹配；'
+                             'device:/periph:/reg:/field:/desc:/enum: 限定范围）')
+    parser.add_argument('--address', help='只列出该地址的外设、寄存器和位域')
+    parser.add_argument('--kind', choices=('peripheral', 'register', 'field'), help='只列出该类条目')
+    parser.add_argument('--db', help='库文件（默认为解析缓存目录下的 library.sqlite）')
+    parser.add_argument('-n', '--limit', type=int, default=50, help='最多显示的结果数（0 为不限）')
+    parser.add_argument('--json', action='store_true', help='每个结果输出一行JSON')
+    args = parser.parse_args(argv)
+    
+    address = None
+    if args.address:
+        try:
+            address = parse_address(args.address)
+        except ValueError:
+            print(f"无效的地址: {args.address}", file=sys.stderr)
+            return 2
+    if not args.query and address is None and not args.kind:
+        print("请给出查询词或 --address", file=sys.stderr)
+        return 2
+    
+    conn = open_library(args.db)
+    try:
+        results = query_library(conn, ' '.join(args.query), address, args.kind, args.limit)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        conn.close()
+    
+    for item in results:
+        if args.json:
+            print(json.dumps(item, ensure_ascii=False))
+            continue
+        name = '.'.join(part for part in (item['peripheral'], item['register'], item['field'])
+                        if part)
+        bits = f"[{item['msb']}:{item['lsb']}]" if item['kind'] == 'field' else ''
+        print(f"{item['device']:<16} {name:<40} {format_address(item['address'])} {bits:<7} "
+              f"{os.path.basename(item['file'])}")
+    print(f"找到 {len(results)} 个匹配项", file=sys.stderr)
+    return 0 if results else 1
+
+
+# 子命令表: 命令名 -> 处理函数
+COMMANDS = {
+    'lookup': cmd_lookup,
+    'batch': cmd_batch,
+    'export': cmd_export,
+    'header': cmd_header,
+    'diff': cmd_diff,
+    'dump': cmd_dump,
+    'decode': cmd_decode,
+    'encode': cmd_encode,
+    'search': cmd_search,
+    'fuzzy': cmd_fuzzy,
+    'index': cmd_index,
+    'query': cmd_query,
+}
+
+
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        print("使用方法: python svd_parse.py <svd文件路径> [输出文件路径]")
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
+    
+    args = [arg for arg in sys.argv[1:] if arg != '--no-cache']
+    use_cache = len(args) == len(sys.argv) - 1
+    
+    if len(args) < 1:
+        print("使用方法: python svd_parse.py <svd文件路径> [输出文件路径] [--no-cache]")
+        print("          python svd_parse.py lookup <svd文件路径> <地址> [--bit N]")
+        print("          python svd_parse.py batch <目录或通配符>... [-j N] [-o 结果.jsonl]")
+        print("          python svd_parse.py header <svd文件路径> [-o 输出目录] [--force]")
+        print("          python svd_parse.py diff <旧svd文件> <新svd文件> [--json] [--descriptions] [-o 输出文件]")
+        print("          python svd_parse.py dump <svd文件路径> <转储文件> [--base 地址] [--big-endian] [--json]")
+        print("          python svd_parse.py decode <svd文件路径> <外设.寄存器> <值> [--json]")
+        print("          python svd_parse.py encode <svd文件路径> <外设.寄存器> 位域=值... [--base 值] [--json]")
+        print("          python svd_parse.py search <svd文件路径> <查询词>... [-n 数量]")
+        print("          python svd_parse.py fuzzy <svd文件路径> <名称> [-n 数量] [--cutoff 相似度]")
+        print("          python svd_parse.py index <目录或通配符>... [--db 库文件] [-j N]")
+        print("          python svd_parse.py query <查询词>... [--address 地址] [--kind 类型] [--db 库文件] [--json]")
+        print("          python svd_parse.py export <目录或通配符>... [-f text|csv|jsonl] [--fields] [-o 输出文件]")
         print("示例: python svd_parse.py TLE987x.svd output.txt")
         return
     
-    svd_file = sys.argv[1]
-    output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    svd_file = args[0]
+    output_file = args[1] if len(args) > 1 else None
     
     print(f"正在解析SVD文件: {svd_file}")
-    device_info = parse_svd(svd_file)
+    device = parse_svd(svd_file, use_cache=use_cache)
     
-    if device_info:
+    if device:
         print(f"\n解析成功！")
-        print(f"设备名称: {device_info['name']}")
-        print(f"外设数量: {len(device_info['peripherals'])}")
-        total_regs = sum(len(p['registers']) for p in device_info['peripherals'])
-        print(f"寄存器总数: {total_regs}\n")
+        print(f"设备名称: {device.name}")
+        print(f"外设数量: {len(device.peripherals)}")
+        print(f"寄存器总数: {device.register_count()}\n")
         
         # 打印树形结构
-        print_device_tree(device_info)
+        print_device_tree(device)
         
         # 如果指定了输出文件，则导出
         if output_file:
-            export_to_file(device_info, output_file)
+            export_to_file(device, output_file)
     else:
         print("解析失败！")
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
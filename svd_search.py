@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SVD名称搜索
+加载设备时构建一次的扁平名称索引（预先转为小写），查询时每次只编译一次匹配模式；
+新的查询包含上一次的查询文本时，只在上一次的结果中继续过滤。
+
+全文索引（TextIndex）是外设、寄存器、位域的名称、描述和枚举值的倒排索引，
+支持多词 AND、前缀和限定范围的查询。
+三元组索引（TrigramIndex）按名称相似度查找拼错或写法不同的外设、寄存器和位域名称。
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter
+from heapq import nlargest
+from itertools import chain
+
+
+class NameIndex:
+    """
+    设备、外设、寄存器名称的扁平列表
+
+    寄存器数组的每个元素都有自己的名称，但只记录 (数组, 下标)，
+    命中时才由 target() 生成元素对象。
+    """
+
+    def __init__(self, device):
+        names = [device.name]
+        targets = [(None, None, None)]
+        for peripheral in device.peripherals:
+            names.append(peripheral.name)
+            targets.append((peripheral, None, None))
+            for register in peripheral.registers:
+                if register.dim is None:
+                    names.append(register.name)
+                    targets.append((peripheral, register, None))
+                    continue
+                for i in range(register.dim.count):
+                    names.append(register.dim.element_name(register.name, i))
+                    targets.append((peripheral, register, i))
+
+        self.names = names
+        self.lower_names = [name.lower() for name in names]
+        self.targets = targets  # 与名称一一对应: (外设, 寄存器, 数组下标)
+
+    def __len__(self):
+        return len(self.names)
+
+    def target(self, pos):
+        """
+        名称对应的模型对象
+
+        Returns:
+            (Peripheral, Register): 外设名称的寄存器为None，设备名称为 (None, None)
+        """
+        peripheral, register, i = self.targets[pos]
+        if i is not None:
+            register = register.element(i)
+        return peripheral, register
+
+
+def name_index(device):
+    """获取设备的名称索引（首次调用时构建，之后复用）"""
+    return device.memo('name_index', NameIndex)
+
+
+def compile_matcher(text, match_case=False, whole_word=False, use_regex=False):
+    """
+    把查询编译为匹配函数（每个查询只编译一次）
+
+    Returns:
+        (callable, bool): 匹配函数和是否使用小写名称列表
+
+    Raises:
+        re.error: 正则表达式错误
+    """
+    flags = 0 if match_case else re.IGNORECASE
+    if use_regex:
+        return re.compile(text, flags).search, False
+    if whole_word:
+        return re.compile(r'\b' + re.escape(text) + r'\b', flags).search, False
+    if match_case:
+        return (lambda name: text in name), False
+    needle = text.lower()
+    return (lambda name: needle in name), True
+
+
+class NameSearch:
+    """在名称索引上执行查询，支持增量过滤"""
+
+    def __init__(self, index):
+        self.index = index
+        self._last_key = None
+        self._last_text = None
+        self._last_hits = None
+
+    def query(self, text, match_case=False, whole_word=False, use_regex=False):
+        """
+        查询名称
+
+        Returns:
+            list[int]: 命中的名称在索引中的位置（保持模型顺序）
+
+        Raises:
+            re.error: 正则表达式错误
+        """
+        matcher, use_lower = compile_matcher(text, match_case, whole_word, use_regex)
+        names = self.index.lower_names if use_lower else self.index.names
+
+        # 普通包含匹配时，包含上一次查询文本的新查询的结果一定是上一次结果的子集
+        key = (match_case, whole_word, use_regex)
+        plain = not whole_word and not use_regex
+        if plain and key == self._last_key and self._last_text in text:
+            candidates = self._last_hits
+        else:
+            candidates = range(len(names))
+
+        hits = [pos for pos in candidates if matcher(names[pos])]
+
+        self._last_key = key
+        self._last_text = text
+        self._last_hits = hits
+        return hits
+
+
+# ====== 全文索引 ======
+
+# 查询中 范围:词 的范围写法 -> 索引中的范围
+SCOPES = {
+    'p': 'peripheral', 'periph': 'peripheral', 'peripheral': 'peripheral',
+    'r': 'register', 'reg': 'register', 'register': 'register',
+    'f': 'field', 'field': 'field',
+    'd': 'description', 'desc': 'description', 'description': 'description',
+    'e': 'enum', 'enum': 'enum',
+}
+
+_WORD_RE = re.compile(r'[A-Za-z0-9_]+')
+
+# 位域文档中来自位域自身的范围（peripheral、register 范围是所属外设和寄存器的名称）
+_FIELD_SCOPES = ('field', 'description', 'enum')
+
+
+def tokenize(text):
+    """
+    文本中的检索词（小写）
+
+    带下划线的名称除了整体之外，各部分也作为检索词（TRIG_SEL -> trig_sel, trig, sel）。
+    """
+    tokens = []
+    for word in _WORD_RE.findall(text.replace('%s', '')):
+        word = word.lower()
+        tokens.append(word)
+        if '_' in word:
+            tokens.extend(part for part in word.split('_') if part)
+    return tokens
+
+
+def parse_query(text):
+    """
+    解析全文查询：空格分隔的词全部要匹配（AND，大写的 AND 可省略），
+    词尾的 * 表示前缀匹配，范围:词 只在该范围内匹配（如 field:TRIG_SEL、desc:VAREF*）
+
+    Returns:
+        list: [(范围或None, 词, 是否前缀匹配)]
+    """
+    terms = []
+    for part in text.split():
+        if part == 'AND':
+            continue
+        scope = None
+        key, sep, rest = part.partition(':')
+        if sep and key.lower() in SCOPES:
+            scope = SCOPES[key.lower()]
+            part = rest
+        words = _WORD_RE.findall(part.lower())
+        for i, word in enumerate(words):
+            terms.append((scope, word, part.endswith('*') and i == len(words) - 1))
+    return terms
+
+
+class TextIndex:
+    """
+    外设、寄存器、位域的全文倒排索引（每个设备构建一次）
+
+    每个外设、寄存器（数组只记一次）、位域（位域数组逐个展开，按 SETENA_5 这样的元素名称检索）
+    各是一个文档；寄存器和位域文档同时包含
+    所属外设和寄存器的名称，"ADC1 TRIG_SEL" 这样跨层级的查询可以直接命中位域。
+    倒排表按范围（peripheral/register/field/description/enum）分开，
+    每个词对应按文档序号升序的列表。
+    """
+
+    def __init__(self, device):
+        self.targets = []   # 文档序号 -> (外设, 寄存器, 位域)
+        self.parents = []   # 文档序号 -> 上一级文档序号（外设文档为 -1）
+        self.postings = {scope: {} for scope in set(SCOPES.values())}
+        self._sorted = {}   # 范围 -> 排序后的词列表（前缀查询时构建）
+
+        tokens = {}         # 文本 -> 检索词，重复的名称和描述只切分一次
+
+        def words(text):
+            result = tokens.get(text)
+            if result is None:
+                result = tokens[text] = tokenize(text) if text else ()
+            return result
+
+        for peripheral in device.peripherals:
+            peripheral_words = words(peripheral.name)
+            p_doc = self._add_doc(peripheral, None, None, -1)
+            self._add('peripheral', peripheral_words, p_doc)
+            self._add('description', words(peripheral.description), p_doc)
+            for register in peripheral.registers:
+                register_words = words(register.name)
+                r_doc = self._add_doc(peripheral, register, None, p_doc)
+                self._add('peripheral', peripheral_words, r_doc)
+                self._add('register', register_words, r_doc)
+                self._add('description', words(register.description), r_doc)
+                for field in register.iter_fields():
+                    f_doc = self._add_doc(peripheral, register, field, r_doc)
+                    self._add('peripheral', peripheral_words, f_doc)
+                    self._add('register', register_words, f_doc)
+                    self._add('field', words(field.name), f_doc)
+                    self._add('description', words(field.description), f_doc)
+                    for name, _, description in field.enums:
+                        self._add('enum', words(name), f_doc)
+                        self._add('enum', words(description), f_doc)
+
+    def _add_doc(self, peripheral, register, field, parent):
+        self.targets.append((peripheral, register, field))
+        self.parents.append(parent)
+        return len(self.targets) - 1
+
+    def _add(self, scope, words, doc):
+        postings = self.postings[scope]
+        for word in words:
+            docs = postings.get(word)
+            if docs is None:
+                postings[word] = [doc]
+            elif docs[-1] != doc:
+                docs.append(doc)
+
+    def __len__(self):
+        return len(self.targets)
+
+    def _term_docs(self, scope, word, prefix):
+        """一个查询词命中的文档集合"""
+        docs = set()
+        for name in (scope,) if scope else self.postings:
+            postings = self.postings[name]
+            if not prefix:
+                docs.update(postings.get(word, ()))
+                continue
+            words = self._sorted.get(name)
+            if words is None:
+                words = self._sorted[name] = sorted(postings)
+            i = bisect_left(words, word)
+            while i < len(words) and words[i].startswith(word):
+                docs.update(postings[words[i]])
+                i += 1
+        return docs
+
+    def matches(self, text):
+        """
+        全文查询（语法见 parse_query）命中的全部文档
+
+        Returns:
+            list[int]: 命中的文档序号（保持模型顺序）
+        """
+        terms = parse_query(text)
+        if not terms:
+            return []
+        matched = None
+        for docs in sorted((self._term_docs(*term) for term in terms), key=len):
+            matched = docs if matched is None else matched & docs
+            if not matched:
+                return []
+        return sorted(matched)
+
+    def field_matches(self, text):
+        """
+        命中的位域文档中，至少有一个查询词匹配位域自身（名称、描述或枚举值）的文档
+
+        位域文档也包含外设和寄存器名称，只靠这些命中的位域（如查询 ADC1 时 ADC1 的所有位域）
+        不算位域级的命中；上一级文档是否命中不影响结果（GUI 据此高亮位图中的位域）。
+
+        Returns:
+            list[int]: 文档序号（保持模型顺序）
+        """
+        own = set()
+        for scope, word, prefix in parse_query(text):
+            for name in (scope,) if scope else _FIELD_SCOPES:
+                if name in _FIELD_SCOPES:
+                    own |= self._term_docs(name, word, prefix)
+        targets = self.targets
+        return [doc for doc in self.matches(text) if doc in own and targets[doc][2] is not None]
+
+    def collapse(self, docs):
+        """
+        结果列表用的命中文档：上一级文档（外设或寄存器）本身也命中时，
+        不再单独列出它的寄存器和位域
+
+        Args:
+            docs: matches() 的结果
+
+        Returns:
+            list[int]: 文档序号（保持模型顺序）
+        """
+        matched = set(docs)
+        parents = self.parents
+        hits = []
+        for doc in docs:
+            parent = parents[doc]
+            if parent in matched or (parent >= 0 and parents[parent] in matched):
+                continue
+            hits.append(doc)
+        return hits
+
+    def query(self, text):
+        """
+        全文查询，返回结果列表用的命中文档（见 collapse）
+
+        Returns:
+            list[int]: 命中的文档序号（保持模型顺序）
+        """
+        return self.collapse(self.matches(text))
+
+    def target(self, doc):
+        """
+        文档对应的模型对象
+
+        Returns:
+            (Peripheral, Register, Field): 外设文档的寄存器和位域为None，寄存器文档的位域为None
+        """
+        return self.targets[doc]
+
+
+def text_index(device):
+    """获取设备的全文索引（首次调用时构建，之后复用）"""
+    return device.memo('text_index', TextIndex)
+
+
+# ====== 三元组模糊匹配 ======
+
+_NOT_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_name(name):
+    """模糊匹配用的名称形式：小写，去掉 %s、下划线和其他符号（CHx_EIM -> chxeim）"""
+    return _NOT_ALNUM_RE.sub('', name.replace('%s', '').lower())
+
+
+def trigrams(key):
+    """名称的三元组集合（首尾加 $，短名称也至少有一个三元组）"""
+    padded = f'${key}$'
+    return {padded[i:i + 3] for i in range(max(len(padded) - 2, 1))}
+
+
+class TrigramIndex:
+    """
+    外设、寄存器、位域名称的三元组索引，用于按相似度查找拼错或写法不同的名称
+
+    每个寄存器除了自身名称，还以 "外设+寄存器" 的组合参与匹配（位域同理为 "寄存器+位域"），
+    ADC1_CHx 这样带上级名称的写法也能找到 ADC1.CHx_EIM。
+    名称先规范化并去重，相似度为三元组的 Dice 系数。
+    """
+
+    def __init__(self, device):
+        self.targets = []    # 目标序号 -> (外设, 寄存器, 位域)
+        self.keys = []       # 名称序号 -> 规范化名称
+        self.key_targets = []  # 名称序号 -> [目标序号]
+        self.sizes = []      # 名称序号 -> 三元组数
+        self.postings = {}   # 三元组 -> [名称序号]
+        key_ids = {}
+
+        def add(name, target):
+            key = normalize_name(name)
+            if not key:
+                return
+            key_id = key_ids.get(key)
+            if key_id is None:
+                key_id = key_ids[key] = len(self.keys)
+                grams = trigrams(key)
+                self.keys.append(key)
+                self.key_targets.append([])
+                self.sizes.append(len(grams))
+                for gram in grams:
+                    self.postings.setdefault(gram, []).append(key_id)
+            targets = self.key_targets[key_id]
+            if not targets or targets[-1] != target:
+                targets.append(target)
+
+        for peripheral in device.peripherals:
+            add(peripheral.name, self._add_target(peripheral, None, None))
+            for register in peripheral.registers:
+                target = self._add_target(peripheral, register, None)
+                add(register.name, target)
+                add(peripheral.name + register.name, target)
+                for field in register.fields:
+                    target = self._add_target(peripheral, register, field)
+                    add(field.name, target)
+                    add(register.name + field.name, target)
+
+    def _add_target(self, peripheral, register, field):
+        self.targets.append((peripheral, register, field))
+        return len(self.targets) - 1
+
+    def __len__(self):
+        return len(self.keys)
+
+    def query(self, text, limit=20, cutoff=0.3):
+        """
+        按相似度排序的候选
+
+        Args:
+            limit: 最多返回的名称数（同名的多个目标一起返回）
+            cutoff: 最低相似度（0~1）
+
+        Returns:
+            list: [(相似度, 目标序号)]，相似度从高到低，每个目标只出现一次
+        """
+        key = normalize_name(text)
+        if not key:
+            return []
+        grams = trigrams(key)
+        postings = self.postings
+        shared = Counter(chain.from_iterable(postings[gram] for gram in grams if gram in postings))
+        n = len(grams)
+        sizes = self.sizes
+        # 相似度不低于 cutoff 需要的最少共同三元组数（名称越短要求越低，取最短名称的下限）
+        minimum = max(1, int(cutoff * (n + 1) / 2))
+        scored = [(2 * count / (n + sizes[key_id]), key_id)
+                  for key_id, count in shared.items() if count >= minimum]
+        result = []
+        seen = set()
+        for score, key_id in nlargest(limit, (item for item in scored if item[0] >= cutoff)):
+            for target in self.key_targets[key_id]:
+                # 同一目标的自身名称和组合名称都命中时只保留相似度高的一次
+                if target not in seen:
+                    seen.add(target)
+                    result.append((score, target))
+        return result
+
+    def target(self, target):
+        """
+        目标序号对应的模型对象
+
+        Returns:
+            (Peripheral, Register, Field): 外设的寄存器和位域为None，寄存器的位域为None
+        """
+        return self.targets[target]
+
+
+def trigram_index(device):
+    """获取设备的三元组索引（首次调用时构建，之后复用）"""
+    return device.memo('trigram_index', TrigramIndex)